@@ -1,10 +1,15 @@
 import gradio as gr
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
+import asyncio
 import os
 import json
 from datetime import datetime
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Dict, List, Tuple, Optional, Any, AsyncIterator
 import logging
 import traceback
+from contextlib import asynccontextmanager
 import tempfile
 import shutil
 
@@ -12,8 +17,18 @@ import shutil
 from src.ai_service import AIService
 from src.content_generator import ContentGenerator  
 from src.pdf_generator import PDFGenerator
-from src.config import API_CONFIGS
-from src.utils import validate_email, validate_phone, validate_linkedin, clean_text
+from src.render_engine import PDFRenderEngine
+from src.scheduler import JobScheduler, QueueFullError
+from src.output_store import OutputStore, OutputTooLargeError
+from src.live_preview import LivePreview
+from src.thumbnails import ThumbnailService
+from src.knowledge_base import get_sector_pack
+from src import deadline as request_deadline, single_flight, tracing
+from src.deadline import Deadline, DeadlineExceeded
+from src.config import (
+    API_CONFIGS, OUTPUT_SETTINGS, SCHEDULER_SETTINGS, PREVIEW_SETTINGS, THUMBNAIL_SETTINGS, DEADLINE_SETTINGS
+)
+from src.utils import validate_email, validate_phone, validate_linkedin, clean_text, format_success_message
 
 # Importar componentes modulares
 from src.ui_components import (
@@ -38,16 +53,23 @@ class CVGeneratorApp:
         self.ai_service = AIService()
         self.content_generator = ContentGenerator()
         self.pdf_generator = PDFGenerator()
+        self.pdf_engine = PDFRenderEngine()
+        self.output_store = OutputStore()
+        self.scheduler = JobScheduler()
+        self.live_preview = LivePreview(self.pdf_generator)
+        self.thumbnails = ThumbnailService(self.pdf_generator, self.live_preview, self.content_generator)
+        if THUMBNAIL_SETTINGS["warm_up"]:
+            self.thumbnails.warm_up(background=True)
         
         # Estado de autoguardado
         self.autosave_enabled = True
         self.autosave_data = {}
         
         # Inicializar componentes modulares
-        self.personal_info = PersonalInfoComponent()
+        self.personal_info = PersonalInfoComponent(thumbnail_provider=self.template_thumbnail_html)
         self.experience = ExperienceComponent()
         self.skills = SkillsComponent()
-        self.ai_config = AIConfigComponent()
+        self.ai_config = AIConfigComponent(status_provider=self.ai_service.get_circuit_status)
         self.generation = GenerationComponent()
         self.wysiwyg = WYSIWYGComponent()
         
@@ -64,7 +86,9 @@ class CVGeneratorApp:
                 neutral_hue="slate"
             ),
             title="🚀 CV Creator AI - Generador Profesional de CVs",
-            css=self.get_custom_css()
+            css=self.get_custom_css(),
+            # La caché de archivos de Gradio también caduca con el TTL del almacén de salida
+            delete_cache=(OUTPUT_SETTINGS["ttl"], OUTPUT_SETTINGS["ttl"])
         ) as demo:
             
             # Header principal
@@ -142,6 +166,13 @@ class CVGeneratorApp:
             </div>
             """)
         
+        # La cola de Gradio deja pasar hasta el planificador todo lo que puede
+        # ejecutar o encolar; el resto espera en Gradio hasta gradio_max_size
+        demo.queue(
+            default_concurrency_limit=self.scheduler.get_gradio_concurrency(),
+            max_size=SCHEDULER_SETTINGS["gradio_max_size"]
+        )
+        
         return demo
     
     def _setup_event_handlers(self):
@@ -196,20 +227,41 @@ class CVGeneratorApp:
                     inputs=handler_config['inputs'],
                     outputs=handler_config['outputs']
                 )
-            elif 'key' in handler_name:
+            elif 'key' in handler_name or 'status' in handler_name:
                 self.rendered_components['api_provider'].change(
                     fn=handler_config['fn'],
                     inputs=handler_config['inputs'],
                     outputs=handler_config['outputs']
                 )
         
-        # Configurar vista previa en vivo
+        # Miniatura de la plantilla elegida (con los datos del usuario si ya los hay)
+        form_inputs = self.personal_info.get_inputs() + self.experience.get_inputs() + self.skills.get_inputs()
+        self.rendered_components['template_selector'].change(
+            fn=self.update_template_thumbnail,
+            inputs=form_inputs,
+            outputs=[self.rendered_components['template_thumbnail']],
+            show_progress='hidden'
+        )
+        
+        # Configurar vista previa en vivo: se recalcula al editar cualquier campo del CV
         live_preview_config = self.generation.get_live_preview_handlers()
+        preview_inputs = [live_preview_config['state']] + form_inputs
+        preview_event = {
+            'fn': self.update_live_preview,
+            'inputs': preview_inputs,
+            'outputs': [self.rendered_components['live_preview_html']],
+            'show_progress': 'hidden',
+            'concurrency_id': 'live_preview',
+            'concurrency_limit': PREVIEW_SETTINGS["concurrency"]
+        }
         self.rendered_components['live_preview_toggle'].click(
             fn=live_preview_config['toggle_handler']['fn'],
             inputs=live_preview_config['toggle_handler']['inputs'],
             outputs=live_preview_config['toggle_handler']['outputs']
-        )
+        ).then(**preview_event)
+        for component in preview_inputs[1:]:
+            # always_last: mientras se renderiza, las ediciones nuevas se agrupan en una
+            component.change(trigger_mode='always_last', **preview_event)
     
     def get_custom_css(self) -> str:
         """CSS personalizado mejorado combinando estilos base y avanzados"""
@@ -311,82 +363,99 @@ class CVGeneratorApp:
         except:
             return base_css
     
-    def generate_cv(self, nombre: str, email: str, telefono: str, linkedin: str, 
+    async def generate_cv(self, nombre: str, email: str, telefono: str, linkedin: str, 
                    ubicacion: str, template_selector: str, objetivo: str, experiencia_anos: str,
                    experiencia_laboral: str, educacion: str, habilidades: str,
                    idiomas: str, certificaciones: str, proyectos: str,
-                   api_provider: str, modelo_seleccionado: str, api_key: str) -> Tuple[str, Optional[str]]:
-        """Generar CV con validaciones y manejo de errores mejorado"""
+                   api_provider: str, modelo_seleccionado: str, api_key: str) -> AsyncIterator[Tuple[str, Optional[str]]]:
+        """
+        Generar CV con validaciones, emitiendo el contenido parcial mientras la IA responde
         
+        Toda la petición comparte un plazo (DEADLINE_SETTINGS): la IA dispone
+        de lo que queda menos la reserva del PDF y, si se agota, cada etapa se
+        degrada (contenido de respaldo, CV sin PDF) en lugar de seguir esperando.
+        """
+        
+        deadline = Deadline(DEADLINE_SETTINGS["request_budget"])
         try:
-            # Validaciones básicas
-            if not all([nombre.strip(), email.strip(), telefono.strip()]):
-                return "❌ **Error:** Los campos Nombre, Email y Teléfono son obligatorios.", None
-            
-            # Validaciones de formato
-            if not validate_email(email):
-                return "❌ **Error:** El formato del email no es válido.", None
-            
-            if not validate_phone(telefono):
-                return "❌ **Error:** El formato del teléfono no es válido.", None
-            
-            if linkedin and not validate_linkedin(linkedin):
-                return "❌ **Error:** El formato del LinkedIn no es válido.", None
-            
-            # Configurar el servicio de IA
-            self.ai_service.configure(api_provider, modelo_seleccionado, api_key)
-            
-            # Preparar datos del usuario
-            user_data = {
-                "nombre": clean_text(nombre),
-                "email": clean_text(email),
-                "telefono": clean_text(telefono),
-                "linkedin": clean_text(linkedin) if linkedin else "",
-                "ubicacion": clean_text(ubicacion) if ubicacion else "",
-                "objetivo": clean_text(objetivo) if objetivo else "",
-                "experiencia_anos": experiencia_anos,
-                "experiencia_laboral": clean_text(experiencia_laboral) if experiencia_laboral else "",
-                "educacion": clean_text(educacion) if educacion else "",
-                "habilidades": clean_text(habilidades) if habilidades else "",
-                "idiomas": clean_text(idiomas) if idiomas else "",
-                "certificaciones": clean_text(certificaciones) if certificaciones else "",
-                "proyectos": clean_text(proyectos) if proyectos else ""
-            }
-            
-            # Generar contenido del CV
-            logger.info(f"Generando CV para {nombre} con plantilla {template_selector}")
-            cv_content = self.content_generator.generate_cv_content(
-                user_data, 
-                template_selector, 
-                self.ai_service
-            )
-            
-            # Generar PDF
-            pdf_path = self.pdf_generator.generate_pdf(cv_content, template_selector, user_data)
-            
-            # Autoguardar datos (opcional)
-            if self.autosave_enabled:
-                self.save_user_data(user_data)
+            # Cada etapa queda como un span de la traza (exportable y en /metrics)
+            with tracing.span("generate_cv", provider=api_provider, model=modelo_seleccionado,
+                              template=template_selector) as current:
+                with deadline.stage("validation"):
+                    error_message = self._validate_form(nombre, email, telefono, linkedin)
+                if error_message:
+                    yield error_message, None
+                    return
+                
+                # Preparar datos del usuario
+                user_data = self._prepare_user_data(
+                    nombre, email, telefono, linkedin, ubicacion, objetivo, experiencia_anos,
+                    experiencia_laboral, educacion, habilidades, idiomas, certificaciones, proyectos
+                )
+                
+                # Generar contenido del CV mostrando los campos a medida que llegan,
+                # dentro del carril del proveedor (simulado, gratuito o de pago)
+                logger.info(f"Generando CV para {nombre} con plantilla {template_selector}")
+                llm_deadline = deadline.shortened(DEADLINE_SETTINGS["render_reserve"])
+                with tracing.span("llm"):
+                    try:
+                        async with self.scheduler.llm_slot(api_provider, llm_deadline):
+                            async for ai_content, done in self.ai_service.stream_cv_content(
+                                user_data,
+                                api_provider,
+                                modelo_seleccionado,
+                                api_key,
+                                deadline=llm_deadline
+                            ):
+                                if not done:
+                                    yield self.generation.format_streaming_preview(ai_content), None
+                    except DeadlineExceeded:
+                        # Sin turno en la cola a tiempo: contenido de respaldo sin llamar a la IA
+                        ai_content = await self.ai_service.generate_cv_content(
+                            user_data, api_provider, modelo_seleccionado, api_key, deadline=llm_deadline
+                        )
+                
+                preview_content = format_success_message(
+                    nombre, api_provider, modelo_seleccionado, ai_content, template_selector
+                )
+                
+                # Generar PDF en memoria en el pool de procesos y publicarlo para descarga
+                try:
+                    pdf_bytes = await self.pdf_engine.render(
+                        user_data, ai_content, template_selector, deadline=deadline
+                    )
+                except DeadlineExceeded:
+                    current.set_attribute("budget_left", 0.0)
+                    yield preview_content + (
+                        "\n\n⏱️ **El PDF no se generó a tiempo.** El contenido está listo: "
+                        "vuelve a pulsar \"Generar CV\" para descargarlo."
+                    ), None
+                    return
+                with tracing.span("output.save"):
+                    try:
+                        pdf_path = self.output_store.save(pdf_bytes, f"CV_{user_data['nombre']}.pdf")
+                    except OutputTooLargeError as e:
+                        logger.error(f"PDF no guardado: {e}")
+                        yield preview_content + (
+                            "\n\n⚠️ **El PDF supera el espacio de descarga del servidor.** "
+                            "El contenido está listo, pero no se puede descargar el archivo."
+                        ), None
+                        return
+                
+                # Autoguardar datos (opcional; se omite si ya no queda plazo)
+                if self.autosave_enabled and not deadline.expired():
+                    with tracing.span("autosave"):
+                        self.save_user_data(user_data)
+                
+                current.set_attribute("budget_left", round(deadline.remaining(), 3))
             
-            # Resultado en Markdown para mostrar
-            preview_content = f"""
-# ✅ **CV Generado Exitosamente**
-
-## 📋 **Resumen del CV:**
-- **Nombre:** {nombre}
-- **Plantilla:** {template_selector.title()}
-- **Proveedor IA:** {api_provider}
-- **Modelo:** {modelo_seleccionado}
-
-## 📄 **Vista Previa del Contenido:**
-
-{cv_content[:1000]}...
-
----
-💡 **Tip:** Tu CV ha sido optimizado automáticamente para sistemas ATS con palabras clave relevantes para tu sector.
-            """
+            yield preview_content, pdf_path
             
-            return preview_content, pdf_path
+        except QueueFullError as e:
+            yield (
+                "⏳ **Servidor ocupado:** hay demasiados CVs generándose ahora mismo. "
+                f"Tiempo de espera estimado: ~{max(e.estimated_wait, 1):.0f} s. Inténtalo de nuevo en unos segundos."
+            ), None
             
         except Exception as e:
             logger.error(f"Error generando CV: {str(e)}")
@@ -403,7 +472,108 @@ class CVGeneratorApp:
 3. Intenta con otra plantilla o modelo
 4. Contacta al soporte si el problema persiste
             """
-            return error_message, None
+            yield error_message, None
+    
+    @tracing.traced("validation")
+    def _validate_form(self, nombre: str, email: str, telefono: str, linkedin: str) -> Optional[str]:
+        """Validar los campos obligatorios y de formato; devuelve el mensaje de error o None"""
+        
+        # Validaciones básicas
+        if not all([nombre.strip(), email.strip(), telefono.strip()]):
+            return "❌ **Error:** Los campos Nombre, Email y Teléfono son obligatorios."
+        
+        # Validaciones de formato
+        if not validate_email(email):
+            return "❌ **Error:** El formato del email no es válido."
+        
+        if not validate_phone(telefono):
+            return "❌ **Error:** El formato del teléfono no es válido."
+        
+        if linkedin and not validate_linkedin(linkedin):
+            return "❌ **Error:** El formato del LinkedIn no es válido."
+        
+        return None
+    
+    def _prepare_user_data(self, nombre: str, email: str, telefono: str, linkedin: str,
+                           ubicacion: str, objetivo: str, experiencia_anos: str,
+                           experiencia_laboral: str, educacion: str, habilidades: str,
+                           idiomas: str, certificaciones: str, proyectos: str) -> Dict[str, Any]:
+        """Normalizar los campos del formulario en el diccionario de datos del usuario"""
+        return {
+            "nombre": clean_text(nombre),
+            "email": clean_text(email),
+            "telefono": clean_text(telefono),
+            "linkedin": clean_text(linkedin) if linkedin else "",
+            "ubicacion": clean_text(ubicacion) if ubicacion else "",
+            "objetivo": clean_text(objetivo) if objetivo else "",
+            "experiencia_anos": experiencia_anos,
+            "experiencia_laboral": clean_text(experiencia_laboral) if experiencia_laboral else "",
+            "educacion": clean_text(educacion) if educacion else "",
+            "habilidades": clean_text(habilidades) if habilidades else "",
+            "idiomas": clean_text(idiomas) if idiomas else "",
+            "certificaciones": clean_text(certificaciones) if certificaciones else "",
+            "proyectos": clean_text(proyectos) if proyectos else ""
+        }
+
+    async def update_live_preview(self, enabled: bool, nombre: str, email: str, telefono: str,
+                                  linkedin: str, ubicacion: str, template_selector: str, objetivo: str,
+                                  experiencia_anos: str, experiencia_laboral: str, educacion: str,
+                                  habilidades: str, idiomas: str, certificaciones: str, proyectos: str,
+                                  request: gr.Request = None):
+        """Actualizar la vista previa de la página 1 tras una edición (con debounce)"""
+        if not enabled:
+            return gr.skip()
+        
+        session = request.session_hash if request is not None else "default"
+        if not await self.live_preview.debounce(session):
+            return gr.skip()  # Llegó otra edición: la renderiza su propio evento
+        
+        user_data = self._prepare_user_data(
+            nombre or "", email or "", telefono or "", linkedin, ubicacion, objetivo, experiencia_anos,
+            experiencia_laboral, educacion, habilidades, idiomas, certificaciones, proyectos
+        )
+        # Contenido local (sin llamadas a la IA) maquetado fuera del event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._render_live_preview, user_data, template_selector)
+    
+    def _render_live_preview(self, user_data: Dict[str, Any], template: str) -> str:
+        """Renderizar la vista previa con el contenido del generador local"""
+        ai_content = self.content_generator.generate_enhanced_cv_content(user_data)
+        return self.live_preview.render(user_data, ai_content, template)
+    
+    def template_thumbnail_html(self, template: str) -> str:
+        """Miniatura de la plantilla con los datos de ejemplo"""
+        return self.thumbnails.to_html(self.thumbnails.get_sample_thumbnail(template), template)
+    
+    def update_template_thumbnail(self, nombre: str, email: str, telefono: str, linkedin: str,
+                                  ubicacion: str, template_selector: str, objetivo: str,
+                                  experiencia_anos: str, experiencia_laboral: str, educacion: str,
+                                  habilidades: str, idiomas: str, certificaciones: str, proyectos: str) -> str:
+        """Mostrar la miniatura de la plantilla elegida y precalcular las del resto"""
+        if not any(value and value.strip() for value in (nombre, experiencia_laboral, habilidades)):
+            return self.template_thumbnail_html(template_selector)
+        
+        user_data = self._prepare_user_data(
+            nombre, email or "", telefono or "", linkedin, ubicacion, objetivo, experiencia_anos,
+            experiencia_laboral, educacion, habilidades, idiomas, certificaciones, proyectos
+        )
+        ai_content = self.content_generator.generate_enhanced_cv_content(user_data)
+        image = self.thumbnails.get_thumbnail(user_data, ai_content, template_selector)
+        
+        # Así el siguiente cambio de plantilla ya encuentra su miniatura en la caché
+        others = [name for name in self.pdf_generator.get_available_templates() if name != template_selector]
+        self.thumbnails.prefetch(user_data, ai_content, others)
+        
+        return self.thumbnails.to_html(image, template_selector)
+    
+    async def aclose(self) -> None:
+        """Guardar el estado pendiente (cuota, latencias, accesos de la caché, trazas) y detener el pool de PDFs"""
+        await self.ai_service.aclose()
+        if self.ai_service.cache is not None:
+            await asyncio.to_thread(self.ai_service.cache.flush)
+        await asyncio.to_thread(tracing.get_tracer().flush)
+        await asyncio.to_thread(self.pdf_engine.shutdown)
+        self.output_store.close()
     
     def save_user_data(self, user_data: Dict[str, Any]) -> None:
         """Guardar datos del usuario para autocompletado futuro"""
@@ -421,21 +591,52 @@ class CVGeneratorApp:
         except Exception as e:
             logger.warning(f"No se pudo guardar datos del usuario: {e}")
 
+def create_server(app: CVGeneratorApp, demo: gr.Blocks) -> FastAPI:
+    """Crear el servidor FastAPI con la interfaz Gradio y los endpoints de estado"""
+    
+    @asynccontextmanager
+    async def lifespan(_: FastAPI):
+        """Al parar el servidor, guardar el estado que se escribe por lotes y detener el pool de PDFs"""
+        yield
+        await app.aclose()
+    
+    server = FastAPI(lifespan=lifespan)
+    
+    @server.get("/status")
+    def status():
+        """Estado de los proveedores (circuit breakers), latencias, caché, colas y base de conocimiento"""
+        return {
+            **app.ai_service.get_status(),
+            "scheduler": app.scheduler.get_stats(),
+            "render": app.pdf_engine.get_stats(),
+            "preview": app.live_preview.get_stats(),
+            "thumbnails": app.thumbnails.get_stats(),
+            "knowledge_base": get_sector_pack().get_info(),
+            "tracing": tracing.get_tracer().get_stats(),
+            "deadline_overruns": request_deadline.get_overruns()
+        }
+    
+    @server.get("/metrics", response_class=PlainTextResponse)
+    def metrics():
+        """Histogramas de latencia por etapa y proveedor, peticiones agrupadas y plazos agotados en formato Prometheus"""
+        return PlainTextResponse(
+            tracing.get_tracer().render_metrics()
+            + single_flight.render_metrics(app.ai_service.inflight, app.pdf_engine.inflight)
+            + request_deadline.render_metrics(),
+            media_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+    
+    return gr.mount_gradio_app(server, demo, path="/", show_error=True)
+
 if __name__ == "__main__":
     # Crear y lanzar la aplicación
     app = CVGeneratorApp()
     demo = app.create_interface()
+    app.pdf_engine.warm_up()
     
-    # Configuración de lanzamiento
-    demo.launch(
-        server_name="0.0.0.0",
-        server_port=7860,
-        share=False,
-        debug=True,
-        show_error=True,
-        quiet=False,
-        favicon_path=None,
-        ssl_keyfile=None,
-        ssl_certfile=None,
-        ssl_keyfile_password=None
-    )
\ No newline at end of file
+    # Servidor con la interfaz en /, el estado del servicio en /status y las métricas en /metrics
+    uvicorn.run(
+        create_server(app, demo),
+        host="0.0.0.0",
+        port=7860
+    )
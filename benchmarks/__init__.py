@@ -0,0 +1,6 @@
+"""
+Benchmarks de rendimiento para CV Creator AI
+
+Ejecutar desde la raíz del repositorio, por ejemplo:
+    python -m benchmarks.bench_ai_concurrency
+"""
@@ -0,0 +1,72 @@
+"""
+Benchmark de throughput concurrente de AIService
+
+Lanza N generaciones simultáneas contra el servidor stub y mide cuántos CVs
+por segundo completa un único proceso. Con un transporte bloqueante el
+throughput se queda en ~1/latencia; con el cliente asíncrono escala con
+la concurrencia hasta el límite del pool de conexiones.
+
+Uso:
+    python -m benchmarks.bench_ai_concurrency --latency 0.5 --requests 64
+"""
+
+import argparse
+import asyncio
+import time
+
+from src.ai_service import AIService
+from src.adaptive_timeout import AdaptiveTimeouts
+from src.config import get_connection_limits
+from benchmarks.stub_llm_server import start_stub_server
+
+FORM_DATA = {
+    "nombre": "Ana García",
+    "email": "ana@example.com",
+    "telefono": "+34 600 000 000",
+    "experiencia_laboral": "Desarrolladora - TechCorp - 2020-2024",
+    "habilidades": "Python, Docker, AWS",
+}
+
+
+async def run_batch(service: AIService, total: int, concurrency: int) -> float:
+    """Ejecuta `total` generaciones con `concurrency` en vuelo y devuelve la duración"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            return await service.generate_cv_content(FORM_DATA, "openai", "gpt-3.5-turbo", "sk-stub")
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+
+    assert all("resumen_profesional" in r for r in results)
+    return elapsed
+
+
+async def main(latency: float, total: int, levels: list):
+    server, base_url = start_stub_server(latency=latency)
+    service = AIService(endpoints={"openai": f"{base_url}/v1/chat/completions"})
+    service.adaptive_timeouts = AdaptiveTimeouts(path=None)  # Las latencias del stub no se guardan
+
+    print(f"Latencia stub: {latency:.2f}s | peticiones por nivel: {total} | "
+          f"pool openai: {get_connection_limits('openai')['max_connections']} conexiones")
+    print(f"{'concurrencia':>12} {'duración (s)':>13} {'CVs/s':>8}")
+
+    try:
+        for concurrency in levels:
+            elapsed = await run_batch(service, total, concurrency)
+            print(f"{concurrency:>12} {elapsed:>13.2f} {total / elapsed:>8.2f}")
+    finally:
+        await service.aclose()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.5, help="Latencia simulada del proveedor (s)")
+    parser.add_argument("--requests", type=int, default=32, help="Generaciones por nivel de concurrencia")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 16, 32])
+    args = parser.parse_args()
+
+    asyncio.run(main(args.latency, args.requests, args.levels))
@@ -0,0 +1,92 @@
+"""
+Benchmark de la generación por secciones (fan-out) frente al prompt único
+
+Contra el servidor stub con velocidad de generación simulada (la latencia
+crece con los tokens de la respuesta), mide el tiempo de pared de generar un
+CV con el prompt único y con un prompt por sección en paralelo, para
+formularios con distinto número de experiencias. Informa también de las
+peticiones y los tokens de entrada y salida por CV.
+
+Uso:
+    python -m benchmarks.bench_fan_out --latency 0.3 --tokens-per-second 40 --experiences 1 3 6
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List
+
+from src.provider_stats import percentile
+from benchmarks.run_benchmarks import make_service
+from benchmarks.stub_llm_server import start_stub_server
+
+PROVIDER = "openai"
+MODEL = "gpt-3.5-turbo"
+
+
+def make_form(i: int, experiences: int) -> Dict[str, Any]:
+    """Formulario distinto por petición con `experiences` líneas de experiencia"""
+    return {
+        "nombre": f"Ana García {i}",
+        "email": f"ana{i}@example.com",
+        "objetivo": "Desarrolladora backend",
+        "experiencia_anos": "6-10 años",
+        "experiencia_laboral": "\n".join(
+            f"Desarrolladora {n} - Empresa {i}-{n} - {2024 - 2 * n - 2}-{2024 - 2 * n}" for n in range(experiences)
+        ),
+        "educacion": "Grado en Ingeniería Informática - UPM - 2012",
+        "habilidades": "Python, Docker, AWS, React, SQL, Liderazgo",
+        "idiomas": "Español - Nativo\nInglés - C1"
+    }
+
+
+async def run_mode(base_url: str, fan_out: bool, experiences: int, repeat: int) -> Dict[str, Any]:
+    """Genera `repeat` CVs seguidos y devuelve latencias y uso por CV"""
+    service = make_service(base_url)
+    latencies: List[float] = []
+    try:
+        for i in range(repeat):
+            start = time.perf_counter()
+            ai_content = await service.generate_cv_content(
+                make_form(i, experiences), PROVIDER, MODEL, "sk-stub", fan_out=fan_out
+            )
+            latencies.append(time.perf_counter() - start)
+            assert len(ai_content["experiencia_optimizada"]) == experiences
+    finally:
+        await service.aclose()
+
+    stats = service.get_provider_stats()[PROVIDER]
+    return {
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "calls": stats["calls"] / repeat,
+        "prompt_tokens": stats["prompt_tokens"] / repeat,
+        "completion_tokens": stats["completion_tokens"] / repeat
+    }
+
+
+async def main(latency: float, tokens_per_second: float, experiences: List[int], repeat: int):
+    server, base_url = start_stub_server(latency=latency, tokens_per_second=tokens_per_second)
+    print(f"Latencia stub: {latency:.2f}s + {tokens_per_second:g} tokens/s | {repeat} CVs por caso")
+    print(f"{'experiencias':>12} {'modo':>10} {'p50 (s)':>8} {'p95 (s)':>8} "
+          f"{'peticiones':>10} {'tok. entrada':>12} {'tok. salida':>11}")
+    try:
+        for count in experiences:
+            for fan_out in (False, True):
+                result = await run_mode(base_url, fan_out, count, repeat)
+                print(f"{count:>12} {'secciones' if fan_out else 'único':>10} {result['p50']:>8.2f} "
+                      f"{result['p95']:>8.2f} {result['calls']:>10.1f} {result['prompt_tokens']:>12.0f} "
+                      f"{result['completion_tokens']:>11.0f}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.3, help="Latencia hasta el primer token (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=40.0, help="Velocidad de generación simulada")
+    parser.add_argument("--experiences", type=int, nargs="+", default=[1, 3, 6])
+    parser.add_argument("--repeat", type=int, default=5, help="CVs generados por caso")
+    args = parser.parse_args()
+
+    asyncio.run(main(args.latency, args.tokens_per_second, args.experiences, args.repeat))
@@ -0,0 +1,117 @@
+"""
+Benchmark de la extracción del JSON de las respuestas de IA
+
+Compara la limpieza anterior (quitar las vallas markdown, recortar de la
+primera "{" a la última "}" y json.loads) con extract_json sobre un corpus de
+salidas de modelos (benchmarks/data/model_outputs.jsonl: respuestas limpias,
+con markdown, con texto alrededor, con comas finales y truncadas por
+max_tokens). Además corta cada respuesta completa en varios puntos para medir
+la recuperación de respuestas truncadas. Informa de la tasa de respuestas
+utilizables y del coste de CPU por respuesta.
+
+Uso:
+    python -m benchmarks.bench_json_extract --repeat 200 --cuts 20
+"""
+
+import argparse
+import json
+import os
+import time
+from collections import Counter
+
+from src.ai_service import AIService
+from src.json_stream import extract_json
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "model_outputs.jsonl")
+REQUIRED_KEYS = ("resumen_profesional", "experiencia_optimizada", "habilidades_organizadas")
+
+FORM_DATA = {
+    "nombre": "Ana García",
+    "email": "ana@example.com",
+    "telefono": "+34 600 000 000",
+    "experiencia_laboral": "Backend Engineer - Fintech Iberia - 2021-2024",
+    "habilidades": "Python, Django, PostgreSQL",
+}
+
+
+def legacy_parse(response: str):
+    """Limpieza previa a extract_json (replace/find/rfind y json.loads)"""
+    cleaned = response.strip()
+    if cleaned.startswith("```json"):
+        cleaned = cleaned.replace("```json", "").replace("```", "").strip()
+    elif cleaned.startswith("```"):
+        cleaned = cleaned.replace("```", "").strip()
+    start_idx = cleaned.find("{")
+    end_idx = cleaned.rfind("}")
+    if start_idx != -1 and end_idx != -1:
+        cleaned = cleaned[start_idx:end_idx + 1]
+    try:
+        content = json.loads(cleaned)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(content, dict) or not all(key in content for key in REQUIRED_KEYS):
+        return None
+    return content
+
+
+def load_corpus(path: str, cuts: int) -> dict:
+    """Corpus original y respuestas completas cortadas en `cuts` puntos"""
+    with open(path, encoding="utf-8") as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+    truncated = []
+    for entry in corpus:
+        output = entry["output"]
+        if legacy_parse(output) is None:
+            continue
+        for i in range(1, cuts + 1):
+            truncated.append({"provider": entry["provider"], "kind": "cut",
+                              "output": output[:len(output) * i // (cuts + 1)]})
+    return {"corpus": corpus, "cortes": truncated}
+
+
+def classify(service: AIService, output: str) -> str:
+    content, complete = service._parse_ai_response(output, FORM_DATA)
+    if content is None:
+        return "fallo"
+    return "completo" if complete else "recuperado"
+
+
+def cpu_cost(fn, outputs: list, repeat: int) -> float:
+    """Microsegundos medios por respuesta"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for output in outputs:
+            fn(output)
+    return (time.perf_counter() - start) / (repeat * len(outputs)) * 1e6
+
+
+def main(path: str, repeat: int, cuts: int):
+    service = AIService()
+    datasets = load_corpus(path, cuts)
+
+    for name, entries in datasets.items():
+        outputs = [entry["output"] for entry in entries]
+        legacy_ok = sum(legacy_parse(output) is not None for output in outputs)
+        outcomes = Counter(classify(service, output) for output in outputs)
+        usable = outcomes["completo"] + outcomes["recuperado"]
+
+        print(f"\n{name}: {len(outputs)} respuestas")
+        print(f"  anterior      utilizables {legacy_ok:>4} ({legacy_ok / len(outputs):.0%})  "
+              f"{cpu_cost(legacy_parse, outputs, repeat):8.1f} µs/resp")
+        print(f"  extract_json  utilizables {usable:>4} ({usable / len(outputs):.0%})  "
+              f"{cpu_cost(extract_json, outputs, repeat):8.1f} µs/resp  "
+              f"[completas {outcomes['completo']}, recuperadas {outcomes['recuperado']}, fallos {outcomes['fallo']}]")
+
+        if name == "corpus":
+            failures = Counter(entry["kind"] for entry in entries if legacy_parse(entry["output"]) is None)
+            print("  fallos anteriores por tipo:", dict(failures))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=CORPUS_PATH, help="JSONL con {provider, kind, output} por línea")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--cuts", type=int, default=20, help="Puntos de corte por respuesta completa")
+    args = parser.parse_args()
+
+    main(args.corpus, args.repeat, args.cuts)
@@ -0,0 +1,113 @@
+"""
+Microbenchmark del matcher de palabras clave
+
+Compara el escaneo ingenuo (`indicador in texto` por cada palabra clave, como
+hacía detect_sector) con KeywordMatcher, que recorre el texto una sola vez,
+variando la longitud de la experiencia y el número de palabras clave. También
+mide la deduplicación de habilidades de _optimize_skills_for_ats frente a la
+versión anterior con `any(...)` anidados.
+
+Uso:
+    python -m benchmarks.bench_keyword_matcher --repeat 5
+"""
+
+import argparse
+import random
+import string
+import time
+
+from src.keyword_matcher import KeywordMatcher
+
+BASE_TEXT = (
+    "Desarrolladora backend con experiencia en Python, React y APIs REST. "
+    "Gestión de campañas de marketing digital, SEO y social media. "
+    "Negociación con clientes, pipeline comercial y CRM. Diseño UX con Figma. "
+)
+
+
+def make_keywords(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    keywords = set()
+    while len(keywords) < count:
+        words = rng.randint(1, 3)
+        keywords.add(" ".join(
+            "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(words)
+        ))
+    return sorted(keywords)
+
+
+def make_text(words: int, keywords: list, seed: int = 11) -> str:
+    rng = random.Random(seed)
+    base = BASE_TEXT.split()
+    out = []
+    while len(out) < words:
+        out.extend(base)
+        out.append(rng.choice(keywords))
+    return " ".join(out[:words])
+
+
+def naive_scores(groups: dict, text: str) -> dict:
+    text = text.lower()
+    return {group: sum(1 for keyword in keywords if keyword in text) for group, keywords in groups.items()}
+
+
+def naive_dedupe(skills: list, keywords: list) -> list:
+    added = list(skills)
+    for keyword in keywords:
+        if not any(keyword.lower() in existing.lower() for existing in added):
+            added.append(keyword)
+    return added
+
+
+def matcher_dedupe(matcher: KeywordMatcher, skills: list, keywords: list) -> list:
+    added = list(skills)
+    present = matcher.keywords_in("\n".join(skills))
+    for keyword in keywords:
+        if keyword.lower() not in present:
+            added.append(keyword)
+            present |= matcher.keywords_in(keyword)
+    return added
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(repeat: int):
+    print("Puntuación por grupos (mejor de", repeat, "repeticiones)")
+    print(f"{'keywords':>9} {'palabras':>9} {'ingenuo (ms)':>13} {'matcher (ms)':>13} {'compilar (ms)':>14}")
+    for keyword_count in (50, 500, 5000):
+        keywords = make_keywords(keyword_count)
+        groups = {f"g{i}": keywords[i::4] for i in range(4)}
+        start = time.perf_counter()
+        matcher = KeywordMatcher(groups)
+        compile_time = time.perf_counter() - start
+        for words in (1_000, 10_000, 100_000):
+            text = make_text(words, keywords)
+            naive = timed(lambda: naive_scores(groups, text), repeat)
+            fast = timed(lambda: matcher.score(text), repeat)
+            print(f"{keyword_count:>9} {words:>9} {naive * 1000:>13.2f} {fast * 1000:>13.2f} {compile_time * 1000:>14.1f}")
+
+    print()
+    print("Deduplicación de habilidades")
+    print(f"{'habilidades':>11} {'keywords':>9} {'any() anidado (ms)':>19} {'matcher (ms)':>13}")
+    for count in (50, 500, 2000):
+        keywords = make_keywords(count, seed=3)
+        skills = make_keywords(count, seed=5)
+        matcher = KeywordMatcher({"sector": keywords})
+        naive = timed(lambda: naive_dedupe(skills, keywords), repeat)
+        fast = timed(lambda: matcher_dedupe(matcher, skills, keywords), repeat)
+        print(f"{count:>11} {count:>9} {naive * 1000:>19.2f} {fast * 1000:>13.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    main(args.repeat)
@@ -0,0 +1,81 @@
+"""
+Benchmark de la vista previa en vivo
+
+Simula una sesión de edición (una tecla cada vez en distintos campos) y mide
+la latencia por edición de generar el PDF completo frente a LivePreview, que
+solo recalcula la sección modificada. Ambos parten del mismo contenido local
+de ContentGenerator, que también se regenera en cada edición.
+
+Uso:
+    python -m benchmarks.bench_live_preview --edits 200 --jobs 6
+"""
+
+import argparse
+import statistics
+import time
+
+from src.content_generator import ContentGenerator
+from src.live_preview import LivePreview
+from src.pdf_generator import PDFGenerator
+
+# Campos editados en rotación y texto que se va tecleando en ellos
+EDITED_FIELDS = ("nombre", "idiomas", "educacion", "ubicacion", "habilidades")
+TYPED_TEXT = "Gestión de proyectos internacionales "
+
+
+def make_form(jobs: int) -> dict:
+    experiencia = "\n".join(
+        f"Desarrolladora Senior - Empresa {i} - {2010 + i}-{2011 + i}" for i in range(jobs)
+    )
+    return {
+        "nombre": "Ana Pérez", "email": "ana@example.com", "telefono": "+34 600 000 000",
+        "linkedin": "linkedin.com/in/ana", "ubicacion": "Madrid", "objetivo": "Desarrolladora backend",
+        "experiencia_anos": "6-10 años", "experiencia_laboral": experiencia,
+        "educacion": "Grado en Ingeniería Informática\nMáster en IA",
+        "habilidades": "Python, React, SQL, Docker", "idiomas": "Inglés C1\nFrancés B2",
+        "certificaciones": "", "proyectos": ""
+    }
+
+
+def percentile(values: list, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * pct), len(ordered) - 1)]
+
+
+def run(edits: int, jobs: int, render) -> list:
+    form = make_form(jobs)
+    content_generator = ContentGenerator()
+    latencies = []
+    for i in range(edits):
+        field = EDITED_FIELDS[(i // 20) % len(EDITED_FIELDS)]
+        form[field] += TYPED_TEXT[i % len(TYPED_TEXT)]
+        start = time.perf_counter()
+        render(form, content_generator.generate_enhanced_cv_content(form))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main(edits: int, jobs: int, template: str):
+    pdf_generator = PDFGenerator()
+    preview = LivePreview(pdf_generator)
+
+    results = {
+        "PDF completo": run(edits, jobs, lambda form, content: pdf_generator.create_cv_pdf_bytes(form, content, template)),
+        "vista previa": run(edits, jobs, lambda form, content: preview.render(form, content, template)),
+    }
+
+    print(f"{edits} ediciones, {jobs} experiencias, plantilla {template}")
+    print(f"{'':>14} {'p50 (ms)':>9} {'p95 (ms)':>9} {'máx (ms)':>9}")
+    for name, latencies in results.items():
+        print(f"{name:>14} {statistics.median(latencies):>9.2f} {percentile(latencies, 0.95):>9.2f} {max(latencies):>9.2f}")
+    print("caché de secciones:", preview.get_stats())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--edits", type=int, default=200)
+    parser.add_argument("--jobs", type=int, default=6)
+    parser.add_argument("--template", default="modern")
+    args = parser.parse_args()
+
+    main(args.edits, args.jobs, args.template)
@@ -0,0 +1,78 @@
+"""
+Benchmark de CVs renderizados por segundo con PDFRenderEngine
+
+Compara el render en línea (un solo hilo, como hacía create_cv_pdf en el
+hilo de la petición) con el pool de procesos usando de 1 a N workers.
+
+Uso:
+    python -m benchmarks.bench_pdf_render --renders 64 --max-workers 4
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from src.content_generator import ContentGenerator
+from src.pdf_generator import PDFGenerator
+from src.render_engine import PDFRenderEngine
+
+FORM_DATA = {
+    "nombre": "Ana García",
+    "email": "ana@example.com",
+    "telefono": "+34 600 000 000",
+    "ubicacion": "Madrid",
+    "linkedin": "linkedin.com/in/anagarcia",
+    "experiencia_laboral": "Desarrolladora Senior - TechCorp - 2020-2024\nDesarrolladora - WebCo - 2016-2020",
+    "educacion": "Grado en Ingeniería Informática - UPM - 2016",
+    "habilidades": "Python, Docker, AWS, React, SQL, Liderazgo",
+    "idiomas": "Español - Nativo\nInglés - C1",
+}
+
+TEMPLATES = ["modern", "executive", "creative", "technical"]
+
+
+def bench_inline(renders: int) -> float:
+    generator = PDFGenerator()
+    ai_content = ContentGenerator().generate_fallback_content(FORM_DATA)
+    start = time.perf_counter()
+    for i in range(renders):
+        generator.create_cv_pdf_bytes(FORM_DATA, ai_content, TEMPLATES[i % len(TEMPLATES)])
+    return time.perf_counter() - start
+
+
+async def bench_pool(renders: int, workers: int) -> float:
+    engine = PDFRenderEngine(max_workers=workers, max_pending=renders)
+    engine.warm_up()
+    ai_content = ContentGenerator().generate_fallback_content(FORM_DATA)
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            engine.render(FORM_DATA, ai_content, TEMPLATES[i % len(TEMPLATES)])
+            for i in range(renders)
+        ))
+        elapsed = time.perf_counter() - start
+    finally:
+        engine.shutdown()
+    return elapsed
+
+
+async def main(renders: int, max_workers: int):
+    print(f"CPUs disponibles: {os.cpu_count()} | renders por medida: {renders}")
+    print(f"{'modo':>14} {'duración (s)':>13} {'CVs/s':>8}")
+
+    elapsed = bench_inline(renders)
+    print(f"{'en línea':>14} {elapsed:>13.2f} {renders / elapsed:>8.1f}")
+
+    for workers in range(1, max_workers + 1):
+        elapsed = await bench_pool(renders, workers)
+        print(f"{f'pool x{workers}':>14} {elapsed:>13.2f} {renders / elapsed:>8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--renders", type=int, default=64)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.renders, args.max_workers))
@@ -0,0 +1,69 @@
+"""
+Benchmark de arranque y memoria de las plantillas PDF
+
+Mide el coste de importar pdf_generator, de crear el primer PDFGenerator (que
+construye los estilos en template_registry) y de cada instancia posterior,
+junto con la memoria asignada por instancia. Como referencia mide también lo
+que hacía cada PDFGenerator con las antiguas subclases de plantilla: una hoja
+getSampleStyleSheet() y sus cinco ParagraphStyle por cada plantilla.
+
+Uso:
+    python -m benchmarks.bench_template_startup --instances 200
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from reportlab.lib.styles import getSampleStyleSheet
+
+
+def build_subclass_templates(template_registry) -> dict:
+    """Plantillas como las construía cada PDFGenerator antes del registro (hoja de estilos propia por plantilla)"""
+    # Mismos temas y estilos que el registro, pero sin compartir nada entre instancias
+    return {
+        name: template_registry._build_template(name, theme, getSampleStyleSheet())
+        for name, theme in template_registry._themes.items()
+    }
+
+
+def measure(create, instances: int):
+    """(primera instancia, tiempo por instancia, memoria por instancia) de create()"""
+    start = time.perf_counter()
+    create()
+    first_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(instances):
+        create()
+    per_instance = (time.perf_counter() - start) / instances
+
+    tracemalloc.start()
+    objects = [create() for _ in range(instances)]
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first_time, per_instance, allocated / len(objects)
+
+
+def main(instances: int):
+    start = time.perf_counter()
+    from src import template_registry
+    from src.pdf_generator import PDFGenerator
+    import_time = time.perf_counter() - start
+
+    baseline = measure(lambda: build_subclass_templates(template_registry), instances)
+    current = measure(PDFGenerator, instances)
+
+    print(f"{'importación':>22} {import_time * 1000:>10.1f} ms")
+    print(f"{'':>22} {'subclases':>12} {'registro':>12}")
+    print(f"{'primera instancia':>22} {baseline[0] * 1000:>9.2f} ms {current[0] * 1000:>9.2f} ms")
+    print(f"{'por instancia':>22} {baseline[1] * 1000:>9.3f} ms {current[1] * 1000:>9.3f} ms")
+    print(f"{'memoria por instancia':>22} {baseline[2] / 1024:>8.1f} KiB {current[2] / 1024:>8.1f} KiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--instances", type=int, default=200)
+    args = parser.parse_args()
+
+    main(args.instances)
@@ -0,0 +1,317 @@
+"""
+Suite de benchmarks de extremo a extremo
+
+Mide, a varios niveles de concurrencia, la latencia (p50/p95/p99) y el
+throughput de:
+    content  ContentGenerator.generate_enhanced_cv_content (hilos)
+    pdf      PDFGenerator.create_cv_pdf_bytes (hilos)
+    ai       AIService.generate_cv_content contra el servidor stub, un
+             resultado por proveedor de API_CONFIGS
+    e2e      AIService + render del PDF en PDFRenderEngine, como la app
+
+Los resultados se guardan en JSON junto con el commit, para comparar entre
+commits con --compare. Cada petición usa datos distintos, así que la caché de
+respuestas no interviene; el rate limiter se desactiva para medir el
+pipeline y no los límites de los tiers gratuitos.
+
+Uso:
+    python -m benchmarks.run_benchmarks --levels 1 4 16 --requests 64
+    python -m benchmarks.run_benchmarks --scenarios ai --error-rate 0.05 --malformed-rate 0.05
+    python -m benchmarks.run_benchmarks --compare benchmarks/results/abc1234.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+
+from src.ai_service import AIService
+from src.adaptive_timeout import AdaptiveTimeouts
+from src.config import API_CONFIGS
+from src.content_generator import ContentGenerator
+from src.pdf_generator import PDFGenerator
+from src.provider_stats import percentile
+from src.rate_limiter import RateLimiter
+from src.render_engine import PDFRenderEngine
+from benchmarks.stub_llm_server import start_stub_server, stub_endpoints
+
+SCENARIOS = ("content", "pdf", "ai", "e2e")
+STUB_PROVIDERS = [provider for provider, config in API_CONFIGS.items() if config.get("endpoint")]
+TEMPLATES = ["modern", "executive", "creative", "technical"]
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def make_form(i: int) -> Dict[str, Any]:
+    """Formulario distinto por petición (evita aciertos de la caché de respuestas)"""
+    return {
+        "nombre": f"Ana García {i}",
+        "email": f"ana{i}@example.com",
+        "telefono": "+34 600 000 000",
+        "ubicacion": "Madrid",
+        "linkedin": "linkedin.com/in/anagarcia",
+        "objetivo": "Desarrolladora backend",
+        "experiencia_anos": "6-10 años",
+        "experiencia_laboral": f"Desarrolladora Senior - TechCorp - 2020-2024\nDesarrolladora - WebCo {i} - 2016-2020",
+        "educacion": "Grado en Ingeniería Informática - UPM - 2016",
+        "habilidades": "Python, Docker, AWS, React, SQL, Liderazgo",
+        "idiomas": "Español - Nativo\nInglés - C1",
+        "certificaciones": "",
+        "proyectos": ""
+    }
+
+
+def summarize(scenario: str, provider: Optional[str], concurrency: int, latencies: List[float],
+              elapsed: float, errors: int = 0, fallbacks: int = 0) -> Dict[str, Any]:
+    """Resultado de un nivel: percentiles en ms y peticiones completadas por segundo"""
+    completed = len(latencies)
+    return {
+        "scenario": scenario,
+        "provider": provider,
+        "concurrency": concurrency,
+        "requests": completed + errors,
+        "errors": errors,
+        "fallbacks": fallbacks,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(sum(latencies) / completed * 1000, 2) if completed else 0.0,
+        "throughput_rps": round(completed / elapsed, 2) if elapsed else 0.0
+    }
+
+
+def run_threaded(fn, total: int, concurrency: int):
+    """Ejecuta fn(i) `total` veces con `concurrency` hilos; devuelve (latencias, errores, duración)"""
+    def timed(i: int) -> float:
+        start = time.perf_counter()
+        fn(i)
+        return time.perf_counter() - start
+
+    latencies, errors = [], 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for future in [pool.submit(timed, i) for i in range(total)]:
+            try:
+                latencies.append(future.result())
+            except Exception:
+                errors += 1
+    return latencies, errors, time.perf_counter() - start
+
+
+async def run_async(fn, total: int, concurrency: int):
+    """Ejecuta await fn(i) `total` veces con `concurrency` en vuelo; devuelve (latencias, resultados, errores, duración)"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, results, errors = [], [], 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                result = await fn(i)
+            except Exception:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+            results.append(result)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return latencies, results, errors, time.perf_counter() - start
+
+
+def is_fallback(ai_content: Dict[str, Any]) -> bool:
+    """El contenido de ContentGenerator incluye el sector detectado; el de la IA no"""
+    return "sector_detectado" in ai_content
+
+
+def bench_content(total: int, levels: List[int]) -> List[Dict[str, Any]]:
+    generator = ContentGenerator()
+    generator.generate_enhanced_cv_content(make_form(0))  # Carga la base de conocimiento antes de medir
+    results = []
+    for concurrency in levels:
+        latencies, errors, elapsed = run_threaded(
+            lambda i: generator.generate_enhanced_cv_content(make_form(i)), total, concurrency
+        )
+        results.append(summarize("content", None, concurrency, latencies, elapsed, errors))
+    return results
+
+
+def bench_pdf(total: int, levels: List[int]) -> List[Dict[str, Any]]:
+    generator = PDFGenerator()
+    ai_content = ContentGenerator().generate_fallback_content(make_form(0))
+    generator.create_cv_pdf_bytes(make_form(0), ai_content)  # Primer render (fuentes) fuera de la medida
+    results = []
+    for concurrency in levels:
+        latencies, errors, elapsed = run_threaded(
+            lambda i: generator.create_cv_pdf_bytes(make_form(i), ai_content, TEMPLATES[i % len(TEMPLATES)]),
+            total, concurrency
+        )
+        results.append(summarize("pdf", None, concurrency, latencies, elapsed, errors))
+    return results
+
+
+def make_service(base_url: str) -> AIService:
+    """AIService apuntando al stub, sin caché de respuestas, límites de peticiones ni histogramas guardados"""
+    service = AIService(endpoints=stub_endpoints(base_url))
+    service.cache = None
+    service.rate_limiter = RateLimiter(provider_limits={}, usage_path=None)
+    service.adaptive_timeouts = AdaptiveTimeouts(path=None)  # Las latencias del stub no se guardan
+    return service
+
+
+async def bench_ai(base_url: str, providers: List[str], total: int, levels: List[int]) -> List[Dict[str, Any]]:
+    results = []
+    for provider in providers:
+        model = next(iter(API_CONFIGS[provider]["models"]))
+        for concurrency in levels:
+            # Servicio nuevo por nivel: circuit breakers y pools de conexiones limpios
+            service = make_service(base_url)
+            try:
+                latencies, contents, errors, elapsed = await run_async(
+                    lambda i: service.generate_cv_content(make_form(i), provider, model, "sk-stub"),
+                    total, concurrency
+                )
+            finally:
+                await service.aclose()
+            fallbacks = sum(1 for content in contents if is_fallback(content))
+            results.append(summarize("ai", provider, concurrency, latencies, elapsed, errors, fallbacks))
+    return results
+
+
+async def bench_e2e(base_url: str, provider: str, total: int, levels: List[int]) -> List[Dict[str, Any]]:
+    model = next(iter(API_CONFIGS[provider]["models"]))
+    engine = PDFRenderEngine(max_pending=max(levels))
+    engine.warm_up()
+    results = []
+    try:
+        for concurrency in levels:
+            service = make_service(base_url)
+            fallbacks = 0
+
+            async def generate(i: int):
+                nonlocal fallbacks
+                form = make_form(i)
+                ai_content = await service.generate_cv_content(form, provider, model, "sk-stub")
+                fallbacks += is_fallback(ai_content)
+                return await engine.render(form, ai_content, TEMPLATES[i % len(TEMPLATES)])
+
+            try:
+                latencies, _, errors, elapsed = await run_async(generate, total, concurrency)
+            finally:
+                await service.aclose()
+            results.append(summarize("e2e", provider, concurrency, latencies, elapsed, errors, fallbacks))
+    finally:
+        engine.shutdown()
+    return results
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: List[Dict[str, Any]]):
+    print(f"{'escenario':>9} {'proveedor':>16} {'conc.':>5} {'p50 (ms)':>9} {'p95 (ms)':>9} "
+          f"{'p99 (ms)':>9} {'req/s':>8} {'errores':>7} {'fallback':>8}")
+    for r in results:
+        print(f"{r['scenario']:>9} {r['provider'] or '-':>16} {r['concurrency']:>5} {r['p50_ms']:>9.2f} "
+              f"{r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['throughput_rps']:>8.2f} {r['errors']:>7} {r['fallbacks']:>8}")
+
+
+def print_comparison(results: List[Dict[str, Any]], baseline_path: str):
+    """Diferencia porcentual de p50, p95 y throughput frente a un JSON anterior"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(r["scenario"], r["provider"], r["concurrency"]): r for r in baseline["results"]}
+
+    def delta(new: float, old: float) -> str:
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    print(f"\nComparación con {baseline.get('commit') or baseline_path}:")
+    print(f"{'escenario':>9} {'proveedor':>16} {'conc.':>5} {'p50':>8} {'p95':>8} {'req/s':>8}")
+    for r in results:
+        old = previous.get((r["scenario"], r["provider"], r["concurrency"]))
+        if old is None:
+            continue
+        print(f"{r['scenario']:>9} {r['provider'] or '-':>16} {r['concurrency']:>5} "
+              f"{delta(r['p50_ms'], old['p50_ms']):>8} {delta(r['p95_ms'], old['p95_ms']):>8} "
+              f"{delta(r['throughput_rps'], old['throughput_rps']):>8}")
+
+
+async def main(args) -> Dict[str, Any]:
+    server, base_url = start_stub_server(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        malformed_rate=args.malformed_rate, seed=args.seed
+    )
+    results = []
+    try:
+        if "content" in args.scenarios:
+            results += bench_content(args.requests, args.levels)
+        if "pdf" in args.scenarios:
+            results += bench_pdf(args.requests, args.levels)
+        if "ai" in args.scenarios:
+            results += await bench_ai(base_url, args.providers, args.requests, args.levels)
+        if "e2e" in args.scenarios:
+            results += await bench_e2e(base_url, args.e2e_provider, args.requests, args.levels)
+    finally:
+        server.shutdown()
+
+    return {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "settings": {
+            "requests": args.requests,
+            "levels": args.levels,
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "error_rate": args.error_rate,
+            "malformed_rate": args.malformed_rate,
+            "seed": args.seed
+        },
+        "stub": dict(server.stats),
+        "results": results
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--providers", nargs="+", choices=STUB_PROVIDERS, default=STUB_PROVIDERS,
+                        help="Proveedores del escenario ai")
+    parser.add_argument("--e2e-provider", choices=STUB_PROVIDERS, default="openai")
+    parser.add_argument("--requests", type=int, default=32, help="Peticiones por nivel de concurrencia")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--latency", type=float, default=0.2, help="Latencia media del stub (s)")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Variación máxima de la latencia (± s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fracción de respuestas 500 del stub")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fracción de respuestas con JSON truncado")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", help="Archivo JSON de resultados (por defecto benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="JSON de una ejecución anterior con el que comparar")
+    args = parser.parse_args()
+
+    report = asyncio.run(main(args))
+    print_results(report["results"])
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados guardados en {output}")
+
+    if args.compare:
+        print_comparison(report["results"], args.compare)
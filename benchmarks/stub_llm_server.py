@@ -0,0 +1,301 @@
+"""
+Servidor HTTP local que simula los proveedores LLM
+
+Responde con el formato de cada API de API_CONFIGS según la ruta del endpoint
+(chat de OpenAI/Groq, mensajes de Anthropic, generate de Cohere, inference de
+Together, generate de Ollama e inference de Hugging Face) tras una latencia
+configurable con jitter, para medir el comportamiento de AIService sin
+depender de la red ni de API keys reales. Una fracción configurable de las
+peticiones responde con error 500 y otra con un JSON de CV truncado. Con
+"stream": true (OpenAI, Anthropic y Ollama) reparte la respuesta en eventos a
+lo largo de la latencia.
+
+La respuesta contiene las secciones del CV que pide el prompt (todas o solo
+la de un prompt por secciones) con una experiencia por cada línea "Puesto -
+Empresa - Periodo" del prompt. Con --tokens-per-second la latencia crece con
+la longitud de la respuesta, como en un modelo real.
+
+Uso independiente:
+    python -m benchmarks.stub_llm_server --port 8000 --latency 0.5 --jitter 0.1
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from src.config import API_CONFIGS
+
+CV_JSON = {
+    "resumen_profesional": "Desarrollador Senior con 8 años de experiencia en Python y arquitecturas cloud.",
+    "experiencia_optimizada": [
+        {
+            "puesto": "Desarrollador Senior",
+            "empresa": "TechCorp",
+            "periodo": "2020-2024",
+            "descripcion": [
+                "Diseñé microservicios en Python que redujeron la latencia un 40%",
+                "Lideré un equipo de 5 desarrolladores con metodología Scrum"
+            ]
+        }
+    ],
+    "habilidades_organizadas": {
+        "tecnicas": ["Python", "Docker", "AWS"],
+        "blandas": ["Liderazgo", "Comunicación"],
+        "herramientas": ["Git", "Jira"]
+    }
+}
+
+# Ruta del endpoint de cada proveedor -> proveedor (Hugging Face añade el modelo a la ruta)
+_ROUTES = {
+    urlparse(config["endpoint"]).path: provider
+    for provider, config in API_CONFIGS.items()
+    if config.get("endpoint") and provider != "huggingface_free"
+}
+_HF_PREFIX = urlparse(API_CONFIGS["huggingface_free"]["endpoint"]).path
+
+# Bloque de experiencia del prompt (hasta una línea vacía o el título de otro bloque)
+# y sus líneas "Puesto - Empresa - Periodo"
+_EXPERIENCE_BLOCK = re.compile(r"experiencia laboral:\n((?:[^\n]*[^:\n]\n?)*)", re.IGNORECASE)
+_EXPERIENCE_LINE = re.compile(r"^([^:\n]+?) - ([^\n]+?)(?: - ([^\n]+))?$", re.MULTILINE)
+
+
+def stub_endpoints(base_url: str) -> Dict[str, str]:
+    """Endpoints de AIService (proveedor -> URL) que apuntan al servidor stub"""
+    return {
+        provider: base_url + urlparse(config["endpoint"]).path
+        for provider, config in API_CONFIGS.items()
+        if config.get("endpoint")
+    }
+
+
+def _content_for(prompt: str) -> dict:
+    """Secciones del CV que pide el prompt, con una experiencia por línea de experiencia"""
+    content = {key: value for key, value in CV_JSON.items() if f'"{key}"' in prompt} or dict(CV_JSON)
+    block = _EXPERIENCE_BLOCK.search(prompt)
+    lines = _EXPERIENCE_LINE.findall(block.group(1)) if block else []
+    if "experiencia_optimizada" in content and lines:
+        template = CV_JSON["experiencia_optimizada"][0]
+        content["experiencia_optimizada"] = [
+            {**template, "puesto": puesto, "empresa": empresa, "periodo": periodo or template["periodo"]}
+            for puesto, empresa, periodo in lines
+        ]
+    return content
+
+
+def _response_body(provider: str, model: str, prompt: str, content: str):
+    """Cuerpo de respuesta sin streaming en el formato del proveedor"""
+    if provider in ("openai", "groq"):
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4}
+        }
+    if provider == "anthropic":
+        return {
+            "id": "msg_stub",
+            "type": "message",
+            "role": "assistant",
+            "model": model,
+            "content": [{"type": "text", "text": content}],
+            "stop_reason": "end_turn",
+            "usage": {"input_tokens": len(prompt) // 4, "output_tokens": len(content) // 4}
+        }
+    if provider == "cohere":
+        return {"id": "stub", "generations": [{"id": "stub-0", "text": content}]}
+    if provider == "together":
+        return {"status": "finished", "output": {"choices": [{"text": content}]}}
+    if provider == "ollama_local":
+        return {"model": model, "created_at": "2024-01-01T00:00:00Z", "response": content, "done": True,
+                "prompt_eval_count": len(prompt) // 4, "eval_count": len(content) // 4}
+    # Hugging Face (text-generation) devuelve el prompt seguido del texto generado
+    return [{"generated_text": f"{prompt}{content}"}]
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    """Handler que simula el endpoint de cada proveedor según la ruta"""
+
+    protocol_version = "HTTP/1.1"  # Permite keep-alive
+    disable_nagle_algorithm = True  # Cabeceras y cuerpo van en escrituras separadas
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+
+        path = urlparse(self.path).path
+        provider = _ROUTES.get(path) or ("huggingface_free" if path.startswith(_HF_PREFIX) else None)
+        if provider is None:
+            self._send_json(404, {"error": {"message": f"Ruta desconocida: {path}"}})
+            return
+
+        messages = request.get("messages") or []
+        prompt = (request.get("inputs") or request.get("prompt")
+                  or "".join(message.get("content", "") for message in messages if message.get("role") == "user"))
+
+        delay, outcome = self.server.draw()
+        content = json.dumps(_content_for(prompt), ensure_ascii=False)
+        if self.server.tokens_per_second:
+            delay += len(content) / 4 / self.server.tokens_per_second
+        if outcome == "malformed":
+            content = content[:len(content) // 2]  # Como una respuesta cortada por max_tokens
+        if messages and messages[-1].get("role") == "assistant":
+            # Prefill del asistente: la respuesta continúa tras él sin repetirlo
+            prefill = messages[-1].get("content", "")
+            if content.startswith(prefill):
+                content = content[len(prefill):]
+
+        if request.get("stream") and provider in ("openai", "groq", "anthropic", "ollama_local") and outcome != "error":
+            self._stream_response(provider, content, delay)
+            return
+
+        time.sleep(delay)
+        if outcome == "error":
+            self._send_json(500, {"error": {"message": "Error simulado del servidor stub"}})
+            return
+
+        self._send_json(200, _response_body(provider, request.get("model", ""), prompt, content))
+
+    def _send_json(self, status: int, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream_response(self, provider: str, content: str, delay: float, chunk_size: int = 24):
+        """Envía el contenido en eventos SSE (OpenAI, Anthropic) o NDJSON (Ollama) repartidos en la latencia"""
+        chunks = [content[i:i + chunk_size] for i in range(0, len(content), chunk_size)]
+        chunk_delay = delay / len(chunks)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson" if provider == "ollama_local" else "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        if provider == "anthropic":
+            self._write_event({"type": "message_start", "message": {"id": "msg_stub", "role": "assistant"}})
+            self._write_event({"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}})
+
+        for chunk in chunks:
+            time.sleep(chunk_delay)
+            if provider == "ollama_local":
+                self.wfile.write((json.dumps({"response": chunk, "done": False}) + "\n").encode("utf-8"))
+                self.wfile.flush()
+            elif provider == "anthropic":
+                self._write_event({"type": "content_block_delta", "index": 0,
+                                   "delta": {"type": "text_delta", "text": chunk}})
+            else:
+                self._write_event({"choices": [{"delta": {"content": chunk}}]})
+
+        if provider == "ollama_local":
+            self.wfile.write(b'{"response": "", "done": true}\n')
+        elif provider == "anthropic":
+            self._write_event({"type": "content_block_stop", "index": 0})
+            self._write_event({"type": "message_stop"})
+        else:
+            self.wfile.write(b"data: [DONE]\n\n")
+
+    def _write_event(self, event: dict):
+        self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        pass  # Silenciar el log por petición
+
+
+class StubLLMServer(ThreadingHTTPServer):
+    """Servidor stub con latencia, jitter, velocidad de generación y tasas de error y de JSON malformado"""
+
+    daemon_threads = True
+    request_queue_size = 128  # Con el backlog por defecto (5) los connect simultáneos esperan al reintento de SYN
+
+    def __init__(self, address: Tuple[str, int], latency: float = 0.5, jitter: float = 0.0,
+                 error_rate: float = 0.0, malformed_rate: float = 0.0, seed: Optional[int] = None,
+                 tokens_per_second: float = 0.0):
+        super().__init__(address, StubLLMHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second  # 0 = latencia independiente de la respuesta
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "malformed": 0}
+
+    def handle_error(self, request, client_address):
+        # Los clientes cancelan peticiones (hedged, plazo blando): no es un error del stub
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+    def draw(self) -> Tuple[float, str]:
+        """
+        Sortea la latencia y el resultado de una petición
+
+        Returns:
+            tuple: (segundos de espera, "ok" | "error" | "malformed"); la latencia
+                   es uniforme en [latency - jitter, latency + jitter]
+        """
+        with self._lock:
+            delay = max(self.latency + self._random.uniform(-self.jitter, self.jitter), 0.0)
+            roll = self._random.random()
+            if roll < self.error_rate:
+                outcome = "error"
+            elif roll < self.error_rate + self.malformed_rate:
+                outcome = "malformed"
+            else:
+                outcome = "ok"
+            self.stats["requests"] += 1
+            if outcome != "ok":
+                self.stats["errors" if outcome == "error" else "malformed"] += 1
+        return delay, outcome
+
+
+def start_stub_server(latency: float = 0.5, host: str = "127.0.0.1", port: int = 0, jitter: float = 0.0,
+                      error_rate: float = 0.0, malformed_rate: float = 0.0,
+                      seed: Optional[int] = None, tokens_per_second: float = 0.0) -> Tuple[StubLLMServer, str]:
+    """
+    Arranca el servidor stub en un hilo en segundo plano
+
+    Returns:
+        tuple: (servidor, URL base) - llamar a servidor.shutdown() al terminar
+    """
+    server = StubLLMServer((host, port), latency, jitter, error_rate, malformed_rate, seed, tokens_per_second)
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.5, help="Latencia media de respuesta (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Variación máxima de la latencia (± s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fracción de respuestas 500")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fracción de respuestas con JSON truncado")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0,
+                        help="Velocidad de generación simulada (0 = latencia fija)")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(args.latency, args.host, args.port, args.jitter,
+                                         args.error_rate, args.malformed_rate, args.seed,
+                                         args.tokens_per_second)
+    for provider, url in stub_endpoints(base_url).items():
+        print(f"{provider:>18}  {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -9,6 +9,7 @@ Módulos principales:
 - config: Configuración de APIs y modelos
 - ai_service: Servicio de llamadas a APIs de IA
 - content_generator: Generador de contenido sin IA (fallback)
+- cv_models: Modelos tipados y validación del contenido del CV
 - pdf_generator: Generador de PDFs profesionales
 - utils: Utilidades y validaciones
 
@@ -28,6 +29,7 @@ __email__ = "santifdezseo@gmail.com"
 from .config import API_CONFIGS
 from .ai_service import AIService
 from .content_generator import ContentGenerator
+from .cv_models import CVContent
 from .pdf_generator import PDFGenerator
 from .utils import validate_form_data, format_success_message
 
@@ -35,6 +37,7 @@ __all__ = [
     "API_CONFIGS",
     "AIService", 
     "ContentGenerator",
+    "CVContent",
     "PDFGenerator",
     "validate_form_data",
     "format_success_message"
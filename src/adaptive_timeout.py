@@ -0,0 +1,171 @@
+"""
+Timeouts adaptativos por proveedor y modelo
+
+Un timeout fijo de 60 s es demasiado largo para Groq y demasiado corto para un
+modelo grande de Ollama en frío. Este módulo mantiene, para cada (proveedor,
+modelo), un histograma de las latencias recientes con decaimiento exponencial
+(las observaciones antiguas pesan cada vez menos) y deriva el timeout como el
+percentil alto por un factor, entre un mínimo y un máximo. Las llamadas que
+agotan el timeout cuentan como observaciones de esa duración, de modo que un
+timeout demasiado corto crece solo.
+
+Los histogramas se guardan en un pequeño archivo JSON (en un hilo, fuera del
+event loop) para que las primeras peticiones tras un reinicio no vuelvan a
+los valores por defecto.
+"""
+
+import asyncio
+import bisect
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from .config import ADAPTIVE_TIMEOUT_SETTINGS
+from .utils import write_json_atomic
+
+
+class LatencyHistogram:
+    """Histograma de latencias con decaimiento exponencial por observación"""
+
+    __slots__ = ("buckets", "decay", "counts", "samples")
+
+    def __init__(self, buckets: Tuple[float, ...], decay: float,
+                 counts: Optional[List[float]] = None, samples: int = 0):
+        self.buckets = buckets
+        self.decay = decay
+        # Un contador por bucket más el de desbordamiento (> último límite)
+        self.counts = counts or [0.0] * (len(buckets) + 1)
+        self.samples = samples
+
+    def observe(self, latency: float):
+        """Añade una latencia; las anteriores pierden peso"""
+        self.counts = [count * self.decay for count in self.counts]
+        self.counts[bisect.bisect_left(self.buckets, latency)] += 1.0
+        self.samples += 1
+
+    def quantile(self, pct: float) -> float:
+        """Límite superior del bucket que contiene el percentil pct"""
+        total = sum(self.counts)
+        if not total:
+            return 0.0
+        target = pct / 100 * total
+        cumulative = 0.0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return self.buckets[-1] * 2  # Desbordamiento: por encima del último límite
+
+
+class AdaptiveTimeouts:
+    """Histogramas de latencia por (proveedor, modelo) y timeouts derivados de ellos"""
+
+    def __init__(self, path: Optional[str] = ADAPTIVE_TIMEOUT_SETTINGS["path"],
+                 settings: Optional[Dict[str, Any]] = None):
+        self.settings = {**ADAPTIVE_TIMEOUT_SETTINGS, **(settings or {})}
+        self.buckets = tuple(sorted(self.settings["buckets"]))
+        self.path = path
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, str], LatencyHistogram] = {}
+        self._dirty = False
+        self._last_save = time.monotonic()
+        self._stats = {"observed": 0, "timeouts": 0, "saves": 0, "save_errors": 0}
+        self._load()
+
+    def timeout(self, provider: str, model: str, default: float) -> float:
+        """
+        Timeout para una llamada al modelo
+
+        Returns:
+            float: percentil × factor entre floor y ceiling, o default si está
+                   desactivado o aún no hay min_samples observaciones
+        """
+        if not self.settings["enabled"]:
+            return default
+        with self._lock:
+            histogram = self._histograms.get((provider, model))
+            if histogram is None or histogram.samples < self.settings["min_samples"]:
+                return default
+            learned = histogram.quantile(self.settings["quantile"]) * self.settings["factor"]
+        return min(max(learned, self.settings["floor"]), self.settings["ceiling"])
+
+    def record(self, provider: str, model: str, latency: float, timed_out: bool = False):
+        """Registra la latencia de una llamada completada (o la duración de una que agotó el timeout)"""
+        with self._lock:
+            key = (provider, model)
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = LatencyHistogram(self.buckets, self.settings["decay"])
+                self._histograms[key] = histogram
+            histogram.observe(latency)
+            self._stats["timeouts" if timed_out else "observed"] += 1
+            self._dirty = True
+            due = bool(self.path) and time.monotonic() - self._last_save >= self.settings["save_interval"]
+            if due:
+                self._last_save = time.monotonic()  # Un solo guardado programado por intervalo
+        if due:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self.save()
+            else:
+                loop.run_in_executor(None, self.save)
+
+    def save(self):
+        """Escribe los histogramas en el archivo (de forma atómica) si han cambiado"""
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                "buckets": list(self.buckets),
+                "histograms": [
+                    {"provider": provider, "model": model,
+                     "counts": [round(count, 6) for count in histogram.counts], "samples": histogram.samples}
+                    for (provider, model), histogram in self._histograms.items()
+                ]
+            }
+            self._dirty = False
+            self._last_save = time.monotonic()
+        try:
+            write_json_atomic(self.path, data)
+            self._stats["saves"] += 1
+        except OSError as e:
+            print(f"Error guardando los histogramas de latencia: {e}")
+            self._stats["save_errors"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Devuelve el timeout aprendido y las observaciones de cada (proveedor, modelo)"""
+        with self._lock:
+            keys = list(self._histograms)
+            samples = {key: self._histograms[key].samples for key in keys}
+        models = {}
+        for provider, model in keys:
+            learned = self.timeout(provider, model, 0.0)
+            models[f"{provider}/{model}"] = {
+                "samples": samples[(provider, model)],
+                "timeout": round(learned, 2) if learned else None
+            }
+        return {"enabled": self.settings["enabled"], "path": self.path, **self._stats, "models": models}
+
+    def _load(self):
+        """Carga los histogramas guardados (se ignoran si los buckets no coinciden)"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if tuple(data["buckets"]) != self.buckets:
+                return
+            for entry in data["histograms"]:
+                counts = [float(count) for count in entry["counts"]]
+                if len(counts) != len(self.buckets) + 1:
+                    continue
+                self._histograms[(entry["provider"], entry["model"])] = LatencyHistogram(
+                    self.buckets, self.settings["decay"], counts, int(entry["samples"])
+                )
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Error cargando los histogramas de latencia: {e}")
@@ -5,176 +5,1253 @@ Este módulo maneja todas las llamadas a las diferentes APIs de IA
 y proporciona funcionalidad de fallback en caso de errores.
 """
 
-import requests
+import httpx
 import json
 import asyncio
-from typing import Dict, Any, Optional
-from .config import API_CONFIGS, DEFAULT_SETTINGS, get_api_key
+import copy
+import time
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, AsyncIterator, Tuple, List
+from .config import (
+    API_CONFIGS, DEFAULT_SETTINGS, CACHE_SETTINGS, HEDGING_SETTINGS, FAN_OUT_SETTINGS,
+    FALLBACK_SETTINGS, CIRCUIT_BREAKER_SETTINGS, FALLBACK_CHAIN, get_api_key, get_connection_limits
+)
 from .content_generator import ContentGenerator
+from .cv_models import CVContent, Skills, WorkExperience, ValidationError, REQUIRED_SECTIONS, SKILL_CATEGORIES
+from .response_cache import ResponseCache
+from .json_stream import IncrementalJSONParser, extract_json
+from .prompt_builder import PromptBuilder, SectionPrompt
+from .provider_stats import ProviderStats
+from .circuit_breaker import CircuitBreaker
+from .adaptive_timeout import AdaptiveTimeouts
+from .rate_limiter import RateLimiter, RateLimitedError
+from .single_flight import SingleFlight, FlightAbandoned
+from .deadline import Deadline, record_overrun
+from . import tracing
+
+# Respuesta sintética cuando el circuito del proveedor está abierto
+CIRCUIT_OPEN_RESPONSE = "Error circuito abierto"
+# Respuesta sintética cuando la key no tiene cupo (bucket vacío, 429 o cuota agotada)
+RATE_LIMITED_RESPONSE = "Error límite de peticiones"
+# Orígenes del contenido que indican que viene de las plantillas locales y no de la IA
+TEMPLATE_SOURCES = ("fallback", "deadline", "soft_deadline")
+
+# Proveedor, key, último código HTTP (lo rellena el hook de httpx), tokens y límite de respuesta de la llamada en curso
+_current_call: ContextVar[Optional[Dict[str, Any]]] = ContextVar("current_call", default=None)
+# Tokens y coste acumulados de la generación en curso (todas sus llamadas)
+_generation_usage: ContextVar[Optional[Dict[str, Any]]] = ContextVar("generation_usage", default=None)
+# Contenido de respaldo calculado de forma especulativa para la generación en curso: (form_data, futuro)
+_speculative_fallback: ContextVar[Optional[Tuple[Dict[str, Any], asyncio.Future]]] = ContextVar(
+    "speculative_fallback", default=None
+)
+# Plazo de extremo a extremo de la generación en curso (acota los timeouts HTTP y el respaldo)
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("current_deadline", default=None)
+# Informe de la generación en curso: origen del contenido ("source")
+_generation_report: ContextVar[Optional[Dict[str, Any]]] = ContextVar("generation_report", default=None)
+# Plazo blando de la generación en curso ({"expired": bool}): las llamadas que
+# cancela cuentan como timeouts del modelo
+_soft_deadline_state: ContextVar[Optional[Dict[str, bool]]] = ContextVar("soft_deadline_state", default=None)
+# Inicio de la respuesta que se rellena como turno del asistente (modo JSON de Anthropic)
+_PREFILL = "{"
+
+
+def _note_usage(prompt_tokens: Optional[int], completion_tokens: Optional[int]):
+    """Anota los tokens que informa el proveedor en la llamada en curso"""
+    call = _current_call.get()
+    if call is not None and prompt_tokens is not None:
+        call["usage"] = (int(prompt_tokens), int(completion_tokens or 0))
+
+
+def _complete_prefill(text: str) -> str:
+    """Antepone el prefill a la respuesta (salvo que el modelo lo haya repetido)"""
+    return text if text.lstrip().startswith(_PREFILL) else _PREFILL + text
+
+
+def _is_client_error(status: Optional[int]) -> bool:
+    """4xx de la petición o de la key (401/403...): no dice nada de la salud del proveedor"""
+    return status is not None and 400 <= status < 500 and status not in (408, 429)
+
+
+class ClientRequestError(Exception):
+    """El proveedor rechazó la petición del stream con un 4xx (key inválida, petición mal formada...)"""
+
+
+def _speculative_result(speculative: Optional[asyncio.Future]) -> Optional[Dict[str, Any]]:
+    """Resultado del contenido de respaldo especulativo si ya está calculado (y sin errores)"""
+    if speculative is None or not speculative.done() or speculative.cancelled() or speculative.exception():
+        return None
+    return speculative.result()
 
 class AIService:
-    def __init__(self):
+    def __init__(self, endpoints: Optional[Dict[str, str]] = None, cache: Optional[ResponseCache] = None):
         self.content_generator = ContentGenerator()
-        self.session = requests.Session()
+        self.cache = cache
+        if self.cache is None and CACHE_SETTINGS["enabled"]:
+            self.cache = ResponseCache(
+                max_entries=CACHE_SETTINGS["memory_max_entries"],
+                ttl=CACHE_SETTINGS["ttl"],
+                disk_path=CACHE_SETTINGS["disk_path"],
+                disk_max_entries=CACHE_SETTINGS["disk_max_entries"],
+                access_flush_every=CACHE_SETTINGS["access_flush_every"]
+            )
+        self.provider_stats = ProviderStats()
+        # Timeouts aprendidos de las latencias de cada proveedor y modelo
+        self.adaptive_timeouts = AdaptiveTimeouts()
+        self.circuit_breakers: Dict[str, CircuitBreaker] = {}
+        self.rate_limiter = RateLimiter()
+        self.prompt_builder = PromptBuilder()
+        # Generaciones en vuelo por prompt, proveedor y modelo (dobles clics, perfiles duplicados)
+        self.inflight = SingleFlight("generate")
+        # Endpoints alternativos por proveedor (servidores stub, proxies...)
+        self.endpoints = endpoints or {}
+        # Un cliente HTTP asíncrono por proveedor y event loop: las conexiones
+        # de httpx quedan ligadas al loop en el que se crearon
+        self._clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, httpx.AsyncClient]]" = (
+            weakref.WeakKeyDictionary()
+        )
         
     async def generate_cv_content(self, form_data: Dict[str, Any], api_provider: str, 
-                                 model_name: str, api_key: Optional[str] = None) -> Dict[str, Any]:
+                                 model_name: str, api_key: Optional[str] = None,
+                                 coalesce: bool = True, fan_out: Optional[bool] = None,
+                                 soft_deadline: Optional[float] = None,
+                                 deadline: Optional[Deadline] = None,
+                                 report: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Genera contenido del CV usando diferentes APIs de IA
-        """
         
-        # Crear prompt estructurado
-        prompt = self._create_cv_prompt(form_data)
+        Las peticiones idénticas en vuelo (mismo prompt, proveedor y modelo)
+        esperan a una sola generación compartida, salvo con coalesce=False.
+        Con fan_out (por defecto FAN_OUT_SETTINGS) cada sección del CV se pide
+        en paralelo con su propio prompt en lugar de un único prompt. Si la
+        generación supera soft_deadline segundos (por defecto el del proveedor
+        y modelo, ver _soft_deadline; 0 = sin plazo) o el plazo de la petición
+        (deadline) se cancela y se devuelve el contenido de respaldo.
         
-        # Llamar a la API correspondiente
-        try:
-            if api_provider == "huggingface_free" and api_key:
-                ai_response = await self._call_huggingface_api(model_name, prompt, api_key)
-            elif api_provider == "openai" and api_key:
-                ai_response = await self._call_openai_api(model_name, prompt, api_key)
-            elif api_provider == "anthropic" and api_key:
-                ai_response = await self._call_anthropic_api(model_name, prompt, api_key)
-            elif api_provider == "cohere" and api_key:
-                ai_response = await self._call_cohere_api(model_name, prompt, api_key)
-            elif api_provider == "groq" and api_key:
-                ai_response = await self._call_groq_api(model_name, prompt, api_key)
-            elif api_provider == "together" and api_key:
-                ai_response = await self._call_together_api(model_name, prompt, api_key)
-            elif api_provider == "ollama_local":
-                ai_response = await self._call_ollama_local(model_name, prompt)
-            elif api_provider == "mock":
-                ai_response = "mock_response"
+        Si se pasa report, report["source"] recibe el origen del contenido: el
+        proveedor que respondió, "cache", "hedged", "fan_out" o
+        "fan_out_partial", o uno de TEMPLATE_SOURCES si son las plantillas
+        locales. Una petición agrupada recibe el origen de la compartida.
+        """
+        if fan_out is None:
+            fan_out = FAN_OUT_SETTINGS["enabled"]
+        if soft_deadline is None:
+            soft_deadline = self._soft_deadline(api_provider, model_name)
+        
+        with tracing.span("ai.generate_cv_content", provider=api_provider, model=model_name) as current, \
+                self._usage_scope(current), self._report_scope(report):
+            # Crear prompt estructurado dentro del presupuesto de tokens del modelo
+            # (por secciones: la clave de la petición sale de todos sus prompts)
+            if fan_out:
+                sections = self._create_section_prompts(form_data, api_provider, model_name)
+                prompt = "".join(section.prompt.text for section in sections)
             else:
-                raise Exception("Configuración de API inválida o API key faltante")
-            
-            # Procesar respuesta
-            if ai_response.startswith("Error") or not ai_response or ai_response == "mock_response":
+                prompt = self._create_cv_prompt(form_data, api_provider, model_name)
+
+            if api_provider == "mock":
+                self._set_source(current, "fallback")
                 return self.content_generator.generate_fallback_content(form_data)
+
+            # Reutilizar una respuesta previa para el mismo prompt y parámetros
+            request_key = self._request_key(prompt, api_provider, model_name)
+            if self.cache is not None:
+                cached_content = self._get_cached(request_key)
+                if cached_content is not None:
+                    self._set_source(current, "cache")
+                    return cached_content
+            
+            if deadline is not None:
+                if deadline.expired():
+                    # Sin plazo para la IA: contenido de respaldo sin llamar al proveedor
+                    record_overrun("ai")
+                    self._set_source(current, "deadline")
+                    return self.content_generator.generate_fallback_content(form_data, deadline)
+            # Solo si corta el plazo blando (no el de la petición) es un timeout del modelo
+            soft_state = {"expired": False} if soft_deadline else None
+            if deadline is not None:
+                if deadline.timeout(soft_deadline) < soft_deadline:
+                    soft_state = None
+                soft_deadline = deadline.timeout(soft_deadline)
+
+            if fan_out:
+                generate = lambda: self._generate_sections(
+                    form_data, sections, request_key, api_provider, model_name, api_key, current
+                )
+            else:
+                generate = lambda: self._generate_from_prompt(
+                    form_data, prompt, request_key, api_provider, model_name, api_key, current
+                )
+
+            async def generate_reported():
+                # La generación compartida devuelve su origen a todas las peticiones que la esperan
+                shared_report = {}
+                with self._report_scope(shared_report):
+                    content = await generate()
+                return content, shared_report.get("source")
             
-            # Parsear JSON de la respuesta
+            # Las plantillas locales se calculan mientras se espera al proveedor
+            speculative = self._speculate_fallback(form_data, deadline)
+            token = _speculative_fallback.set((form_data, speculative) if speculative is not None else None)
+            deadline_token = _current_deadline.set(deadline)
+            soft_token = _soft_deadline_state.set(soft_state)
+            try:
+                if not coalesce:
+                    result = await self._within_soft_deadline(generate_reported(), soft_deadline, soft_state)
+                    shared = False
+                else:
+                    result = await self._within_soft_deadline(
+                        self.inflight.do(request_key, generate_reported), soft_deadline, soft_state
+                    )
+                    result, shared = result if result is not None else (None, False)
+                ai_content, source = result if result is not None else (None, None)
+                if ai_content is None:
+                    self._set_source(current, "soft_deadline")
+                    self.provider_stats.record_soft_deadline(api_provider)
+                    if deadline is not None and deadline.expired():
+                        record_overrun("ai")
+                    return self._fallback_content(form_data)
+            finally:
+                _soft_deadline_state.reset(soft_token)
+                _current_deadline.reset(deadline_token)
+                _speculative_fallback.reset(token)
+            self._set_source(current, source)
+            if shared:
+                current.set_attribute("source", "coalesced")  # El informe conserva el origen compartido
+                return copy.deepcopy(ai_content)
+            return ai_content
+
+    def _speculate_fallback(self, form_data: Dict[str, Any],
+                            deadline: Optional[Deadline] = None) -> Optional[asyncio.Future]:
+        """Empieza a calcular el contenido de respaldo en un hilo (None si está desactivado)"""
+        if not FALLBACK_SETTINGS["speculative"]:
+            return None
+        speculative = asyncio.get_running_loop().run_in_executor(
+            None, self.content_generator.generate_fallback_content, form_data, deadline
+        )
+        # Si no se llega a usar, su posible excepción no debe quedar sin recuperar
+        speculative.add_done_callback(lambda future: future.cancelled() or future.exception())
+        return speculative
+
+    def _fallback_content(self, form_data: Dict[str, Any],
+                          speculative: Optional[asyncio.Future] = None) -> Dict[str, Any]:
+        """Contenido de respaldo: el especulativo de la generación en curso si ya está listo"""
+        if speculative is None:
+            current = _speculative_fallback.get()
+            if current is not None and current[0] is form_data:
+                speculative = current[1]
+        ready = _speculative_result(speculative)
+        if ready is not None:
+            return ready
+        return self.content_generator.generate_fallback_content(form_data, _current_deadline.get())
+
+    def _soft_deadline(self, api_provider: str, model_name: str) -> float:
+        """
+        Plazo blando del modelo (0 = sin plazo)
+
+        El configurado para el proveedor (o el general), nunca por debajo del
+        timeout aprendido del modelo: un modelo lento pero sano no acaba
+        siempre en el contenido de respaldo.
+        """
+        soft_deadline = FALLBACK_SETTINGS["provider_soft_deadlines"].get(
+            api_provider, FALLBACK_SETTINGS["soft_deadline"]
+        )
+        if not soft_deadline:
+            return 0.0
+        return max(soft_deadline, self.adaptive_timeouts.timeout(api_provider, model_name, 0.0))
+
+    @staticmethod
+    async def _within_soft_deadline(awaitable, soft_deadline: float,
+                                    state: Optional[Dict[str, bool]] = None):
+        """
+        Resultado de awaitable, o None si no termina en soft_deadline segundos (se cancela)
+
+        state["expired"] se marca antes de cancelar, para que las llamadas
+        canceladas sepan que fue por el plazo.
+        """
+        if not soft_deadline:
+            return await awaitable
+        task = asyncio.ensure_future(awaitable)
+        try:
+            done, _ = await asyncio.wait({task}, timeout=soft_deadline)
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        if done:
+            return task.result()
+        if state is not None:
+            state["expired"] = True
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return None
+
+    async def _generate_from_prompt(self, form_data: Dict[str, Any], prompt: str, request_key: str,
+                                    api_provider: str, model_name: str, api_key: Optional[str],
+                                    span) -> Dict[str, Any]:
+        """Genera el contenido de un prompt sin respuesta en caché (hedged, cadena de fallback o plantillas)"""
+        
+        # Modo hedged: varios proveedores en carrera, gana la primera respuesta válida
+        if HEDGING_SETTINGS["enabled"]:
+            candidates = self._build_candidates(
+                api_provider, model_name, api_key, HEDGING_SETTINGS["providers"]
+            )[:HEDGING_SETTINGS["max_providers"]]
+            if len(candidates) > 1:
+                ai_content = await self._race_providers(form_data, candidates, HEDGING_SETTINGS["stagger_delay"])
+                if ai_content is None:
+                    self._set_source(span, "fallback")
+                    return self._fallback_content(form_data)
+                self._set_source(span, "hedged")
+                if self.cache is not None:
+                    self._set_cached(request_key, ai_content)
+                return ai_content
+
+        # Llamar al proveedor elegido; si su circuito está abierto o falla se pasa
+        # al siguiente de la cadena de fallback y, al final, a las plantillas
+        candidates = self._build_candidates(api_provider, model_name, api_key, FALLBACK_CHAIN["providers"])
+        attempts = 0
+        for provider, model, key in candidates:
+            if attempts >= FALLBACK_CHAIN["max_attempts"]:
+                break
+            # Cada proveedor de la cadena recibe el prompt ajustado a su modelo
+            if (provider, model) != (api_provider, model_name):
+                prompt = self._create_cv_prompt(form_data, provider, model)
             try:
-                cleaned_response = self._clean_ai_response(ai_response)
-                ai_content = json.loads(cleaned_response)
-                
-                # Validar estructura
-                if not self._validate_ai_response(ai_content):
-                    raise Exception("Estructura JSON inválida")
-                
+                ai_response = await self._call_provider(provider, model, prompt, key)
+            except Exception as e:
+                print(f"Error en generación IA ({provider}): {e}")
+                continue
+
+            if ai_response in (CIRCUIT_OPEN_RESPONSE, RATE_LIMITED_RESPONSE):
+                continue  # Circuito abierto o sin cupo: siguiente proveedor sin esperar
+            attempts += 1
+
+            # Procesar respuesta (una respuesta truncada se completa, pero no se cachea)
+            ai_content, complete = self._parse_ai_response(ai_response, form_data)
+            if ai_content is not None:
+                self._set_source(span, provider)
+                if complete and self.cache is not None:
+                    self._set_cached(request_key, ai_content)
                 return ai_content
-                
-            except (json.JSONDecodeError, Exception):
-                return self.content_generator.generate_fallback_content(form_data)
-                
-        except Exception as e:
-            print(f"Error en generación IA: {e}")
+
+        self._set_source(span, "fallback")
+        return self._fallback_content(form_data)
+
+    async def _generate_sections(self, form_data: Dict[str, Any], sections: List[SectionPrompt],
+                                 request_key: str, api_provider: str, model_name: str,
+                                 api_key: Optional[str], span) -> Dict[str, Any]:
+        """
+        Genera cada sección con su prompt en paralelo y las une en el JSON del CV
+        
+        Las secciones que fallan se completan con el contenido de respaldo (y
+        el resultado no se cachea): una experiencia fallida, con las de su
+        prompt. Si no se obtiene ninguna se pasa al prompt único con su cadena
+        de fallback.
+        """
+        
+        async def generate_section(position: int, section: SectionPrompt):
+            with tracing.span("ai.section", provider=api_provider, section=section.section, position=position):
+                ai_response = await self._call_provider(
+                    api_provider, model_name, section.prompt.text, api_key, max_tokens=section.output_tokens
+                )
+                return self._parse_section(section.section, ai_response)
+        
+        with tracing.span("ai.fan_out", provider=api_provider, sections=len(sections)) as fan_out_span:
+            results = await asyncio.gather(
+                *(generate_section(position, section) for position, section in enumerate(sections)),
+                return_exceptions=True
+            )
+            merged: Dict[str, Any] = {}
+            complete = True
+            failed = 0
+            for section, result in zip(sections, results):
+                if isinstance(result, Exception):
+                    print(f"Error en generación IA ({api_provider}, {section.section}): {result}")
+                    result = None
+                if result is None:
+                    failed += 1
+                    complete = False
+                    if section.section != "experiencia_optimizada":
+                        continue
+                    # Mantener el orden de las experiencias con las de respaldo de este prompt
+                    value = self.content_generator.generate_fallback_content(
+                        {**form_data, "experiencia_laboral": section.experience}
+                    )["experiencia_optimizada"]
+                    section_complete = False
+                else:
+                    value, section_complete = result
+                complete = complete and section_complete
+                if section.section == "experiencia_optimizada":
+                    merged.setdefault(section.section, []).extend(value)
+                else:
+                    merged[section.section] = value
+            fan_out_span.set_attribute("failed", failed)
+        
+        if failed == len(sections):
+            prompt = self._create_cv_prompt(form_data, api_provider, model_name)
+            return await self._generate_from_prompt(
+                form_data, prompt, request_key, api_provider, model_name, api_key, span
+            )
+        
+        if not any(section.section == "experiencia_optimizada" for section in sections):
+            merged["experiencia_optimizada"] = []  # Sin experiencias en el formulario
+        content = CVContent.parse(merged) if complete else None
+        if content is not None:
+            ai_content = content.to_dict()
+            if self.cache is not None:
+                self._set_cached(request_key, ai_content)
+        else:
+            ai_content = self._salvage_partial_content(merged, form_data)
+        if ai_content is None:
+            self._set_source(span, "fallback")
+            return self._fallback_content(form_data)
+        self._set_source(span, "fan_out" if content is not None else "fan_out_partial")
+        return ai_content
+
+    def _parse_section(self, section: str, ai_response: str) -> Optional[Tuple[Any, bool]]:
+        """
+        Extrae el valor de una sección de la respuesta a su prompt
+        
+        Acepta también la sección sin su clave (las habilidades o una
+        experiencia sueltas). Returns: (valor, completo) o None.
+        """
+        if not ai_response or ai_response.startswith("Error") or ai_response == "mock_response":
+            return None
+        with tracing.span("ai.extract_json", section=section):
+            extracted = extract_json(ai_response)
+        if extracted is None or not isinstance(extracted.value, dict):
+            return None
+        value = extracted.value.get(section)
+        if value is None:
+            if section == "habilidades_organizadas" and any(key in extracted.value for key in SKILL_CATEGORIES):
+                value = extracted.value
+            elif section == "experiencia_optimizada" and "puesto" in extracted.value:
+                value = [extracted.value]
+            else:
+                return None
+        if section == "experiencia_optimizada" and isinstance(value, dict):
+            value = [value]
+        if section == "resumen_profesional" and not isinstance(value, str):
+            return None
+        return value, not extracted.truncated
+
+    async def generate_cv_content_hedged(self, form_data: Dict[str, Any],
+                                         candidates: List[Tuple[str, str, Optional[str]]],
+                                         stagger_delay: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Envía el prompt a varios proveedores y devuelve la primera respuesta válida
+        
+        Args:
+            form_data: Datos del formulario
+            candidates: Lista ordenada de (proveedor, modelo, api_key)
+            stagger_delay: Segundos entre el lanzamiento de cada proveedor
+                           (0 = todos en paralelo; por defecto HEDGING_SETTINGS)
+            
+        Returns:
+            dict: Contenido del proveedor ganador o el contenido de respaldo
+        """
+        if stagger_delay is None:
+            stagger_delay = HEDGING_SETTINGS["stagger_delay"]
+        
+        ai_content = await self._race_providers(form_data, candidates, stagger_delay)
+        if ai_content is None:
             return self.content_generator.generate_fallback_content(form_data)
+        return ai_content
 
-    def _create_cv_prompt(self, form_data: Dict[str, Any]) -> str:
-        """Crea el prompt estructurado para la IA"""
-        
-        prompt = f"""
-Actúa como un experto en recursos humanos y escritor profesional de CVs. 
-Genera un currículum profesional y optimizado para ATS basado en los siguientes datos:
-
-DATOS PERSONALES:
-- Nombre: {form_data['nombre']}
-- Email: {form_data['email']}
-- Teléfono: {form_data['telefono']}
-- LinkedIn: {form_data.get('linkedin', 'No especificado')}
-- Ubicación: {form_data.get('ubicacion', 'No especificado')}
-
-PERFIL PROFESIONAL:
-- Objetivo profesional: {form_data.get('objetivo', 'No especificado')}
-- Años de experiencia: {form_data.get('experiencia_anos', 'No especificado')}
-
-EXPERIENCIA LABORAL:
-{form_data.get('experiencia_laboral', 'No especificado')}
-
-EDUCACIÓN:
-{form_data.get('educacion', 'No especificado')}
-
-HABILIDADES:
-{form_data.get('habilidades', 'No especificado')}
-
-IDIOMAS:
-{form_data.get('idiomas', 'No especificado')}
-
-INSTRUCCIONES:
-1. Crea un resumen profesional atractivo de 3-4 líneas que destaque el valor único del candidato
-2. Reformula y optimiza la experiencia laboral con verbos de acción y logros cuantificables
-3. Organiza las habilidades por categorías (técnicas, blandas, herramientas)
-4. Asegúrate de que el contenido esté optimizado para ATS
-5. Usa un lenguaje profesional pero accesible
-6. Prioriza la información más relevante
-
-Responde SOLO con un JSON válido con esta estructura exacta:
-{{
-    "resumen_profesional": "texto del resumen profesional aquí",
-    "experiencia_optimizada": [
-        {{
-            "puesto": "título del puesto",
-            "empresa": "nombre empresa", 
-            "periodo": "fechas",
-            "descripcion": ["logro 1", "logro 2", "logro 3"]
-        }}
-    ],
-    "habilidades_organizadas": {{
-        "tecnicas": ["habilidad1", "habilidad2"],
-        "blandas": ["habilidad1", "habilidad2"],
-        "herramientas": ["herramienta1", "herramienta2"]
-    }}
-}}
-
-NO incluyas texto adicional, comentarios o explicaciones. Solo el JSON válido.
-"""
-        return prompt
+    async def _race_providers(self, form_data: Dict[str, Any], candidates: List[Tuple[str, str, Optional[str]]],
+                              stagger_delay: float) -> Optional[Dict[str, Any]]:
+        """Lanza los candidatos escalonados; devuelve la primera respuesta válida o None"""
+        
+        async def attempt(position: int, provider: str, model: str, key: Optional[str]):
+            if position and stagger_delay:
+                await asyncio.sleep(position * stagger_delay)
+            with tracing.span("ai.hedged_attempt", provider=provider, position=position):
+                prompt = self._create_cv_prompt(form_data, provider, model)
+                ai_response = await self._call_provider(provider, model, prompt, key)
+                return self._parse_ai_response(ai_response)[0]
+        
+        tasks = {
+            asyncio.create_task(attempt(position, provider, model, key)): provider
+            for position, (provider, model, key) in enumerate(candidates)
+        }
+        pending = set(tasks)
+        winner_content = None
+        
+        try:
+            while pending and winner_content is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    provider = tasks[task]
+                    if task.exception() is None and task.result() is not None and winner_content is None:
+                        winner_content = task.result()
+                        self.provider_stats.record_race(provider, won=True)
+                    else:
+                        self.provider_stats.record_race(provider)
+        finally:
+            # Cancelar las peticiones que siguen en vuelo
+            for task in pending:
+                task.cancel()
+                self.provider_stats.record_race(tasks[task], cancelled=True)
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        
+        return winner_content
+
+    def _build_candidates(self, api_provider: str, model_name: str, api_key: Optional[str],
+                          extra_providers: List[Dict[str, str]]) -> List[Tuple[str, str, Optional[str]]]:
+        """Lista ordenada de (proveedor, modelo, api_key): el elegido y después los configurados con key"""
+        candidates = [(api_provider, model_name, api_key)]
+        for entry in extra_providers:
+            provider = entry["provider"]
+            if provider == api_provider or provider not in API_CONFIGS:
+                continue
+            key = get_api_key(provider)
+            if API_CONFIGS[provider]["requires_key"] and not key:
+                continue
+            candidates.append((provider, entry["model"], key))
+        return candidates
+
+    async def _call_provider(self, api_provider: str, model_name: str, prompt: str,
+                             api_key: Optional[str], max_tokens: Optional[int] = None) -> str:
+        """
+        Llama al proveedor indicado registrando latencia y estado del circuito
+        
+        Devuelve CIRCUIT_OPEN_RESPONSE sin hacer la petición si el circuit
+        breaker del proveedor está abierto y RATE_LIMITED_RESPONSE si la key
+        no tiene cupo o el proveedor responde 429 (no cuenta como fallo).
+        max_tokens limita la respuesta por debajo de la del modelo (secciones).
+        """
+        if api_provider == "mock":
+            return "mock_response"
+        
+        api_calls = {
+            "huggingface_free": self._call_huggingface_api,
+            "openai": self._call_openai_api,
+            "anthropic": self._call_anthropic_api,
+            "cohere": self._call_cohere_api,
+            "groq": self._call_groq_api,
+            "together": self._call_together_api
+        }
+        if api_provider == "ollama_local":
+            make_call = lambda: self._call_ollama_local(model_name, prompt)
+        elif api_provider in api_calls and api_key:
+            make_call = lambda: api_calls[api_provider](model_name, prompt, api_key)
+        else:
+            raise Exception("Configuración de API inválida o API key faltante")
+        
+        # Con el circuito abierto no se gasta cupo: la petición no va a salir
+        breaker = self._get_breaker(api_provider)
+        if not breaker.allow_request():
+            return CIRCUIT_OPEN_RESPONSE
+        
+        with tracing.span("ai.rate_limit", provider=api_provider):
+            acquired = await self.rate_limiter.acquire(api_provider, api_key)
+        if not acquired:
+            breaker.release()
+            return RATE_LIMITED_RESPONSE
+        
+        call = {"provider": api_provider, "model": model_name, "api_key": api_key, "status": None,
+                "max_tokens": max_tokens, "deadline": _current_deadline.get()}
+        token = _current_call.set(call)
+        start = time.perf_counter()
+        try:
+            ai_response = await make_call()
+        except asyncio.CancelledError:
+            # Una llamada cancelada (p. ej. perdedora en modo hedged) no cuenta como error
+            breaker.release()
+            soft_state = _soft_deadline_state.get()
+            if soft_state is not None and soft_state["expired"]:
+                # Cortada por el plazo blando: la latencia real es al menos la transcurrida
+                self.adaptive_timeouts.record(api_provider, model_name, time.perf_counter() - start, timed_out=True)
+            raise
+        finally:
+            _current_call.reset(token)
+        latency = time.perf_counter() - start
+        
+        if call["status"] == 429:
+            breaker.release()
+            return RATE_LIMITED_RESPONSE
+        
+        success = bool(ai_response) and not ai_response.startswith("Error")
+        if success:
+            breaker.record_success()
+            self.adaptive_timeouts.record(api_provider, model_name, latency)
+        elif _is_client_error(call["status"]):
+            # Una key caducada de un usuario no debe abrir el circuito para todos
+            breaker.release()
+        else:
+            breaker.record_failure()
+            if call.get("timeout") and latency >= call["timeout"]:
+                # Agotó el timeout aprendido (no solo el recorte del plazo): la latencia real es al menos esa
+                self.adaptive_timeouts.record(api_provider, model_name, latency, timed_out=True)
+        self.provider_stats.record_call(api_provider, latency, success=success)
+        if success:
+            self._record_usage(api_provider, model_name, prompt, ai_response, call.get("usage"))
+        return ai_response
+
+    def _call_timeout(self, default: float, call: Optional[Dict[str, Any]] = None) -> float:
+        """
+        Timeout HTTP de una llamada: el aprendido del modelo (o el por defecto), acotado por su plazo
+
+        call es la llamada en curso (_current_call) salvo en los streams, que
+        la reciben como argumento porque sus yields cruzan contextos.
+        """
+        if call is None:
+            call = _current_call.get()
+        if call is None:
+            deadline = _current_deadline.get()
+        else:
+            default = call["timeout"] = self.adaptive_timeouts.timeout(call["provider"], call["model"], default)
+            deadline = call.get("deadline")
+        return default if deadline is None else max(deadline.timeout(default), 0.001)
+
+    def _output_tokens(self, provider: str, model_name: str) -> int:
+        """Tokens de respuesta de la llamada en curso: los de su sección o los del modelo"""
+        call = _current_call.get()
+        if call is not None and call.get("max_tokens"):
+            return call["max_tokens"]
+        return self.prompt_builder.output_tokens(provider, model_name)
+
+    def _record_usage(self, provider: str, model_name: str, prompt: str, response: str,
+                      usage: Optional[Tuple[int, int]] = None) -> Tuple[int, int, float]:
+        """
+        Registra los tokens y el coste de una llamada
+        
+        Usa los tokens que informa el proveedor y, si no los da, los estima
+        con el PromptBuilder. Los suma también a la generación en curso.
+        
+        Returns:
+            tuple: (tokens del prompt, tokens de la respuesta, coste en USD)
+        """
+        estimated = usage is None
+        if estimated:
+            usage = (self.prompt_builder.estimate_tokens(prompt, model_name),
+                     self.prompt_builder.estimate_tokens(response, model_name))
+        prompt_tokens, completion_tokens = usage
+        cost = self.prompt_builder.cost(model_name, prompt_tokens, completion_tokens)
+        self.provider_stats.record_usage(provider, prompt_tokens, completion_tokens, cost, estimated)
+        
+        totals = _generation_usage.get()
+        if totals is not None:
+            totals["prompt_tokens"] += prompt_tokens
+            totals["completion_tokens"] += completion_tokens
+            totals["cost_usd"] += cost
+        return prompt_tokens, completion_tokens, cost
+
+    @staticmethod
+    def _set_source(span, source: str):
+        """Anota el origen del contenido en el span y en el informe de la generación en curso"""
+        span.set_attribute("source", source)
+        report = _generation_report.get()
+        if report is not None:
+            report["source"] = source
+
+    @contextmanager
+    def _report_scope(self, report: Optional[Dict[str, Any]]):
+        """Informe de las generaciones del bloque (uno nuevo si no se pasa)"""
+        token = _generation_report.set(report if report is not None else {})
+        try:
+            yield
+        finally:
+            _generation_report.reset(token)
+
+    @contextmanager
+    def _usage_scope(self, span):
+        """Acumula los tokens y el coste de las llamadas del bloque y los anota en el span"""
+        totals = {"prompt_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+        token = _generation_usage.set(totals)
+        try:
+            yield totals
+        finally:
+            _generation_usage.reset(token)
+            if totals["prompt_tokens"]:
+                for key, value in totals.items():
+                    span.set_attribute(key, round(value, 8) if isinstance(value, float) else value)
+
+    def _parse_ai_response(self, ai_response: str,
+                           form_data: Optional[Dict[str, Any]] = None) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """
+        Extrae el JSON de la respuesta y lo valida con CVContent
+        
+        Returns:
+            tuple: (contenido normalizado o None si no es utilizable, completo).
+                   Si la respuesta llegó truncada o alguna sección no es válida,
+                   lo recuperado se completa con el contenido de respaldo (cuando
+                   se pasa form_data) y se marca como incompleto
+        """
+        if not ai_response or ai_response.startswith("Error") or ai_response == "mock_response":
+            return None, False
+        
+        with tracing.span("ai.extract_json") as current:
+            extracted = extract_json(ai_response)
+            if extracted is not None:
+                current.set_attribute("truncated", extracted.truncated)
+                current.set_attribute("repaired", extracted.repaired)
+        if extracted is None:
+            return None, False
+        
+        if not extracted.truncated:
+            content = CVContent.parse(extracted.value)
+            if content is not None:
+                return content.to_dict(), True
+        return self._salvage_partial_content(extracted.value, form_data), False
+
+    def _salvage_partial_content(self, ai_content: Dict[str, Any],
+                                 form_data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Aprovecha las secciones utilizables de una respuesta incompleta
+        
+        Descarta las experiencias que no validan (sin puesto o empresa, cortadas
+        a medias) y toma del generador local las secciones que faltan. Devuelve
+        None si no se salva ninguna sección o si falta alguna y no hay form_data.
+        """
+        salvaged = {}
+        
+        resumen = ai_content.get("resumen_profesional")
+        if isinstance(resumen, str) and resumen.strip():
+            salvaged["resumen_profesional"] = resumen
+        
+        experiencias = ai_content.get("experiencia_optimizada")
+        if isinstance(experiencias, dict):
+            experiencias = [experiencias]
+        valid_experiences = []
+        for exp in experiencias if isinstance(experiencias, list) else []:
+            try:
+                valid_experiences.append(WorkExperience.model_validate(exp))
+            except ValidationError:
+                continue
+        if valid_experiences:
+            salvaged["experiencia_optimizada"] = valid_experiences
+        
+        habilidades = ai_content.get("habilidades_organizadas")
+        if isinstance(habilidades, dict):
+            skills = Skills.model_validate(habilidades)
+            if skills.tecnicas or skills.blandas or skills.herramientas:
+                salvaged["habilidades_organizadas"] = skills
+        
+        if not salvaged:
+            return None
+        if not all(key in salvaged for key in REQUIRED_SECTIONS):
+            if form_data is None:
+                return None
+            fallback = self._fallback_content(form_data)
+            for key in REQUIRED_SECTIONS:
+                salvaged.setdefault(key, fallback[key])
+        content = CVContent.parse(salvaged)
+        return content.to_dict() if content is not None else None
+
+    def _request_key(self, prompt: str, api_provider: str, model_name: str) -> str:
+        """Clave de la petición (caché y generaciones en vuelo): hash del prompt y los parámetros"""
+        return ResponseCache.make_key(
+            prompt, api_provider, model_name,
+            DEFAULT_SETTINGS["temperature"], self.prompt_builder.output_tokens(api_provider, model_name)
+        )
+
+    def _get_cached(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Contenido cacheado (guardado en la forma compacta de CVContent) o None"""
+        cached = self.cache.get(cache_key)
+        if cached is None:
+            return None
+        if isinstance(cached, list):
+            return CVContent.from_compact(cached).to_dict()
+        # Entradas guardadas como diccionario antes de la forma compacta
+        content = CVContent.parse(cached)
+        return content.to_dict() if content is not None else None
+
+    def _set_cached(self, cache_key: str, ai_content: Dict[str, Any]):
+        """Guarda el contenido ya validado en la forma compacta"""
+        self.cache.set(cache_key, CVContent.model_validate(ai_content).to_compact())
 
-    def _clean_ai_response(self, response: str) -> str:
-        """Limpia la respuesta de la IA para extraer JSON válido"""
-        cleaned = response.strip()
+    async def stream_cv_content(self, form_data: Dict[str, Any], api_provider: str,
+                                model_name: str, api_key: Optional[str] = None,
+                                deadline: Optional[Deadline] = None
+                                ) -> AsyncIterator[Tuple[Dict[str, Any], bool]]:
+        """
+        Genera contenido del CV emitiendo actualizaciones parciales
+        
+        Produce tuplas (contenido, terminado). Mientras terminado es False el
+        contenido solo incluye los campos cuyo valor JSON ya se ha cerrado; la
+        última tupla contiene el contenido validado (o el de respaldo). Los
+        proveedores sin streaming (y los modos hedged y por secciones) emiten
+        directamente el resultado final. Si el stream no termina en el plazo
+        blando (o en el de la petición), el resultado final es lo recibido
+        completado con el contenido de respaldo.
+        """
+        
+        stream_fn = self._get_stream_fn(api_provider, api_key)
+        if stream_fn is None or HEDGING_SETTINGS["enabled"] or FAN_OUT_SETTINGS["enabled"]:
+            yield await self.generate_cv_content(form_data, api_provider, model_name, api_key,
+                                                 deadline=deadline), True
+            return
         
-        # Remover markdown
-        if cleaned.startswith("```json"):
-            cleaned = cleaned.replace("```json", "").replace("```", "").strip()
-        elif cleaned.startswith("```"):
-            cleaned = cleaned.replace("```", "").strip()
+        prompt = self._create_cv_prompt(form_data, api_provider, model_name)
         
-        # Buscar JSON en la respuesta
-        start_idx = cleaned.find("{")
-        end_idx = cleaned.rfind("}")
+        request_key = self._request_key(prompt, api_provider, model_name)
+        if self.cache is not None:
+            cached_content = self._get_cached(request_key)
+            if cached_content is not None:
+                yield cached_content, True
+                return
         
-        if start_idx != -1 and end_idx != -1:
-            cleaned = cleaned[start_idx:end_idx+1]
+        if deadline is not None and deadline.expired():
+            record_overrun("ai")
+            yield self.content_generator.generate_fallback_content(form_data, deadline), True
+            return
+        
+        # Plazo blando: el stream se corta si pasa ese tiempo sin recibir nada
+        # del proveedor, no mientras llegan tokens. El plazo de la petición
+        # acota el stream entero
+        loop = asyncio.get_running_loop()
+        soft_deadline = self._soft_deadline(api_provider, model_name)
+        hard_end = loop.time() + deadline.remaining() if deadline is not None else None
+        speculative = self._speculate_fallback(form_data, deadline)
+        
+        # La misma generación ya está en vuelo (doble clic): esperar su resultado.
+        # El líder siempre la termina (con el respaldo si se atasca)
+        flight = self.inflight.join(request_key)
+        if flight is not None:
+            try:
+                ai_content = await self._within_soft_deadline(
+                    self.inflight.wait(flight), max(deadline.remaining(), 1e-3) if deadline is not None else 0
+                )
+            except FlightAbandoned:
+                ai_content = await self.generate_cv_content(
+                    form_data, api_provider, model_name, api_key, deadline=deadline
+                )
+                yield ai_content, True
+                return
+            if ai_content is None:
+                ai_content = self._soft_deadline_content(form_data, {}, api_provider, speculative, deadline)
+            yield copy.deepcopy(ai_content), True
+            return
         
-        return cleaned
+        # Este stream lidera: quien llegue con la misma clave recibe su resultado final
+        flight = self.inflight.lead(request_key)
+        progress = {"last": loop.time(), "stalled": False}
+        updates = self._stream_from_prompt(
+            form_data, prompt, request_key, api_provider, model_name, api_key, stream_fn, speculative, deadline,
+            progress
+        )
+        partial: Dict[str, Any] = {}
+        pending = None
+        try:
+            while True:
+                progress["last"] = loop.time()  # El tiempo del consumidor entre actualizaciones no cuenta
+                pending = asyncio.ensure_future(updates.__anext__())
+                update = await self._until_stalled(pending, progress, soft_deadline, hard_end)
+                if update is None:
+                    # Stream atascado o sin plazo: se cancela y se completa lo recibido
+                    ai_content = self._soft_deadline_content(form_data, partial, api_provider, speculative, deadline)
+                    done = True
+                else:
+                    ai_content, done = update
+                if done:
+                    self.inflight.finish(request_key, flight, result=ai_content)
+                    yield ai_content, True
+                    return
+                partial = ai_content
+                yield ai_content, False
+        finally:
+            if pending is not None and not pending.done():
+                pending.cancel()
+                await asyncio.gather(pending, return_exceptions=True)
+            await updates.aclose()  # Si el consumidor abandona, liberar ya el circuito del proveedor
+            self.inflight.finish(request_key, flight, error=FlightAbandoned())
+
+    @staticmethod
+    async def _until_stalled(pending: asyncio.Future, progress: Dict[str, Any],
+                             soft_deadline: float, hard_end: Optional[float]):
+        """
+        Resultado de pending (la siguiente actualización del stream), o None si se atasca
+
+        Se atasca si pasan soft_deadline segundos (0 = nunca) desde el último
+        fragmento recibido (progress["last"]) o si llega hard_end. En ese caso
+        pending se cancela.
+        """
+        loop = asyncio.get_running_loop()
+        while not pending.done():
+            # progress["last"] avanza con cada fragmento mientras se espera
+            ends = [end for end in (progress["last"] + soft_deadline if soft_deadline else None, hard_end)
+                    if end is not None]
+            now = loop.time()
+            if ends and now >= min(ends):
+                # Solo si corta el plazo blando (no el de la petición) es un timeout del modelo
+                progress["stalled"] = bool(soft_deadline) and now >= progress["last"] + soft_deadline
+                pending.cancel()
+                await asyncio.gather(pending, return_exceptions=True)
+                return None
+            await asyncio.wait({pending}, timeout=min(ends) - now if ends else None)
+        return pending.result()
+
+    def _soft_deadline_content(self, form_data: Dict[str, Any], partial: Dict[str, Any], api_provider: str,
+                               speculative: Optional[asyncio.Future],
+                               deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """Contenido de un stream que supera el plazo blando: lo recibido completado con el de respaldo"""
+        self.provider_stats.record_soft_deadline(api_provider)
+        if deadline is not None and deadline.expired():
+            record_overrun("ai")
+        salvaged = self._salvage_partial_content(partial, form_data) if partial else None
+        return salvaged if salvaged is not None else self._fallback_content(form_data, speculative)
 
-    def _validate_ai_response(self, response: Dict[str, Any]) -> bool:
-        """Valida que la respuesta de IA tenga la estructura correcta"""
-        required_keys = ["resumen_profesional", "experiencia_optimizada", "habilidades_organizadas"]
-        return all(key in response for key in required_keys)
+    async def _stream_from_prompt(self, form_data: Dict[str, Any], prompt: str, request_key: str,
+                                  api_provider: str, model_name: str, api_key: Optional[str],
+                                  stream_fn, speculative: Optional[asyncio.Future] = None,
+                                  deadline: Optional[Deadline] = None,
+                                  progress: Optional[Dict[str, Any]] = None
+                                  ) -> AsyncIterator[Tuple[Dict[str, Any], bool]]:
+        """
+        Streaming de un prompt sin respuesta en caché
+        
+        Los desvíos a la cadena de fallback no se agrupan ni tienen plazo
+        propio: el plazo blando lo controla stream_cv_content, con el instante
+        del último fragmento recibido que se anota en progress["last"]. Si lo
+        corta el plazo (progress["stalled"]) cuenta como timeout del modelo.
+        """
+        breaker = self._get_breaker(api_provider)
+        allowed = breaker.allow_request()
+        if allowed and not await self.rate_limiter.acquire(api_provider, api_key):
+            breaker.release()
+            allowed = False
+        if not allowed:
+            # Circuito abierto (sin gastar cupo) o sin cupo: cadena de fallback sin streaming
+            yield await self.generate_cv_content(
+                form_data, api_provider, model_name, api_key, coalesce=False, soft_deadline=0,
+                deadline=deadline
+            ), True
+            return
+        
+        parser = IncrementalJSONParser()
+        call = {"provider": api_provider, "model": model_name, "deadline": deadline}
+        start = time.perf_counter()
+        streamed = None
+        rate_limited = False
+        client_error = False
+        timed_out = False
+        # El span no se activa: abarca los yields hacia el consumidor del stream
+        with tracing.span("ai.stream", activate=False, provider=api_provider, model=model_name) as stream_span:
+            try:
+                async for chunk in stream_fn(model_name, prompt, api_key, call):
+                    if progress is not None:
+                        progress["last"] = asyncio.get_running_loop().time()
+                    if parser.feed(chunk):
+                        yield dict(parser.fields), False
+                streamed = True
+            except RateLimitedError:
+                rate_limited = True
+            except ClientRequestError as e:
+                print(f"Error en generación IA (streaming): {e}")
+                streamed = False
+                client_error = True
+            except Exception as e:
+                print(f"Error en generación IA (streaming): {e}")
+                streamed = False
+                timed_out = isinstance(e, httpx.TimeoutException)
+            finally:
+                stream_span.set_attribute("outcome", "rate_limited" if rate_limited else
+                                          "abandoned" if streamed is None else
+                                          "ok" if streamed else "error")
+                if streamed is None:
+                    breaker.release()  # El consumidor abandonó el stream o el proveedor pidió esperar
+                    if progress is not None and progress["stalled"]:
+                        # Cortado por el plazo blando: la latencia real es al menos la transcurrida
+                        self.adaptive_timeouts.record(
+                            api_provider, model_name, time.perf_counter() - start, timed_out=True
+                        )
+                else:
+                    if streamed:
+                        breaker.record_success()
+                    elif client_error:
+                        breaker.release()
+                    else:
+                        breaker.record_failure()
+                    latency = time.perf_counter() - start
+                    self.provider_stats.record_call(api_provider, latency, success=streamed)
+                    if streamed:
+                        self.adaptive_timeouts.record(api_provider, model_name, latency)
+                    elif timed_out and call.get("timeout") and latency >= call["timeout"]:
+                        # Agotó el timeout aprendido (no solo el recorte del plazo): debe crecer
+                        self.adaptive_timeouts.record(api_provider, model_name, latency, timed_out=True)
+                if streamed:
+                    # El streaming no informa del uso: tokens estimados
+                    prompt_tokens, completion_tokens, cost = self._record_usage(
+                        api_provider, model_name, prompt, parser.text
+                    )
+                    stream_span.set_attribute("prompt_tokens", prompt_tokens)
+                    stream_span.set_attribute("completion_tokens", completion_tokens)
+                    stream_span.set_attribute("cost_usd", round(cost, 8))
+        
+        if rate_limited:
+            # 429 antes de recibir nada: desviar por la cadena de fallback
+            yield await self.generate_cv_content(
+                form_data, api_provider, model_name, api_key, coalesce=False, soft_deadline=0,
+                deadline=deadline
+            ), True
+            return
+        
+        ai_content, complete = self._parse_ai_response(parser.text, form_data) if streamed else (None, False)
+        if ai_content is None:
+            ai_content = self._fallback_content(form_data, speculative)
+        elif complete and self.cache is not None:
+            self._set_cached(request_key, ai_content)
+        
+        yield ai_content, True
+
+    def _get_stream_fn(self, api_provider: str, api_key: Optional[str]):
+        """Devuelve la función de streaming del proveedor o None si no la soporta"""
+        if api_provider in ("openai", "groq") and api_key:
+            return lambda model, prompt, key, call: self._stream_openai_compatible(api_provider, model, prompt, key, call)
+        if api_provider == "anthropic" and api_key:
+            return self._stream_anthropic_api
+        if api_provider == "ollama_local":
+            return lambda model, prompt, key, call: self._stream_ollama_local(model, prompt, call)
+        return None
+
+    async def _stream_openai_compatible(self, provider: str, model_name: str, prompt: str,
+                                        api_key: str, call: Dict[str, Any]) -> AsyncIterator[str]:
+        """Streaming SSE de endpoints de chat compatibles con OpenAI (OpenAI, Groq)"""
+        headers = {
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        }
+        
+        payload = {
+            "model": model_name,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": self.prompt_builder.output_tokens(provider, model_name),
+            "temperature": DEFAULT_SETTINGS["temperature"],
+            "stream": True
+        }
+        if self.prompt_builder.json_mode(provider, model_name) == "response_format":
+            payload["response_format"] = {"type": "json_object"}
+        
+        async with self._get_client(provider).stream(
+            "POST", self._get_endpoint(provider), headers=headers, json=payload,
+            timeout=self._call_timeout(DEFAULT_SETTINGS["timeout"], call)
+        ) as response:
+            self._check_stream_response(provider, api_key, response)
+            if response.status_code != 200:
+                raise Exception(f"Error API {provider}: {response.status_code}")
+            
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                delta = json.loads(data)["choices"][0].get("delta", {})
+                if delta.get("content"):
+                    yield delta["content"]
+
+    async def _stream_anthropic_api(self, model_name: str, prompt: str, api_key: str,
+                                    call: Dict[str, Any]) -> AsyncIterator[str]:
+        """Streaming SSE de la API de mensajes de Anthropic"""
+        headers = {
+            "x-api-key": api_key,
+            "Content-Type": "application/json",
+            "anthropic-version": "2023-06-01"
+        }
+        
+        prefill = self.prompt_builder.json_mode('anthropic', model_name) == "prefill"
+        payload = {
+            "model": model_name,
+            "max_tokens": self.prompt_builder.output_tokens('anthropic', model_name),
+            "messages": [{"role": "user", "content": prompt}],
+            "stream": True
+        }
+        if prefill:
+            payload["messages"].append({"role": "assistant", "content": _PREFILL})
+        
+        async with self._get_client('anthropic').stream(
+            "POST", self._get_endpoint('anthropic'), headers=headers, json=payload,
+            timeout=self._call_timeout(DEFAULT_SETTINGS["timeout"], call)
+        ) as response:
+            self._check_stream_response('anthropic', api_key, response)
+            if response.status_code != 200:
+                raise Exception(f"Error API Anthropic: {response.status_code}")
+            
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                event = json.loads(line[len("data:"):].strip())
+                if event.get("type") == "content_block_delta":
+                    text = event.get("delta", {}).get("text")
+                    if text and prefill and text.strip():
+                        # El texto continúa tras el prefill, que no se repite en el stream
+                        text = _complete_prefill(text)
+                        prefill = False
+                    if text:
+                        yield text
+                elif event.get("type") == "message_stop":
+                    break
+
+    async def _stream_ollama_local(self, model_name: str, prompt: str, call: Dict[str, Any]) -> AsyncIterator[str]:
+        """Streaming NDJSON de Ollama local (stream: true)"""
+        payload = {
+            "model": model_name,
+            "prompt": prompt,
+            "stream": True,
+            "options": {"num_predict": self.prompt_builder.output_tokens('ollama_local', model_name)}
+        }
+        if self.prompt_builder.json_mode('ollama_local', model_name) == "format":
+            payload["format"] = "json"
+        
+        async with self._get_client('ollama_local').stream(
+            "POST", self._get_endpoint('ollama_local'), json=payload,
+            timeout=self._call_timeout(120, call)
+        ) as response:
+            self._check_stream_response('ollama_local', None, response)
+            if response.status_code != 200:
+                raise Exception(f"Error Ollama local: {response.status_code}")
+            
+            async for line in response.aiter_lines():
+                if not line.strip():
+                    continue
+                event = json.loads(line)
+                if event.get("response"):
+                    yield event["response"]
+                if event.get("done"):
+                    break
+
+    def get_provider_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Devuelve latencias (p50/p95/p99), errores y tasas de victoria por proveedor"""
+        return self.provider_stats.get_summary()
+
+    def get_circuit_status(self) -> Dict[str, Dict[str, Any]]:
+        """Devuelve el estado del circuit breaker de cada proveedor"""
+        return {
+            provider: self._get_breaker(provider).get_state()
+            for provider in API_CONFIGS
+            if provider != "mock"
+        }
+
+    def get_rate_limit_status(self) -> Dict[str, Dict[str, Any]]:
+        """Devuelve cupo, bloqueos y consumo mensual por proveedor y key"""
+        return self.rate_limiter.get_status()
+
+    def get_status(self) -> Dict[str, Any]:
+        """Estado agregado del servicio: circuitos, proveedores, caché y límites"""
+        return {
+            "circuits": self.get_circuit_status(),
+            "providers": self.get_provider_stats(),
+            "cache": self.get_cache_stats(),
+            "rate_limits": self.get_rate_limit_status(),
+            "coalescing": self.inflight.get_stats(),
+            "adaptive_timeouts": self.adaptive_timeouts.get_stats()
+        }
+
+    def _get_breaker(self, provider: str) -> CircuitBreaker:
+        """Devuelve (creándolo si hace falta) el circuit breaker del proveedor"""
+        breaker = self.circuit_breakers.get(provider)
+        if breaker is None:
+            breaker = CircuitBreaker(**CIRCUIT_BREAKER_SETTINGS)
+            self.circuit_breakers[provider] = breaker
+        return breaker
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Devuelve los contadores de la caché de respuestas para monitorización"""
+        if self.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.cache.get_stats()}
+
+    def _get_endpoint(self, provider: str) -> str:
+        """Obtiene el endpoint del proveedor, respetando los overrides"""
+        return self.endpoints.get(provider) or API_CONFIGS[provider]['endpoint']
+
+    def _get_client(self, provider: str) -> httpx.AsyncClient:
+        """Devuelve el cliente HTTP compartido (con pool keep-alive) del proveedor"""
+        loop = asyncio.get_running_loop()
+        clients = self._clients.setdefault(loop, {})
+        client = clients.get(provider)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(**get_connection_limits(provider)),
+                timeout=DEFAULT_SETTINGS["timeout"],
+                event_hooks={"response": [self._observe_response]}
+            )
+            clients[provider] = client
+        return client
+
+    async def _observe_response(self, response: httpx.Response):
+        """Hook de httpx: pasa código y cabeceras de límite al rate limiter"""
+        call = _current_call.get()
+        if call is None:
+            return
+        call["status"] = response.status_code
+        self.rate_limiter.observe_response(
+            call["provider"], call["api_key"], response.status_code, response.headers
+        )
+
+    def _check_stream_response(self, provider: str, api_key: Optional[str], response: httpx.Response):
+        """
+        Registra las cabeceras de límite de un stream
+
+        Raises:
+            RateLimitedError: En un 429
+            ClientRequestError: En otro 4xx de la petición o de la key
+        """
+        self.rate_limiter.observe_response(provider, api_key, response.status_code, response.headers)
+        if response.status_code == 429:
+            raise RateLimitedError(provider)
+        if _is_client_error(response.status_code):
+            raise ClientRequestError(f"Error API {provider}: {response.status_code}")
+
+    async def aclose(self):
+        """Cierra los clientes HTTP abiertos en el event loop actual y guarda el consumo y los histogramas de latencia"""
+        loop = asyncio.get_running_loop()
+        clients = self._clients.pop(loop, {})
+        for client in clients.values():
+            await client.aclose()
+        await asyncio.to_thread(self.rate_limiter.save_usage)
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.flush)
+        await asyncio.to_thread(self.adaptive_timeouts.save)
+
+    def _create_section_prompts(self, form_data: Dict[str, Any], api_provider: str,
+                                model_name: str) -> List[SectionPrompt]:
+        """Crea los prompts de la generación por secciones"""
+        with tracing.span("ai.prompt", provider=api_provider, fan_out=True) as current:
+            sections = self.prompt_builder.build_sections(form_data, api_provider, model_name)
+            current.set_attribute("sections", len(sections))
+            current.set_attribute("prompt_tokens", sum(section.prompt.prompt_tokens for section in sections))
+        return sections
+
+    def _create_cv_prompt(self, form_data: Dict[str, Any], api_provider: Optional[str] = None,
+                          model_name: Optional[str] = None) -> str:
+        """Crea el prompt estructurado para la IA dentro del presupuesto de tokens del modelo"""
+        
+        attributes = {"provider": api_provider} if api_provider else {}
+        with tracing.span("ai.prompt", **attributes) as current:
+            built = self.prompt_builder.build(form_data, api_provider, model_name)
+            current.set_attribute("prompt_tokens", built.prompt_tokens)
+            current.set_attribute("budget", built.budget)
+            current.set_attribute("compact", built.compact)
+            if built.compressed:
+                current.set_attribute("compressed", ",".join(built.compressed))
+        return built.text
 
+    @tracing.traced("ai.call", provider="huggingface_free")
     async def _call_huggingface_api(self, model_name: str, prompt: str, api_key: str) -> str:
         """Llamada a la API de Hugging Face"""
         headers = {"Authorization": f"Bearer {api_key}"}
         
         # Diferentes formatos según el modelo
+        max_tokens = self._output_tokens('huggingface_free', model_name)
         if "flan-t5" in model_name:
-            payload = {"inputs": prompt, "parameters": {"max_length": DEFAULT_SETTINGS["max_tokens"]}}
+            payload = {"inputs": prompt, "parameters": {"max_length": max_tokens}}
         else:
             payload = {
                 "inputs": prompt, 
                 "parameters": {
-                    "max_new_tokens": DEFAULT_SETTINGS["max_tokens"], 
+                    "max_new_tokens": max_tokens, 
                     "temperature": DEFAULT_SETTINGS["temperature"]
                 }
             }
         
         try:
-            response = self.session.post(
-                f"{API_CONFIGS['huggingface_free']['endpoint']}{model_name}",
+            response = await self._get_client('huggingface_free').post(
+                f"{self._get_endpoint('huggingface_free')}{model_name}",
                 headers=headers,
                 json=payload,
-                timeout=DEFAULT_SETTINGS["timeout"]
+                timeout=self._call_timeout(DEFAULT_SETTINGS["timeout"])
             )
             
             if response.status_code == 200:
@@ -187,6 +1264,7 @@ NO incluyas texto adicional, comentarios o explicaciones. Solo el JSON válido.
         except Exception as e:
             return f"Error llamada HuggingFace: {str(e)}"
 
+    @tracing.traced("ai.call", provider="openai")
     async def _call_openai_api(self, model_name: str, prompt: str, api_key: str) -> str:
         """Llamada a la API de OpenAI"""
         headers = {
@@ -197,26 +1275,31 @@ NO incluyas texto adicional, comentarios o explicaciones. Solo el JSON válido.
         payload = {
             "model": model_name,
             "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": DEFAULT_SETTINGS["max_tokens"],
+            "max_tokens": self._output_tokens('openai', model_name),
             "temperature": DEFAULT_SETTINGS["temperature"]
         }
+        if self.prompt_builder.json_mode('openai', model_name) == "response_format":
+            payload["response_format"] = {"type": "json_object"}
         
         try:
-            response = self.session.post(
-                API_CONFIGS['openai']['endpoint'],
+            response = await self._get_client('openai').post(
+                self._get_endpoint('openai'),
                 headers=headers,
                 json=payload,
-                timeout=DEFAULT_SETTINGS["timeout"]
+                timeout=self._call_timeout(DEFAULT_SETTINGS["timeout"])
             )
             
             if response.status_code == 200:
                 result = response.json()
+                usage = result.get("usage") or {}
+                _note_usage(usage.get("prompt_tokens"), usage.get("completion_tokens"))
                 return result["choices"][0]["message"]["content"]
             else:
                 return f"Error API OpenAI: {response.status_code}"
         except Exception as e:
             return f"Error llamada OpenAI: {str(e)}"
 
+    @tracing.traced("ai.call", provider="anthropic")
     async def _call_anthropic_api(self, model_name: str, prompt: str, api_key: str) -> str:
         """Llamada a la API de Anthropic"""
         headers = {
@@ -225,28 +1308,35 @@ NO incluyas texto adicional, comentarios o explicaciones. Solo el JSON válido.
             "anthropic-version": "2023-06-01"
         }
         
+        prefill = self.prompt_builder.json_mode('anthropic', model_name) == "prefill"
         payload = {
             "model": model_name,
-            "max_tokens": DEFAULT_SETTINGS["max_tokens"],
+            "max_tokens": self._output_tokens('anthropic', model_name),
             "messages": [{"role": "user", "content": prompt}]
         }
+        if prefill:
+            payload["messages"].append({"role": "assistant", "content": _PREFILL})
         
         try:
-            response = self.session.post(
-                API_CONFIGS['anthropic']['endpoint'],
+            response = await self._get_client('anthropic').post(
+                self._get_endpoint('anthropic'),
                 headers=headers,
                 json=payload,
-                timeout=DEFAULT_SETTINGS["timeout"]
+                timeout=self._call_timeout(DEFAULT_SETTINGS["timeout"])
             )
             
             if response.status_code == 200:
                 result = response.json()
-                return result["content"][0]["text"]
+                usage = result.get("usage") or {}
+                _note_usage(usage.get("input_tokens"), usage.get("output_tokens"))
+                text = result["content"][0]["text"]
+                return _complete_prefill(text) if prefill else text
             else:
                 return f"Error API Anthropic: {response.status_code}"
         except Exception as e:
             return f"Error llamada Anthropic: {str(e)}"
 
+    @tracing.traced("ai.call", provider="cohere")
     async def _call_cohere_api(self, model_name: str, prompt: str, api_key: str) -> str:
         """Llamada a la API de Cohere"""
         headers = {
@@ -257,26 +1347,29 @@ NO incluyas texto adicional, comentarios o explicaciones. Solo el JSON válido.
         payload = {
             "model": model_name,
             "prompt": prompt,
-            "max_tokens": DEFAULT_SETTINGS["max_tokens"],
+            "max_tokens": self._output_tokens('cohere', model_name),
             "temperature": DEFAULT_SETTINGS["temperature"]
         }
         
         try:
-            response = self.session.post(
-                API_CONFIGS['cohere']['endpoint'],
+            response = await self._get_client('cohere').post(
+                self._get_endpoint('cohere'),
                 headers=headers,
                 json=payload,
-                timeout=DEFAULT_SETTINGS["timeout"]
+                timeout=self._call_timeout(DEFAULT_SETTINGS["timeout"])
             )
             
             if response.status_code == 200:
                 result = response.json()
+                billed = (result.get("meta") or {}).get("billed_units") or {}
+                _note_usage(billed.get("input_tokens"), billed.get("output_tokens"))
                 return result["generations"][0]["text"]
             else:
                 return f"Error API Cohere: {response.status_code}"
         except Exception as e:
             return f"Error llamada Cohere: {str(e)}"
 
+    @tracing.traced("ai.call", provider="groq")
     async def _call_groq_api(self, model_name: str, prompt: str, api_key: str) -> str:
         """Llamada a la API de Groq"""
         headers = {
@@ -287,26 +1380,31 @@ NO incluyas texto adicional, comentarios o explicaciones. Solo el JSON válido.
         payload = {
             "model": model_name,
             "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": DEFAULT_SETTINGS["max_tokens"],
+            "max_tokens": self._output_tokens('groq', model_name),
             "temperature": DEFAULT_SETTINGS["temperature"]
         }
+        if self.prompt_builder.json_mode('groq', model_name) == "response_format":
+            payload["response_format"] = {"type": "json_object"}
         
         try:
-            response = self.session.post(
-                API_CONFIGS['groq']['endpoint'],
+            response = await self._get_client('groq').post(
+                self._get_endpoint('groq'),
                 headers=headers,
                 json=payload,
-                timeout=DEFAULT_SETTINGS["timeout"]
+                timeout=self._call_timeout(DEFAULT_SETTINGS["timeout"])
             )
             
             if response.status_code == 200:
                 result = response.json()
+                usage = result.get("usage") or {}
+                _note_usage(usage.get("prompt_tokens"), usage.get("completion_tokens"))
                 return result["choices"][0]["message"]["content"]
             else:
                 return f"Error API Groq: {response.status_code}"
         except Exception as e:
             return f"Error llamada Groq: {str(e)}"
 
+    @tracing.traced("ai.call", provider="together")
     async def _call_together_api(self, model_name: str, prompt: str, api_key: str) -> str:
         """Llamada a la API de Together AI"""
         headers = {
@@ -317,16 +1415,16 @@ NO incluyas texto adicional, comentarios o explicaciones. Solo el JSON válido.
         payload = {
             "model": model_name,
             "prompt": prompt,
-            "max_tokens": DEFAULT_SETTINGS["max_tokens"],
+            "max_tokens": self._output_tokens('together', model_name),
             "temperature": DEFAULT_SETTINGS["temperature"]
         }
         
         try:
-            response = self.session.post(
-                API_CONFIGS['together']['endpoint'],
+            response = await self._get_client('together').post(
+                self._get_endpoint('together'),
                 headers=headers,
                 json=payload,
-                timeout=DEFAULT_SETTINGS["timeout"]
+                timeout=self._call_timeout(DEFAULT_SETTINGS["timeout"])
             )
             
             if response.status_code == 200:
@@ -337,23 +1435,28 @@ NO incluyas texto adicional, comentarios o explicaciones. Solo el JSON válido.
         except Exception as e:
             return f"Error llamada Together: {str(e)}"
 
+    @tracing.traced("ai.call", provider="ollama_local")
     async def _call_ollama_local(self, model_name: str, prompt: str) -> str:
         """Llamada a Ollama local"""
         payload = {
             "model": model_name,
             "prompt": prompt,
-            "stream": False
+            "stream": False,
+            "options": {"num_predict": self._output_tokens('ollama_local', model_name)}
         }
+        if self.prompt_builder.json_mode('ollama_local', model_name) == "format":
+            payload["format"] = "json"
         
         try:
-            response = self.session.post(
-                API_CONFIGS['ollama_local']['endpoint'],
+            response = await self._get_client('ollama_local').post(
+                self._get_endpoint('ollama_local'),
                 json=payload,
-                timeout=120  # Ollama puede ser más lento
+                timeout=self._call_timeout(120)  # Ollama puede ser más lento
             )
             
             if response.status_code == 200:
                 result = response.json()
+                _note_usage(result.get("prompt_eval_count"), result.get("eval_count"))
                 return result.get("response", "Sin respuesta")
             else:
                 return f"Error Ollama local: {response.status_code}"
@@ -0,0 +1,320 @@
+"""
+Generación de CVs por lotes
+
+Pipeline sin interfaz para procesar exportaciones CSV o JSONL: los registros se
+leen en streaming, se validan con validate_form_data, se generan con la IA con
+concurrencia acotada y se renderizan en el pool de procesos de PDFRenderEngine.
+Los PDFs se escriben en un directorio o en un archivo zip.
+
+Junto a la salida se guardan un checkpoint (los registros ya generados se
+saltan al relanzar el lote, con el origen de su contenido: el proveedor de IA
+o las plantillas locales), un informe de errores por registro de la última
+ejecución (los fallidos se reintentan al relanzar) y un resumen con el
+throughput y los CVs hechos con plantillas.
+
+Uso:
+    python -m src.batch candidatos.csv --output cvs/ --provider groq --model llama3-8b-8192
+    python -m src.batch candidatos.jsonl --output cvs.zip --provider mock
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import time
+import zipfile
+from typing import Dict, Any, Iterator, Optional, Set, Tuple
+
+from .ai_service import AIService, TEMPLATE_SOURCES
+from .config import API_CONFIGS, BATCH_SETTINGS, get_api_key
+from .render_engine import PDFRenderEngine
+from .utils import validate_form_data, clean_text, sanitize_filename
+
+FORM_FIELDS = (
+    "nombre", "email", "telefono", "linkedin", "ubicacion", "objetivo",
+    "experiencia_laboral", "educacion", "habilidades", "idiomas",
+    "certificaciones", "proyectos"
+)
+
+
+def iter_records(path: str) -> Iterator[Tuple[str, Dict[str, Any], Optional[str]]]:
+    """
+    Lee los registros de un CSV o JSONL sin cargar el archivo entero
+
+    Cada registro se identifica por su columna "id" o, si no la tiene, por su
+    número de fila del CSV o de línea del JSONL (empezando en 1). Se acepta
+    el BOM que escribe Excel al exportar "CSV UTF-8". Una línea JSONL que no
+    es un objeto JSON válido no detiene la lectura: se devuelve con su número
+    de línea y el error.
+
+    Yields:
+        tuple: (id del registro, datos del registro, error de lectura o None)
+    """
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if path.lower().endswith(".csv"):
+            for number, record in enumerate(csv.DictReader(f), start=1):
+                yield str(record.get("id") or number), record, None
+            return
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                if not isinstance(record, dict):
+                    raise ValueError("el registro no es un objeto JSON")
+            except ValueError as e:
+                yield str(number), {}, f"Línea JSONL inválida: {e}"
+                continue
+            yield str(record.get("id") or number), record, None
+
+
+class _DirectorySink:
+    """Escribe cada PDF como archivo en un directorio"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, filename: str, data: bytes):
+        with open(os.path.join(self.directory, filename), "wb") as f:
+            f.write(data)
+
+    def contains(self, filename: str) -> bool:
+        return os.path.exists(os.path.join(self.directory, filename))
+
+    def close(self):
+        pass
+
+
+class _ZipSink:
+    """
+    Añade cada PDF a un zip
+
+    Al reanudar se abre en modo append; sin reanudar (o si una interrupción
+    dejó el zip sin directorio central) se crea de nuevo.
+    """
+
+    def __init__(self, path: str, resume: bool = True):
+        mode = "a" if resume and zipfile.is_zipfile(path) else "w"
+        self._zip = zipfile.ZipFile(path, mode, compression=zipfile.ZIP_DEFLATED)
+        self._names = set(self._zip.namelist())
+
+    def contains(self, filename: str) -> bool:
+        return filename in self._names
+
+    def write(self, filename: str, data: bytes):
+        if filename not in self._names:
+            self._zip.writestr(filename, data)
+            self._names.add(filename)
+
+    def close(self):
+        self._zip.close()
+
+
+class BatchProcessor:
+    """Procesa un archivo de registros y genera un PDF por candidato"""
+
+    def __init__(self, input_path: str, output: str, api_provider: str = "mock",
+                 model_name: str = "", api_key: Optional[str] = None, template: str = "modern",
+                 concurrency: Optional[int] = None, resume: bool = True,
+                 ai_service: Optional[AIService] = None, render_engine: Optional[PDFRenderEngine] = None):
+        self.input_path = input_path
+        self.output = output
+        self.api_provider = api_provider
+        self.model_name = model_name or next(iter(API_CONFIGS.get(api_provider, {}).get("models", {})), "")
+        self.api_key = api_key or get_api_key(api_provider)
+        self.template = template
+        self.concurrency = concurrency or BATCH_SETTINGS["concurrency"]
+        self.resume = resume
+
+        self.ai_service = ai_service or AIService()
+        self.render_engine = render_engine or PDFRenderEngine(max_pending=self.concurrency)
+
+        # Checkpoint, errores y resumen van junto a la salida
+        if output.lower().endswith(".zip"):
+            prefix = output[:-4] + "."
+        else:
+            prefix = os.path.join(output, "")
+        self.checkpoint_path = prefix + "checkpoint.jsonl"
+        self.errors_path = prefix + "errors.jsonl"
+        self.summary_path = prefix + "summary.json"
+
+        self._stats = {"total": 0, "generated": 0, "template_content": 0, "failed": 0, "skipped": 0}
+
+    async def run(self) -> Dict[str, Any]:
+        """
+        Ejecuta el lote completo
+
+        Returns:
+            dict: Resumen con contadores, duración y CVs por segundo
+        """
+        if self.output.lower().endswith(".zip"):
+            parent = os.path.dirname(os.path.abspath(self.output))
+            os.makedirs(parent, exist_ok=True)
+            sink = _ZipSink(self.output, self.resume)
+        else:
+            sink = _DirectorySink(self.output)
+
+        # Solo se saltan los registros del checkpoint cuyo PDF sigue en la salida
+        done = {
+            record_id for record_id, filename in self._load_checkpoint().items() if sink.contains(filename)
+        } if self.resume else set()
+        if not self.resume and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+        start = time.perf_counter()
+        slots = asyncio.Semaphore(self.concurrency)
+        pending: Set[asyncio.Task] = set()
+        progress = asyncio.create_task(self._report_progress(start))
+
+        try:
+            with open(self.checkpoint_path, "a", encoding="utf-8") as checkpoint, \
+                    open(self.errors_path, "w", encoding="utf-8") as errors:
+                for record_id, record, read_error in iter_records(self.input_path):
+                    self._stats["total"] += 1
+                    if read_error:
+                        self._write_error(errors, record_id, record, read_error)
+                        continue
+                    if record_id in done:
+                        self._stats["skipped"] += 1
+                        continue
+
+                    # Solo se lee el siguiente registro cuando hay hueco
+                    await slots.acquire()
+                    task = asyncio.create_task(
+                        self._process_record(record_id, record, sink, checkpoint, errors)
+                    )
+                    pending.add(task)
+                    task.add_done_callback(pending.discard)
+                    task.add_done_callback(lambda _: slots.release())
+
+                if pending:
+                    await asyncio.gather(*pending)
+        finally:
+            progress.cancel()
+            sink.close()
+            await self.ai_service.aclose()
+            self.render_engine.shutdown()
+
+        elapsed = time.perf_counter() - start
+        summary = {
+            **self._stats,
+            "elapsed_seconds": round(elapsed, 2),
+            "cvs_per_second": round(self._stats["generated"] / elapsed, 2) if elapsed else 0.0,
+            "output": self.output,
+            "errors_report": self.errors_path
+        }
+        with open(self.summary_path, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        return summary
+
+    async def _process_record(self, record_id: str, record: Dict[str, Any], sink,
+                              checkpoint, errors):
+        try:
+            error = validate_form_data(
+                record.get("nombre", ""), record.get("email", ""), record.get("telefono", ""),
+                self.api_provider, self.api_key
+            )
+            if error:
+                raise ValueError(error)
+
+            user_data = self._prepare_record(record)
+            # Sin plazo blando: en un lote importa más el contenido de la IA que la latencia
+            report = {}
+            ai_content = await self.ai_service.generate_cv_content(
+                user_data, self.api_provider, self.model_name, self.api_key, soft_deadline=0, report=report
+            )
+            source = report.get("source", "")
+            pdf_bytes = await self.render_engine.render(
+                user_data, ai_content, record.get("template") or self.template
+            )
+
+            filename = sanitize_filename(f"{record_id}_CV_{user_data['nombre']}.pdf")
+            sink.write(filename, pdf_bytes)
+            self._stats["generated"] += 1
+            if source in TEMPLATE_SOURCES:
+                self._stats["template_content"] += 1  # El proveedor falló: CV hecho con las plantillas
+            checkpoint.write(json.dumps(
+                {"id": record_id, "file": filename, "source": source}, ensure_ascii=False
+            ) + "\n")
+            checkpoint.flush()
+        except Exception as e:
+            self._write_error(errors, record_id, record, str(e))
+
+    def _write_error(self, errors, record_id: str, record: Dict[str, Any], error: str):
+        """Cuenta el registro como fallido y lo anota en el informe de errores"""
+        self._stats["failed"] += 1
+        errors.write(json.dumps({
+            "id": record_id,
+            "nombre": record.get("nombre", ""),
+            "error": error
+        }, ensure_ascii=False) + "\n")
+        errors.flush()
+
+    def _prepare_record(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Normaliza el registro igual que el formulario de la aplicación"""
+        user_data = {field: clean_text(str(record.get(field) or "")) for field in FORM_FIELDS}
+        user_data["experiencia_anos"] = str(record.get("experiencia_anos") or "")
+        return user_data
+
+    def _load_checkpoint(self) -> Dict[str, str]:
+        """Devuelve los ids ya generados en ejecuciones anteriores y el archivo de cada uno"""
+        done = {}
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        done[entry["id"]] = entry["file"]
+                    except (ValueError, KeyError, TypeError):
+                        continue  # Línea truncada por una interrupción
+        return done
+
+    async def _report_progress(self, start: float):
+        while True:
+            await asyncio.sleep(BATCH_SETTINGS["progress_interval"])
+            elapsed = time.perf_counter() - start
+            stats = self._stats
+            print(
+                f"[lote] leídos {stats['total']} | generados {stats['generated']} | "
+                f"errores {stats['failed']} | saltados {stats['skipped']} | "
+                f"{stats['generated'] / elapsed:.2f} CVs/s"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="Archivo .csv o .jsonl con un candidato por registro")
+    parser.add_argument("--output", required=True, help="Directorio de salida o archivo .zip")
+    parser.add_argument("--provider", default="mock", choices=sorted(API_CONFIGS))
+    parser.add_argument("--model", default="", help="Modelo (por defecto el primero del proveedor)")
+    parser.add_argument("--api-key", default=None, help="API key (por defecto la variable de entorno)")
+    parser.add_argument("--template", default="modern")
+    parser.add_argument("--concurrency", type=int, default=BATCH_SETTINGS["concurrency"])
+    parser.add_argument("--no-resume", action="store_true", help="Ignorar el checkpoint y regenerar todo")
+    args = parser.parse_args()
+
+    processor = BatchProcessor(
+        args.input, args.output, api_provider=args.provider, model_name=args.model,
+        api_key=args.api_key, template=args.template, concurrency=args.concurrency,
+        resume=not args.no_resume
+    )
+    summary = asyncio.run(processor.run())
+
+    print(
+        f"✅ Lote terminado: {summary['generated']} generados, {summary['failed']} con error, "
+        f"{summary['skipped']} ya hechos ({summary['elapsed_seconds']} s, "
+        f"{summary['cvs_per_second']} CVs/s)"
+    )
+    if summary["template_content"] and args.provider != "mock":
+        print(
+            f"⚠️ {summary['template_content']} CVs se generaron con las plantillas locales porque la IA no "
+            f"respondió (\"source\" en {processor.checkpoint_path})"
+        )
+    if summary["failed"]:
+        print(f"📄 Informe de errores: {summary['errors_report']}")
+
+
+if __name__ == "__main__":
+    main()
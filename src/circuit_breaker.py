@@ -0,0 +1,115 @@
+"""
+Circuit breaker por proveedor de IA
+
+Este módulo evita esperar el timeout completo de un proveedor caído: cuando la
+tasa de errores reciente supera un umbral el circuito se abre y las peticiones
+pasan directamente al siguiente proveedor de la cadena de fallback (o a las
+plantillas de ContentGenerator). Tras un periodo de enfriamiento el circuito
+pasa a semiabierto y deja pasar una petición de prueba.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, Any
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Circuit breaker con ventana deslizante de resultados"""
+
+    def __init__(self, failure_threshold: float = 0.5, min_calls: int = 4,
+                 consecutive_failures: int = 3, window_seconds: float = 120.0,
+                 open_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.consecutive_failures = consecutive_failures
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._consecutive = 0
+        self._outcomes: "deque[tuple]" = deque()  # (instante, éxito)
+        self._lock = threading.Lock()
+
+    def allow_request(self) -> bool:
+        """Indica si se puede llamar al proveedor ahora mismo"""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    return False
+                self.state = HALF_OPEN
+                self._probe_in_flight = False
+
+            if self.state == HALF_OPEN:
+                if self._probe_in_flight:
+                    return False
+                self._probe_in_flight = True
+
+            return True
+
+    def record_success(self):
+        """Registra una llamada correcta"""
+        with self._lock:
+            self._add_outcome(True)
+            self._consecutive = 0
+            if self.state == HALF_OPEN:
+                self.state = CLOSED
+                self._outcomes.clear()
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        """Registra un error o timeout del proveedor"""
+        with self._lock:
+            self._add_outcome(False)
+            self._consecutive += 1
+            if self.state == HALF_OPEN or self._should_trip():
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def release(self):
+        """Libera la petición de prueba si la llamada se canceló sin resultado"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def get_state(self) -> Dict[str, Any]:
+        """Devuelve el estado actual y las métricas de la ventana"""
+        with self._lock:
+            self._prune()
+            calls = len(self._outcomes)
+            failures = sum(1 for _, ok in self._outcomes if not ok)
+            retry_in = 0.0
+            if self.state == OPEN:
+                retry_in = max(self.open_seconds - (time.monotonic() - self._opened_at), 0.0)
+            return {
+                "state": self.state,
+                "calls": calls,
+                "failures": failures,
+                "error_rate": failures / calls if calls else 0.0,
+                "consecutive_failures": self._consecutive,
+                "retry_in": round(retry_in, 1)
+            }
+
+    def _should_trip(self) -> bool:
+        if self._consecutive >= self.consecutive_failures:
+            return True
+        calls = len(self._outcomes)
+        if calls < self.min_calls:
+            return False
+        failures = sum(1 for _, ok in self._outcomes if not ok)
+        return failures / calls >= self.failure_threshold
+
+    def _add_outcome(self, success: bool):
+        self._outcomes.append((time.monotonic(), success))
+        self._prune()
+
+    def _prune(self):
+        limit = time.monotonic() - self.window_seconds
+        while self._outcomes and self._outcomes[0][0] < limit:
+            self._outcomes.popleft()
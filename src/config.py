@@ -6,6 +6,7 @@ de IA disponibles, incluyendo modelos, endpoints y características.
 """
 
 import os
+import tempfile
 from typing import Optional
 
 try:
@@ -14,6 +15,9 @@ try:
 except ImportError:
     pass  # dotenv es opcional
 
+# Estado local que sobrevive a los reinicios (consumo de cuotas, latencias aprendidas)
+STATE_DIR = os.getenv("CV_STATE_DIR") or os.path.join(os.path.dirname(__file__), "data", "state")
+
 # Configuración de APIs disponibles
 API_CONFIGS = {
     "huggingface_free": {
@@ -30,6 +34,7 @@ API_CONFIGS = {
         "endpoint": "https://api-inference.huggingface.co/models/",
         "requires_key": True,
         "free": True,
+        "rate_limit": {"requests_per_minute": 20, "burst": 5},
         "description": "Modelos gratuitos de Hugging Face con límites de uso",
         "docs_url": "https://huggingface.co/docs/api-inference/index"
     },
@@ -45,6 +50,7 @@ API_CONFIGS = {
         "endpoint": "https://api.openai.com/v1/chat/completions",
         "requires_key": True,
         "free": False,
+        "rate_limit": {"requests_per_minute": 500, "burst": 50},
         "description": "Modelos de OpenAI con excelente calidad (de pago)",
         "docs_url": "https://platform.openai.com/docs/api-reference"
     },
@@ -59,6 +65,7 @@ API_CONFIGS = {
         "endpoint": "https://api.anthropic.com/v1/messages",
         "requires_key": True,
         "free": False,
+        "rate_limit": {"requests_per_minute": 50, "burst": 10},
         "description": "Claude de Anthropic, excelente para escritura (de pago)",
         "docs_url": "https://docs.anthropic.com/claude/reference"
     },
@@ -74,6 +81,7 @@ API_CONFIGS = {
         "endpoint": "https://api.cohere.ai/v1/generate",
         "requires_key": True,
         "free": "Tier gratuito disponible",
+        "rate_limit": {"requests_per_minute": 20, "burst": 5, "monthly_quota": 1000},
         "description": "Cohere con tier gratuito mensual",
         "docs_url": "https://docs.cohere.com/reference/generate"
     },
@@ -87,6 +95,7 @@ API_CONFIGS = {
         "endpoint": "https://api.groq.com/openai/v1/chat/completions",
         "requires_key": True,
         "free": True,
+        "rate_limit": {"requests_per_minute": 30, "burst": 10},
         "description": "Groq - Inferencia súper rápida con modelos gratuitos",
         "docs_url": "https://console.groq.com/docs/quickstart"
     },
@@ -119,6 +128,7 @@ API_CONFIGS = {
         "endpoint": "https://api.together.xyz/inference",
         "requires_key": True,
         "free": "Créditos gratuitos",
+        "rate_limit": {"requests_per_minute": 60, "burst": 10},
         "description": "Together AI con créditos gratuitos iniciales",
         "docs_url": "https://docs.together.ai/"
     },
@@ -144,6 +154,291 @@ DEFAULT_SETTINGS = {
     "timeout": 60
 }
 
+# Presupuesto de tokens del prompt: la ventana de contexto de cada modelo menos
+# los tokens reservados para la respuesta. Los campos del formulario se
+# recortan hasta que el prompt cabe (los modelos pequeños reciben además las
+# instrucciones compactas)
+PROMPT_SETTINGS = {
+    "default_context_window": 4096,
+    "context_windows": {
+        "microsoft/DialoGPT-large": 1024,
+        "microsoft/DialoGPT-medium": 1024,
+        "facebook/blenderbot-400M-distill": 128,
+        "google/flan-t5-large": 512,
+        "google/flan-t5-base": 512,
+        "bigscience/bloom-560m": 2048,
+        "gpt2": 1024,
+        "gpt-3.5-turbo": 16385,
+        "gpt-3.5-turbo-1106": 16385,
+        "gpt-4": 8192,
+        "gpt-4-turbo-preview": 128000,
+        "gpt-4-1106-preview": 128000,
+        "claude-3-haiku-20240307": 200000,
+        "claude-3-sonnet-20240229": 200000,
+        "claude-3-opus-20240229": 200000,
+        "claude-3-5-sonnet-20241022": 200000,
+        "command-r": 128000,
+        "command-r-plus": 128000,
+        "llama2-70b-4096": 4096,
+        "mixtral-8x7b-32768": 32768,
+        "gemma-7b-it": 8192,
+        "mistralai/Mistral-7B-Instruct-v0.1": 8192
+    },
+    # Ollama usa num_ctx = 2048 salvo que se configure otro valor en el Modelfile
+    "provider_context_windows": {"ollama_local": 2048},
+    "min_output_tokens": 64,  # Tokens de respuesta mínimos aunque el contexto sea muy pequeño
+    "safety_margin": 0.1,  # Fracción del presupuesto reservada por el error de la estimación
+    "full_instructions_min_budget": 1200,  # Por debajo se usan las instrucciones compactas
+    # Caracteres por token aproximados del texto en español según el tokenizador
+    # (el primer fragmento del nombre del modelo que coincida; "default" si ninguno)
+    "chars_per_token": {
+        "gpt2": 2.6,
+        "DialoGPT": 2.6,
+        "blenderbot": 2.6,
+        "flan-t5": 2.8,
+        "default": 3.4
+    },
+    # Modos de salida JSON nativos: response_format (OpenAI/Groq), format (Ollama)
+    # o prefill del asistente con "{" (Anthropic); None = todos los modelos del proveedor
+    "json_modes": {
+        "openai": {"mode": "response_format",
+                   "models": ["gpt-3.5-turbo", "gpt-3.5-turbo-1106", "gpt-4-turbo-preview", "gpt-4-1106-preview"]},
+        "groq": {"mode": "response_format", "models": None},
+        "ollama_local": {"mode": "format", "models": None},
+        "anthropic": {"mode": "prefill", "models": None}
+    },
+    # Precio aproximado en USD por millón de tokens (entrada, salida); los
+    # modelos que no aparecen se consideran gratuitos
+    "pricing": {
+        "gpt-3.5-turbo": (0.5, 1.5),
+        "gpt-3.5-turbo-1106": (1.0, 2.0),
+        "gpt-4": (30.0, 60.0),
+        "gpt-4-turbo-preview": (10.0, 30.0),
+        "gpt-4-1106-preview": (10.0, 30.0),
+        "claude-3-haiku-20240307": (0.25, 1.25),
+        "claude-3-sonnet-20240229": (3.0, 15.0),
+        "claude-3-opus-20240229": (15.0, 75.0),
+        "claude-3-5-sonnet-20241022": (3.0, 15.0),
+        "command": (1.0, 2.0),
+        "command-light": (0.3, 0.6),
+        "command-nightly": (1.0, 2.0),
+        "command-r": (0.5, 1.5),
+        "command-r-plus": (3.0, 15.0),
+        "togethercomputer/llama-2-7b-chat": (0.2, 0.2),
+        "togethercomputer/llama-2-13b-chat": (0.22, 0.22),
+        "mistralai/Mistral-7B-Instruct-v0.1": (0.2, 0.2),
+        "NousResearch/Nous-Hermes-2-Yi-34B": (0.8, 0.8)
+    }
+}
+
+# Caché de respuestas de IA (nivel en disco opcional vía CV_CACHE_DB)
+CACHE_SETTINGS = {
+    "enabled": True,
+    "memory_max_entries": 256,
+    "ttl": 7 * 24 * 3600,  # Una semana
+    "disk_path": os.getenv("CV_CACHE_DB"),
+    "disk_max_entries": 5000,
+    "access_flush_every": 64  # Aciertos en disco acumulados antes de escribir su last_access
+}
+
+# Modo hedged (opt-in vía CV_HEDGING=1): el prompt se envía en carrera al
+# proveedor elegido y a los siguientes de esta lista; gana la primera
+# respuesta válida y el resto se cancelan
+HEDGING_SETTINGS = {
+    "enabled": os.getenv("CV_HEDGING", "").lower() in ("1", "true", "yes"),
+    "providers": [
+        {"provider": "groq", "model": "mixtral-8x7b-32768"},
+        {"provider": "openai", "model": "gpt-3.5-turbo"},
+        {"provider": "anthropic", "model": "claude-3-haiku-20240307"},
+        {"provider": "huggingface_free", "model": "google/flan-t5-large"}
+    ],
+    "stagger_delay": 1.5,  # Segundos entre lanzamientos (0 = todos en paralelo)
+    "max_providers": 3
+}
+
+# Generación por secciones (opt-in vía CV_FAN_OUT=1): en lugar de un único
+# prompt con todo el CV se lanzan en paralelo prompts pequeños para el
+# resumen, cada experiencia y las habilidades, cada uno con su límite de
+# tokens de respuesta. La latencia pasa a ser la de la sección más larga a
+# cambio de más peticiones (y más tokens de entrada) por CV
+FAN_OUT_SETTINGS = {
+    "enabled": os.getenv("CV_FAN_OUT", "").lower() in ("1", "true", "yes"),
+    "output_tokens": {
+        "resumen_profesional": 200,
+        "experiencia_optimizada": 300,  # Por prompt de experiencia
+        "habilidades_organizadas": 250
+    },
+    "max_experience_prompts": 6  # Con más experiencias se agrupan varias por prompt
+}
+
+# Contenido de respaldo especulativo: las plantillas locales se calculan en un
+# hilo mientras se espera al proveedor, listas para usarse al instante si
+# falla. Si no responde antes del plazo blando se usa ese contenido (con lo ya
+# recibido por streaming) y el CV llega en un tiempo acotado aunque el
+# proveedor esté lento o caído. Nunca es menor que el timeout aprendido del
+# modelo, y en streaming solo cuenta mientras no llega nada del proveedor
+FALLBACK_SETTINGS = {
+    "speculative": True,
+    "soft_deadline": float(os.getenv("CV_SOFT_DEADLINE", "30")),  # Segundos (0 = esperar siempre al proveedor)
+    # Plazo por proveedor (0 = sin plazo): un modelo local en frío tarda en cargar
+    "provider_soft_deadlines": {
+        "ollama_local": float(os.getenv("CV_OLLAMA_SOFT_DEADLINE", "0"))
+    }
+}
+
+# Plazo de extremo a extremo de cada generación desde la interfaz: cada etapa
+# recibe el tiempo que queda y, si se agota, se salta o se degrada. La IA
+# termina render_reserve segundos antes para que quede tiempo para el PDF
+DEADLINE_SETTINGS = {
+    "request_budget": float(os.getenv("CV_REQUEST_BUDGET", "90")),  # Segundos
+    "render_reserve": 8.0
+}
+
+# Timeouts adaptativos por proveedor y modelo: percentil `quantile` de las
+# latencias recientes (histograma con decaimiento `decay` por observación)
+# por `factor`, entre floor y ceiling. Hasta reunir min_samples se usa el
+# timeout fijo. Los histogramas se guardan en `path` cada save_interval
+# segundos para conservarlos entre reinicios (CV_LATENCY_FILE vacío = solo en memoria)
+ADAPTIVE_TIMEOUT_SETTINGS = {
+    "enabled": os.getenv("CV_ADAPTIVE_TIMEOUTS", "1") != "0",
+    "quantile": 99,
+    "factor": 2.0,
+    "floor": 5.0,  # Segundos
+    "ceiling": 180.0,
+    "min_samples": 20,
+    "decay": 0.99,  # Unas 100 observaciones de memoria efectiva
+    # Límites superiores (segundos) de los buckets del histograma
+    "buckets": (0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 4.0, 5.0, 7.5, 10.0, 15.0, 20.0,
+                30.0, 45.0, 60.0, 90.0, 120.0, 180.0),
+    "path": os.getenv("CV_LATENCY_FILE", os.path.join(STATE_DIR, "latency_histograms.json")) or None,
+    "save_interval": 30.0
+}
+
+# Circuit breaker por proveedor: se abre con una tasa de errores alta en la
+# ventana o varios errores seguidos, y tras open_seconds deja pasar una prueba
+CIRCUIT_BREAKER_SETTINGS = {
+    "failure_threshold": 0.5,
+    "min_calls": 4,
+    "consecutive_failures": 3,
+    "window_seconds": 120.0,
+    "open_seconds": 30.0
+}
+
+# Cadena de fallback: proveedores (con API key configurada) que se prueban
+# tras el elegido si este falla o tiene el circuito abierto, antes de
+# recurrir a las plantillas de ContentGenerator
+FALLBACK_CHAIN = {
+    "max_attempts": 2,  # Llamadas reales como máximo por generación
+    "providers": [
+        {"provider": "groq", "model": "mixtral-8x7b-32768"},
+        {"provider": "openai", "model": "gpt-3.5-turbo"},
+        {"provider": "anthropic", "model": "claude-3-haiku-20240307"}
+    ]
+}
+
+# Motor de renderizado de PDFs en procesos (CV_RENDER_WORKERS para fijar el tamaño)
+RENDER_SETTINGS = {
+    "max_workers": int(os.getenv("CV_RENDER_WORKERS", "0")) or min(os.cpu_count() or 1, 4),
+    "max_pending": 64,  # Renders esperando turno antes de rechazar
+    "initial_render_time": 0.5,  # Estimación inicial (s) para calcular la espera
+    "start_method": "spawn"  # Evita hacer fork de un proceso con hilos del servidor
+}
+
+# Limitación de peticiones (el ritmo de cada proveedor está en API_CONFIGS["rate_limit"]).
+# El consumo mensual de cada key se guarda en usage_path cada save_interval
+# segundos para que la cuota se respete entre reinicios (CV_USAGE_FILE vacío =
+# solo en memoria, la cuota pasa a ser por proceso)
+RATE_LIMIT_SETTINGS = {
+    "max_wait": 5.0,  # Segundos que se espera un token antes de pasar al siguiente proveedor
+    "default_retry_after": 30.0,  # Bloqueo tras un 429 sin cabecera Retry-After
+    "usage_path": os.getenv("CV_USAGE_FILE", os.path.join(STATE_DIR, "monthly_usage.json")) or None,
+    "save_interval": 10.0
+}
+
+# Planificador de generaciones: un carril por tipo de proveedor con su propia cola
+SCHEDULER_SETTINGS = {
+    "lanes": {
+        "instant": {"concurrency": 16, "max_queue": 64, "initial_service_time": 0.5},  # mock
+        "standard": {"concurrency": 4, "max_queue": 16, "initial_service_time": 20.0},  # gratuitos
+        "premium": {"concurrency": 4, "max_queue": 16, "initial_service_time": 30.0}  # de pago
+    },
+    "gradio_max_size": 200  # Peticiones en la cola de Gradio antes de llegar al planificador
+}
+
+# Almacén de PDFs para descarga: TTL y cuota de disco acotan /tmp
+OUTPUT_SETTINGS = {
+    "directory": os.getenv("CV_OUTPUT_DIR") or os.path.join(tempfile.gettempdir(), "cv-creator-ai"),
+    "ttl": 3600,  # Segundos que un PDF permanece disponible para descarga
+    "max_bytes": 200 * 1024 * 1024,
+    "max_files": 2000,
+    "cleanup_interval": 300  # Segundos entre limpiezas por TTL aunque no se guarde nada (0 = solo al guardar)
+}
+
+# Generación por lotes (python -m src.batch)
+BATCH_SETTINGS = {
+    "concurrency": 8,  # Registros generándose a la vez (llamadas de IA en vuelo)
+    "progress_interval": 5.0  # Segundos entre líneas de progreso
+}
+
+# Temas de plantillas PDF: los JSON de themes_dir se registran junto a los incluidos
+TEMPLATE_SETTINGS = {
+    "builtin_themes": os.path.join(os.path.dirname(__file__), "data", "themes.json"),
+    "themes_dir": os.getenv("CV_THEMES_DIR")
+}
+
+# Vista previa en vivo de la primera página
+PREVIEW_SETTINGS = {
+    "debounce": 0.3,  # Segundos sin nuevas ediciones antes de renderizar
+    "budget_ms": 150,  # Latencia objetivo por edición; se registra cuando se supera
+    "cache_size": 256,  # Secciones maquetadas en la caché LRU (compartida entre sesiones)
+    "concurrency": 8  # Renders de vista previa simultáneos en la cola de Gradio
+}
+
+# Miniaturas de plantillas (engine: "auto" usa PyMuPDF si está instalado, si no Pillow)
+THUMBNAIL_SETTINGS = {
+    "dpi": 48,  # Resolución de la página rasterizada (A4 a 48 dpi ≈ 397x561 px)
+    "format": "WEBP",  # WEBP o PNG
+    "engine": "auto",
+    "max_bytes": 16 * 1024 * 1024,  # Memoria máxima de la caché de miniaturas
+    "max_entries": 512,
+    "warm_up": True  # Pre-renderizar las miniaturas de ejemplo al arrancar
+}
+
+# Base de conocimiento por sector (palabras clave ATS y plantillas), recargable en caliente
+KNOWLEDGE_BASE_SETTINGS = {
+    "path": os.getenv("CV_SECTOR_PACK") or os.path.join(os.path.dirname(__file__), "data", "sector_pack.json"),
+    "check_interval": 5.0  # Segundos entre comprobaciones de cambios en el archivo
+}
+
+# Trazas de la generación (spans por etapa) y métricas para /metrics
+TRACING_SETTINGS = {
+    "enabled": os.getenv("CV_TRACING", "1") != "0",
+    "export_path": os.getenv("CV_TRACE_FILE"),  # Archivo OTLP/JSON (una petición de exportación por línea); None = sin exportar
+    "service_name": "cv-creator-ai",
+    # Límites superiores (segundos) de los buckets de los histogramas de latencia
+    "buckets": (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+    "max_batch": 512  # Spans pendientes de exportar antes de volcar aunque la traza no haya terminado
+}
+
+# Límites del pool de conexiones HTTP asíncrono (uno compartido por proveedor)
+CONNECTION_LIMITS = {
+    "default": {
+        "max_connections": 20,
+        "max_keepalive_connections": 10,
+        "keepalive_expiry": 30.0
+    },
+    "huggingface_free": {
+        "max_connections": 5,
+        "max_keepalive_connections": 5,
+        "keepalive_expiry": 30.0
+    },
+    "ollama_local": {
+        "max_connections": 4,  # Ollama procesa pocas peticiones a la vez
+        "max_keepalive_connections": 4,
+        "keepalive_expiry": 60.0
+    }
+}
+
 # Variables de entorno para API keys
 def get_api_key(provider: str) -> str:
     """Obtiene la API key desde variables de entorno"""
@@ -174,6 +469,10 @@ def get_provider_info(provider: str) -> dict:
     """Obtiene información completa del proveedor"""
     return API_CONFIGS.get(provider, {})
 
+def get_connection_limits(provider: str) -> dict:
+    """Obtiene los límites del pool de conexiones para un proveedor"""
+    return CONNECTION_LIMITS.get(provider, CONNECTION_LIMITS["default"])
+
 def get_free_providers() -> list:
     """Obtiene lista de proveedores gratuitos"""
     return [
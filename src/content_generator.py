@@ -5,120 +5,51 @@ Este módulo proporciona funcionalidad para generar contenido de CV
 cuando las APIs de IA no están disponibles o fallan.
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 import re
 
+from .keyword_matcher import KeywordMatch
+from .knowledge_base import get_sector_pack
+from .deadline import Deadline, record_overrun
+from . import tracing
+
+
 class ContentGenerator:
-    def __init__(self):
-        # Palabras clave ATS por sector (expandidas)
-        self.ats_keywords = {
-            "tech": [
-                "JavaScript", "Python", "React", "Node.js", "SQL", "Git", "Docker", "AWS", 
-                "Agile", "Scrum", "API", "REST", "Microservices", "CI/CD", "DevOps",
-                "Machine Learning", "Data Analysis", "Problem Solving", "Team Leadership",
-                "Full Stack", "Frontend", "Backend", "Database Management", "Cloud Computing",
-                "TypeScript", "MongoDB", "PostgreSQL", "Redis", "Kubernetes", "Jenkins",
-                "HTML5", "CSS3", "Vue.js", "Angular", "Express.js", "GraphQL", "NoSQL",
-                "TDD", "Unit Testing", "Integration Testing", "Performance Optimization"
-            ],
-            "marketing": [
-                "Digital Marketing", "SEO", "SEM", "Social Media", "Content Strategy",
-                "Analytics", "Google Analytics", "Campaign Management", "Lead Generation",
-                "Brand Management", "Market Research", "Email Marketing", "CRM",
-                "ROI Optimization", "A/B Testing", "Customer Acquisition", "PPC",
-                "Content Creation", "Influencer Marketing", "Marketing Automation",
-                "Conversion Rate Optimization", "Customer Journey Mapping", "KPI Analysis"
-            ],
-            "sales": [
-                "Sales Management", "Lead Generation", "Customer Relationship Management",
-                "CRM", "Pipeline Management", "Revenue Growth", "Account Management",
-                "Negotiation", "Closing Deals", "B2B Sales", "B2C Sales", "Prospecting",
-                "Sales Forecasting", "Territory Management", "Key Account Management",
-                "Consultative Selling", "Solution Selling", "Customer Retention"
-            ],
-            "design": [
-                "UI Design", "UX Design", "User Experience", "User Interface", "Figma",
-                "Adobe Creative Suite", "Photoshop", "Illustrator", "Sketch", "InVision",
-                "Wireframing", "Prototyping", "User Research", "Design Thinking",
-                "Visual Design", "Interaction Design", "Information Architecture"
-            ],
-            "general": [
-                "Project Management", "Leadership", "Communication", "Problem Solving",
-                "Team Collaboration", "Strategic Planning", "Process Improvement",
-                "Data Analysis", "Customer Service", "Time Management", "Adaptability",
-                "Innovation", "Critical Thinking", "Results-Oriented", "Multi-tasking",
-                "Cross-functional Collaboration", "Stakeholder Management", "Budget Management"
-            ]
-        }
-        
-        # Plantillas mejoradas con optimización ATS
-        self.enhanced_templates = {
-            "tech": {
-                "summary": """Desarrollador {experience_level} con {years}+ años de experiencia especializado en {tech_skills} y arquitecturas escalables. Expertise comprobado en metodologías Agile/Scrum, desarrollo Full Stack y implementación de soluciones cloud-native. Historial demostrado de liderazgo técnico, optimización de rendimiento y entrega de proyectos de alto impacto en equipos multidisciplinarios.""",
-                
-                "experience_bullets": [
-                    "Desarrollé y mantuve aplicaciones web escalables utilizando {tech_stack}, mejorando el rendimiento del sistema en un 40% y reduciendo los tiempos de carga",
-                    "Implementé arquitecturas de microservicios y APIs RESTful, optimizando la escalabilidad y facilitando la integración con sistemas externos",
-                    "Lideré equipos de desarrollo en metodologías Agile/Scrum, coordinando sprints, daily standups y retrospectivas para maximizar la productividad",
-                    "Aplicé principios de DevOps incluyendo CI/CD pipelines, containerización con Docker y despliegue automatizado en plataformas cloud",
-                    "Mentoricé a desarrolladores junior, establecí estándares de código y lideré code reviews para mantener alta calidad del software"
-                ]
-            },
-            
-            "marketing": {
-                "summary": """Especialista en Marketing Digital con {years}+ años de experiencia en estrategias de crecimiento y optimización ROI. Expertise en SEO/SEM, Social Media Marketing y análisis avanzado de datos con Google Analytics. Historial comprobado de incremento de conversiones (+35%), generación de leads cualificados y gestión exitosa de presupuestos de marketing. Experiencia en liderazgo de equipos creativos y colaboración cross-funcional.""",
-                
-                "experience_bullets": [
-                    "Desarrollé e implementé estrategias de marketing digital omnicanal que incrementaron el tráfico orgánico en un 60% y las conversiones en un 35%",
-                    "Gestioné campañas de SEM y Social Media Advertising con presupuestos de €75K+, optimizando el ROAS y reduciendo el CPA en un 25%",
-                    "Realicé análisis profundo de mercado y segmentación de audiencias para optimizar el targeting y personalizar el customer journey",
-                    "Implementé sistemas de marketing automation y lead scoring que mejoraron la calificación de leads en un 40%",
-                    "Colaboré con equipos de ventas y producto para alinear estrategias go-to-market y optimizar el funnel de conversión"
-                ]
-            },
-            
-            "sales": {
-                "summary": """Profesional de Ventas con {years}+ años de experiencia en gestión de cuentas clave y desarrollo de nuevos mercados. Expertise en consultative selling, negociación estratégica y gestión de pipeline. Historial comprobado de superación de objetivos de ventas (+120% quota achievement), retención de clientes y crecimiento de revenue. Experiencia en CRM management y análisis de métricas de ventas.""",
-                
-                "experience_bullets": [
-                    "Gestioné cartera de cuentas clave generando €2M+ en revenue anual, manteniendo una tasa de retención del 95%",
-                    "Desarrollé nuevos territorios de venta identificando oportunidades de mercado y estableciendo relaciones estratégicas con stakeholders",
-                    "Implementé procesos de sales enablement y metodologías consultivas que incrementaron la tasa de cierre en un 30%",
-                    "Colaboré con equipos de marketing para optimizar lead generation y desarrollar contenido de apoyo a ventas",
-                    "Mentoricé a sales representatives junior y establecí best practices para accelerar el ciclo de ventas"
-                ]
-            }
-        }
+    @property
+    def ats_keywords(self) -> Dict[str, Tuple[str, ...]]:
+        """Palabras clave ATS por sector de la base de conocimiento compartida"""
+        return get_sector_pack().ats_keywords
+
+    @property
+    def enhanced_templates(self) -> Dict[str, Dict[str, Any]]:
+        """Plantillas de resumen y bullets por sector de la base de conocimiento compartida"""
+        return get_sector_pack().enhanced_templates
 
     def detect_sector(self, experience_text: str, skills_text: str, objective_text: str = "") -> str:
         """Detecta el sector profesional basado en experiencia, habilidades y objetivo"""
-        text = f"{experience_text} {skills_text} {objective_text}".lower()
-        
-        sector_indicators = {
-            "tech": ["programador", "desarrollador", "software", "web", "javascript", "python", 
-                    "react", "api", "backend", "frontend", "fullstack", "devops", "coding"],
-            "marketing": ["marketing", "publicidad", "seo", "sem", "social media", "campañas", 
-                         "digital", "brand", "content", "analytics", "roi"],
-            "sales": ["ventas", "comercial", "account", "cliente", "negociación", "revenue", 
-                     "pipeline", "crm", "prospecting"],
-            "design": ["diseño", "design", "ux", "ui", "figma", "photoshop", "illustrator", 
-                      "creative", "visual", "wireframe", "prototype"]
-        }
-        
-        sector_scores = {}
-        for sector, indicators in sector_indicators.items():
-            score = sum(1 for indicator in indicators if indicator in text)
-            sector_scores[sector] = score
+        sector_scores, _ = self.score_sectors(experience_text, skills_text, objective_text)
         
         detected_sector = max(sector_scores, key=sector_scores.get)
-        return detected_sector if sector_scores[detected_sector] > 0 else "general"
+        return detected_sector if sector_scores[detected_sector] > 0 else get_sector_pack().fallback_sector
+
+    def score_sectors(self, experience_text: str, skills_text: str,
+                      objective_text: str = "") -> Tuple[Dict[str, int], List[KeywordMatch]]:
+        """
+        Puntúa cada sector en una sola pasada por el texto
+        
+        Returns:
+            tuple: ({sector: nº de indicadores distintos}, coincidencias con su posición
+                   en el texto "experiencia habilidades objetivo")
+        """
+        text = f"{experience_text} {skills_text} {objective_text}"
+        return get_sector_pack().sector_matcher.score(text)
 
     def enhance_with_ats_keywords(self, text: str, sector: str) -> str:
         """Mejora el texto añadiendo palabras clave ATS relevantes de forma natural"""
         if not text:
             return text
             
-        keywords = self.ats_keywords.get(sector, self.ats_keywords["general"])
+        keywords = get_sector_pack().keywords_for(sector)
         
         # Convierte texto a lista de palabras para análisis
         words_in_text = text.lower().split()
@@ -154,8 +85,14 @@ class ContentGenerator:
         job_count = len([job for job in jobs if job.strip()])
         return min(job_count * 2, 8)  # Max 8 años estimados
 
-    def generate_enhanced_cv_content(self, form_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Genera contenido de CV optimizado para ATS con detección inteligente de sector"""
+    def generate_enhanced_cv_content(self, form_data: Dict[str, Any],
+                                     deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """
+        Genera contenido de CV optimizado para ATS con detección inteligente de sector
+
+        Si el plazo de la petición ya venció, las habilidades no se completan
+        con keywords ATS del sector (contenido mínimo pero válido).
+        """
         
         # Detecta el sector profesional
         sector = self.detect_sector(
@@ -200,9 +137,12 @@ class ContentGenerator:
             summary = self._generate_enhanced_summary(form_data, sector, years)
             enhanced_experience = self._process_work_experience(form_data)
         
-        # Optimiza habilidades con keywords ATS
+        # Optimiza habilidades con keywords ATS (se omiten si ya no queda plazo)
+        add_keywords = deadline is None or not deadline.expired()
+        if not add_keywords:
+            record_overrun("content")
         enhanced_skills = self._optimize_skills_for_ats(
-            form_data.get('habilidades', ''), sector
+            form_data.get('habilidades', ''), sector, add_keywords
         )
         
         return {
@@ -213,6 +153,12 @@ class ContentGenerator:
             'nivel_experiencia': f"{years} años"
         }
 
+    @tracing.traced("content.fallback")
+    def generate_fallback_content(self, form_data: Dict[str, Any],
+                                  deadline: Optional[Deadline] = None) -> Dict[str, Any]:
+        """Genera el contenido de respaldo usado cuando la IA no está disponible o falla"""
+        return self.generate_enhanced_cv_content(form_data, deadline)
+
     def _enhance_experience_with_bullets(self, original_experience: str, bullet_templates: List[str], skills: str) -> List[Dict[str, Any]]:
         """Mejora la experiencia laboral usando bullets optimizados para ATS"""
         if not original_experience:
@@ -253,59 +199,39 @@ class ContentGenerator:
         
         return enhanced_jobs
 
-    def _optimize_skills_for_ats(self, skills_text: str, sector: str) -> Dict[str, List[str]]:
+    def _optimize_skills_for_ats(self, skills_text: str, sector: str,
+                                 add_keywords: bool = True) -> Dict[str, List[str]]:
         """Optimiza y categoriza las habilidades añadiendo keywords ATS relevantes"""
         
         # Obtiene keywords del sector
-        sector_keywords = self.ats_keywords.get(sector, self.ats_keywords["general"])
+        pack = get_sector_pack()
+        sector_keywords = pack.keywords_for(sector)
         
         # Procesa habilidades del usuario
         user_skills = []
         if skills_text:
             user_skills = [s.strip() for s in skills_text.split(',') if s.strip()]
         
-        # Categoriza habilidades
-        technical_skills = []
-        soft_skills = []
-        tools_skills = []
-        
-        # Palabras clave para categorización
-        tech_indicators = ["javascript", "python", "react", "sql", "api", "cloud", "docker", "programming"]
-        soft_indicators = ["leadership", "communication", "teamwork", "management", "analytical"]
-        tools_indicators = ["excel", "photoshop", "figma", "jira", "salesforce", "analytics"]
-        
         # Categoriza habilidades existentes
+        categorized = {"tecnicas": [], "blandas": [], "herramientas": []}
         for skill in user_skills:
-            skill_lower = skill.lower()
-            if any(indicator in skill_lower for indicator in tech_indicators):
-                technical_skills.append(skill)
-            elif any(indicator in skill_lower for indicator in soft_indicators):
-                soft_skills.append(skill)
-            elif any(indicator in skill_lower for indicator in tools_indicators):
-                tools_skills.append(skill)
-            else:
-                technical_skills.append(skill)  # Default a técnicas
-        
-        # Añade keywords ATS relevantes
-        for keyword in sector_keywords:
-            keyword_lower = keyword.lower()
-            
-            # Evita duplicados
-            if not any(keyword_lower in existing.lower() for existing in technical_skills + soft_skills + tools_skills):
-                if any(indicator in keyword_lower for indicator in tech_indicators):
-                    technical_skills.append(keyword)
-                elif any(indicator in keyword_lower for indicator in soft_indicators):
-                    soft_skills.append(keyword)
-                elif any(indicator in keyword_lower for indicator in tools_indicators):
-                    tools_skills.append(keyword)
-                else:
-                    technical_skills.append(keyword)
+            categorized[pack.skill_category(skill)].append(skill)
+        
+        # Añade keywords ATS relevantes evitando duplicados: una pasada del
+        # matcher del sector sobre las habilidades ya presentes
+        matcher, keyword_categories = pack.ats_matcher_for(sector)
+        present = matcher.keywords_in("\n".join(user_skills))
+        for keyword in (sector_keywords if add_keywords else ()):
+            if keyword.lower() in present:
+                continue
+            categorized[keyword_categories[keyword]].append(keyword)
+            present |= matcher.keywords_in(keyword)
         
         # Limita el número de habilidades por categoría
         return {
-            "tecnicas": technical_skills[:8],
-            "blandas": soft_skills[:5],
-            "herramientas": tools_skills[:5]
+            "tecnicas": categorized["tecnicas"][:8],
+            "blandas": categorized["blandas"][:5],
+            "herramientas": categorized["herramientas"][:5]
         }
 
     def _generate_enhanced_summary(self, form_data: Dict[str, Any], sector: str, years: int) -> str:
@@ -313,15 +239,7 @@ class ContentGenerator:
         name = form_data.get('nombre', 'Profesional')
         experience_level = "Senior" if years >= 7 else "Mid-level" if years >= 3 else "Junior"
         
-        sector_titles = {
-            "tech": "Desarrollador",
-            "marketing": "Especialista en Marketing", 
-            "sales": "Profesional de Ventas",
-            "design": "Diseñador",
-            "general": "Profesional"
-        }
-        
-        title = sector_titles.get(sector, "Profesional")
+        title = get_sector_pack().titles.get(sector, "Profesional")
         
         summary = f"""{title} {experience_level} con {years}+ años de experiencia demostrada en {sector}. 
         Expertise en resolución de problemas complejos, liderazgo de equipos y entrega de resultados excepcionales. 
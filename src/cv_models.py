@@ -0,0 +1,177 @@
+"""
+Modelos tipados del contenido del CV
+
+El contenido que devuelve la IA (o el generador local) se valida y normaliza
+con estos modelos en la frontera de AIService, antes de que llegue a los
+generadores de PDF: descripciones como texto en lugar de lista, habilidades
+separadas por comas, periodos numéricos o experiencias sin puesto se corrigen
+o se rechazan ahí, y no al maquetar el PDF después de la llamada al modelo.
+
+Además ofrecen una representación compacta (listas posicionales sin nombres
+de campo) serializable a JSON o, si está instalado, a msgpack, que usan la
+caché de respuestas y los pipelines por lotes.
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, field_validator
+
+try:
+    import msgpack  # Opcional: serialización binaria más compacta
+except ImportError:
+    msgpack = None
+
+__all__ = [
+    "WorkExperience", "Skills", "CVContent", "ValidationError",
+    "SKILL_CATEGORIES", "REQUIRED_SECTIONS", "SERIALIZATION_FORMATS"
+]
+
+SKILL_CATEGORIES = ("tecnicas", "blandas", "herramientas")
+REQUIRED_SECTIONS = ("resumen_profesional", "experiencia_optimizada", "habilidades_organizadas")
+SERIALIZATION_FORMATS = ("json", "msgpack") if msgpack is not None else ("json",)
+
+# Viñetas al principio de una línea de descripción ("- ", "• ", "* ", "1. ")
+_BULLET = re.compile(r"^\s*(?:[-•*·]|\d+[.)])\s*")
+_LINE_SEPARATOR = re.compile(r"\n")
+_SKILL_SEPARATOR = re.compile(r"[,;\n]")
+
+
+def _text_list(value: Any, separator: re.Pattern) -> List[str]:
+    """Normaliza texto o listas de valores a una lista de textos no vacíos"""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = separator.split(value)
+    elif not isinstance(value, (list, tuple)):
+        value = [value]
+    items = []
+    for item in value:
+        if isinstance(item, (str, int, float)) and not isinstance(item, bool):
+            text = _BULLET.sub("", str(item)).strip()
+            if text:
+                items.append(text)
+    return items
+
+
+class WorkExperience(BaseModel):
+    """Un puesto de la experiencia optimizada"""
+
+    model_config = ConfigDict(str_strip_whitespace=True, extra="ignore")
+
+    puesto: str = Field(min_length=1)
+    empresa: str = Field(min_length=1)
+    periodo: str = ""
+    descripcion: List[str] = Field(default_factory=list)
+
+    @field_validator("periodo", mode="before")
+    @classmethod
+    def _coerce_periodo(cls, value: Any) -> str:
+        return "" if value is None else str(value)
+
+    @field_validator("descripcion", mode="before")
+    @classmethod
+    def _coerce_descripcion(cls, value: Any) -> List[str]:
+        return _text_list(value, _LINE_SEPARATOR)
+
+
+class Skills(BaseModel):
+    """Habilidades organizadas por categoría (las categorías desconocidas se descartan)"""
+
+    model_config = ConfigDict(extra="ignore")
+
+    tecnicas: List[str] = Field(default_factory=list)
+    blandas: List[str] = Field(default_factory=list)
+    herramientas: List[str] = Field(default_factory=list)
+
+    @field_validator(*SKILL_CATEGORIES, mode="before")
+    @classmethod
+    def _coerce_list(cls, value: Any) -> List[str]:
+        return _text_list(value, _SKILL_SEPARATOR)
+
+
+class CVContent(BaseModel):
+    """Contenido del CV generado por la IA o por el generador local"""
+
+    model_config = ConfigDict(str_strip_whitespace=True, extra="ignore")
+
+    resumen_profesional: str = Field(min_length=1)
+    experiencia_optimizada: List[WorkExperience] = Field(default_factory=list)
+    habilidades_organizadas: Skills = Field(default_factory=Skills)
+    # Solo los rellena el generador local
+    sector_detectado: Optional[str] = None
+    nivel_experiencia: Optional[str] = None
+
+    @field_validator("experiencia_optimizada", mode="before")
+    @classmethod
+    def _coerce_experiencias(cls, value: Any) -> Any:
+        if value is None:
+            return []
+        return [value] if isinstance(value, dict) else value
+
+    @classmethod
+    def parse(cls, data: Any) -> Optional["CVContent"]:
+        """Valida y normaliza el contenido; None si falta alguna sección o no es válida"""
+        if not isinstance(data, dict) or not all(key in data for key in REQUIRED_SECTIONS):
+            return None
+        try:
+            return cls.model_validate(data)
+        except ValidationError:
+            return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Diccionario con la estructura que esperan los generadores de PDF"""
+        return self.model_dump(exclude_none=True)
+
+    def to_compact(self) -> list:
+        """Listas posicionales sin nombres de campo (mucho más pequeñas al serializar)"""
+        skills = self.habilidades_organizadas
+        return [
+            self.resumen_profesional,
+            [[exp.puesto, exp.empresa, exp.periodo, exp.descripcion] for exp in self.experiencia_optimizada],
+            [skills.tecnicas, skills.blandas, skills.herramientas],
+            self.sector_detectado,
+            self.nivel_experiencia
+        ]
+
+    @classmethod
+    def from_compact(cls, data: list) -> "CVContent":
+        """
+        Reconstruye el contenido desde to_compact() sin volver a validarlo
+
+        Solo para datos producidos por to_compact() (caché, lotes): los
+        modelos se construyen directamente, sin el coste de la validación.
+        """
+        resumen, experiencias, skills, sector, nivel = data
+        return cls.model_construct(
+            resumen_profesional=resumen,
+            experiencia_optimizada=[
+                WorkExperience.model_construct(puesto=puesto, empresa=empresa, periodo=periodo, descripcion=descripcion)
+                for puesto, empresa, periodo, descripcion in experiencias
+            ],
+            habilidades_organizadas=Skills.model_construct(**dict(zip(SKILL_CATEGORIES, skills))),
+            sector_detectado=sector,
+            nivel_experiencia=nivel
+        )
+
+    def dumps(self, format: str = "json") -> bytes:
+        """Serializa la representación compacta a JSON o msgpack"""
+        if format == "msgpack":
+            if msgpack is None:
+                raise ValueError("msgpack no está instalado (pip install msgpack)")
+            return msgpack.packb(self.to_compact(), use_bin_type=True)
+        if format != "json":
+            raise ValueError(f"Formato de serialización desconocido: {format}")
+        return json.dumps(self.to_compact(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    @classmethod
+    def loads(cls, data: bytes, format: str = "json") -> "CVContent":
+        """Inverso de dumps()"""
+        if format == "msgpack":
+            if msgpack is None:
+                raise ValueError("msgpack no está instalado (pip install msgpack)")
+            return cls.from_compact(msgpack.unpackb(data, raw=False))
+        if format != "json":
+            raise ValueError(f"Formato de serialización desconocido: {format}")
+        return cls.from_compact(json.loads(data))
@@ -0,0 +1,104 @@
+"""
+Plazo de extremo a extremo de una generación
+
+La aplicación crea un Deadline por petición y lo pasa a cada etapa
+(validación, cola, IA, contenido de respaldo y PDF): cada una acota sus
+esperas con el tiempo que queda y, cuando se agota, se salta o se degrada en
+lugar de seguir trabajando para un usuario que ya no espera. Las etapas que
+se quedan sin plazo se cuentan como desbordamientos por etapa, exportados en
+/metrics.
+
+El Deadline se puede enviar a los workers del pool de PDFs: usa el reloj
+monotónico del sistema, común a todos los procesos de la máquina.
+"""
+
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+
+class DeadlineExceeded(Exception):
+    """Una etapa no puede empezar o terminar dentro del plazo de la petición"""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        super().__init__(f"Plazo agotado en la etapa '{stage}'")
+
+    def __reduce__(self):
+        # Vuelve de los workers del pool de PDFs con su etapa
+        return DeadlineExceeded, (self.stage,)
+
+
+_overruns: Counter = Counter()
+_overruns_lock = threading.Lock()
+
+
+def record_overrun(stage: str):
+    """Cuenta una etapa que se quedó sin plazo"""
+    with _overruns_lock:
+        _overruns[stage] += 1
+
+
+def get_overruns() -> Dict[str, int]:
+    """Desbordamientos de plazo por etapa"""
+    with _overruns_lock:
+        return dict(_overruns)
+
+
+def render_metrics() -> str:
+    """Contador de desbordamientos por etapa en formato de texto de Prometheus"""
+    lines = [
+        "# HELP cv_deadline_overruns_total Etapas que se quedaron sin el plazo de la petición",
+        "# TYPE cv_deadline_overruns_total counter"
+    ]
+    for stage, count in sorted(get_overruns().items()):
+        lines.append(f'cv_deadline_overruns_total{{stage="{stage}"}} {count}')
+    return "\n".join(lines) + "\n"
+
+
+class Deadline:
+    """Instante límite de una petición y el tiempo que le queda"""
+
+    __slots__ = ("budget", "expires_at")
+
+    def __init__(self, budget: float, expires_at: Optional[float] = None):
+        self.budget = budget
+        self.expires_at = expires_at if expires_at is not None else time.monotonic() + budget
+
+    def remaining(self) -> float:
+        """Segundos que quedan (0 si ya venció)"""
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def timeout(self, default: Optional[float] = None) -> float:
+        """Espera máxima de una operación: default acotado por lo que queda (sin default, lo que queda)"""
+        remaining = self.remaining()
+        return min(default, remaining) if default else remaining
+
+    def shortened(self, reserve: float) -> "Deadline":
+        """Plazo que vence `reserve` segundos antes (deja tiempo a las etapas siguientes)"""
+        return Deadline(max(self.budget - reserve, 0.0), self.expires_at - reserve)
+
+    def check(self, stage: str):
+        """
+        Comprueba que queda plazo antes de empezar una etapa
+
+        Raises:
+            DeadlineExceeded: Si ya venció (el desbordamiento queda registrado)
+        """
+        if self.expired():
+            record_overrun(stage)
+            raise DeadlineExceeded(stage)
+
+    @contextmanager
+    def stage(self, stage: str):
+        """Registra un desbordamiento si el plazo vence durante el bloque"""
+        try:
+            yield self
+        finally:
+            if self.expired():
+                record_overrun(stage)
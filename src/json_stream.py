@@ -0,0 +1,387 @@
+"""
+Parser JSON incremental para respuestas de IA en streaming
+
+Este módulo procesa la respuesta del modelo a medida que llegan los tokens y
+expone los campos de primer nivel en cuanto su valor se cierra, de modo que la
+interfaz puede mostrar, por ejemplo, el resumen profesional antes de que el
+modelo termine de escribir la experiencia o las habilidades.
+
+También incluye el extractor que obtiene el objeto JSON de la respuesta
+completa: tolera bloques markdown, texto antes y después del objeto (aunque
+contenga llaves), comas finales y respuestas truncadas, que se reparan
+cerrando las cadenas y estructuras abiertas.
+"""
+
+import json
+import re
+from typing import Dict, Any, List, NamedTuple, Optional
+
+
+class IncrementalJSONParser:
+    """
+    Analiza un objeto JSON que llega por fragmentos
+
+    Solo se escanea cada carácter una vez. El texto previo a la primera llave
+    (bloques markdown, frases introductorias) se ignora. Los elementos ya
+    cerrados de los arrays de primer nivel también se exponen parcialmente.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.fields: Dict[str, Any] = {}
+
+        self._pos = 0
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+        # Estado del par clave/valor de primer nivel en curso
+        self._key = None
+        self._key_start = None
+        self._value_start = None
+        self._value_is_array = False
+        self._item_start = None
+
+    def feed(self, chunk: str) -> List[str]:
+        """
+        Añade un fragmento de texto
+
+        Returns:
+            list: Claves de primer nivel que han cambiado con este fragmento
+        """
+        self.text += chunk
+        updated = []
+        text = self.text
+
+        while self._pos < len(text) and not self._finished:
+            char = text[self._pos]
+            index = self._pos
+            self._pos += 1
+
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._value_start is None and self._key_start is not None:
+                        self._key = self._decode(text[self._key_start:index + 1])
+                        self._key_start = None
+                continue
+
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._value_start is None and self._key is None:
+                    self._key_start = index
+            elif char == ":" and self._depth == 1 and self._key is not None and self._value_start is None:
+                self._value_start = self._pos
+            elif char in "{[":
+                if self._depth == 1 and char == "[" and self._value_start is not None \
+                        and not text[self._value_start:index].strip():
+                    self._value_is_array = True
+                    self._item_start = self._pos
+                elif self._depth == 2 and self._value_is_array:
+                    self._item_start = index
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 3 and self._value_is_array and self._item_start is not None:
+                    if self._add_array_item(text[self._item_start:index + 1]):
+                        updated.append(self._key)
+                    self._item_start = None
+                self._depth -= 1
+                if self._depth == 0:
+                    key = self._key
+                    if self._complete_value(text[self._value_start:index] if self._value_start else ""):
+                        updated.append(key)
+                    self._finished = True
+            elif char == ",":
+                if self._depth == 2 and self._value_is_array and self._item_start is not None:
+                    if self._add_array_item(text[self._item_start:index]):
+                        updated.append(self._key)
+                    self._item_start = self._pos
+                elif self._depth == 1 and self._value_start is not None:
+                    key = self._key
+                    if self._complete_value(text[self._value_start:index]):
+                        updated.append(key)
+
+        return list(dict.fromkeys(key for key in updated if key is not None))
+
+    @property
+    def finished(self) -> bool:
+        """Indica si el objeto JSON de primer nivel ya se ha cerrado"""
+        return self._finished
+
+    def _complete_value(self, raw_value: str) -> bool:
+        """Registra el valor completo de la clave actual"""
+        key = self._key
+        self._key = None
+        self._value_start = None
+        self._value_is_array = False
+        self._item_start = None
+
+        if key is None or not raw_value.strip():
+            return False
+        try:
+            self.fields[key] = json.loads(raw_value)
+            return True
+        except json.JSONDecodeError:
+            return False
+
+    def _add_array_item(self, raw_item: str) -> bool:
+        """Añade un elemento ya cerrado al array parcial de la clave actual"""
+        raw_item = raw_item.strip()
+        if not raw_item:
+            return False
+        try:
+            item = json.loads(raw_item)
+        except json.JSONDecodeError:
+            return False
+        self.fields.setdefault(self._key, []).append(item)
+        return True
+
+    @staticmethod
+    def _decode(raw_string: str):
+        try:
+            return json.loads(raw_string)
+        except json.JSONDecodeError:
+            return None
+
+
+# Fuera de las cadenas: un carácter estructural o un escalar (número, true, false, null)
+_TOKEN = re.compile(r'\s*(?:(["{}\[\],:])|([^\s"{}\[\],:]+))')
+# Cuerpo de una cadena hasta la comilla de cierre (sin consumir un escape incompleto)
+_STRING_BODY = re.compile(r'(?:[^"\\]|\\.)*', re.DOTALL)
+# Escape \uXXXX cortado al final de una cadena truncada
+_PARTIAL_UNICODE = re.compile(r'\\u[0-9a-fA-F]{0,3}$')
+
+
+class ExtractedJSON(NamedTuple):
+    """Objeto extraído de una respuesta y cómo se obtuvo"""
+    value: Dict[str, Any]
+    truncated: bool  # La respuesta se cortó y se cerraron las estructuras abiertas
+    repaired: bool  # Se quitaron comas finales o se corrigieron cierres (o estaba truncada)
+
+
+class _Container:
+    """Objeto o array abierto durante el escaneo"""
+
+    __slots__ = ("is_object", "safe_end", "expecting")
+
+    def __init__(self, is_object: bool, safe_end: int):
+        self.is_object = is_object
+        # Posición tras el último valor completo: cortar ahí deja un prefijo válido
+        self.safe_end = safe_end
+        self.expecting = "key" if is_object else "value"
+
+
+class JSONExtractor:
+    """
+    Extrae en una sola pasada el primer objeto JSON de un texto que llega por fragmentos
+
+    Se ignora todo lo anterior a la primera llave y todo lo posterior a la que
+    la cierra. Las comas finales antes de un cierre se eliminan y un cierre
+    que no corresponde se sustituye por el correcto. Si el texto termina sin
+    cerrar el objeto, result() corta en el último valor completo (las cadenas
+    abiertas se cierran) y añade los cierres que faltan.
+    """
+
+    def __init__(self, text: str = "", start: int = 0):
+        self.text = ""
+        self._pos = start
+        self._start: Optional[int] = None
+        self._end: Optional[int] = None
+        self._stack: List[_Container] = []
+        self._string_start: Optional[int] = None
+        # Posición -> texto que la sustituye ("" elimina el carácter)
+        self._edits: Dict[int, str] = {}
+        self._pending_comma: Optional[int] = None
+        if text:
+            self.feed(text)
+
+    @property
+    def finished(self) -> bool:
+        """Indica si el objeto de primer nivel ya se ha cerrado"""
+        return self._end is not None
+
+    def feed(self, chunk: str):
+        """Añade un fragmento y avanza el escaneo"""
+        self.text += chunk
+        text = self.text
+        length = len(text)
+
+        if self._start is None:
+            start = text.find("{", self._pos)
+            if start == -1:
+                self._pos = length
+                return
+            self._start = start
+            self._stack.append(_Container(True, start + 1))
+            self._pos = start + 1
+
+        pos = self._pos
+        while self._end is None and pos < length:
+            if self._string_start is not None:
+                pos = _STRING_BODY.match(text, pos).end()
+                if pos >= length or text[pos] != '"':
+                    break  # Cadena (o escape) sin cerrar: se espera más texto
+                pos += 1
+                self._close_string(pos)
+                continue
+
+            match = _TOKEN.match(text, pos)
+            if match is None:
+                pos = length  # Solo queda espacio en blanco
+                break
+            char, scalar = match.groups()
+            if scalar is not None:
+                if match.end() >= length:
+                    break  # El escalar puede continuar en el siguiente fragmento
+                self._pending_comma = None
+                self._close_value(match.end())
+                pos = match.end()
+                continue
+
+            index = match.end() - 1
+            pos = match.end()
+            top = self._stack[-1]
+            if char == '"':
+                self._string_start = index
+                self._pending_comma = None
+            elif char in "{[":
+                self._stack.append(_Container(char == "{", pos))
+                self._pending_comma = None
+            elif char in "}]":
+                if self._pending_comma is not None:
+                    self._edits[self._pending_comma] = ""  # Coma final: {"a": 1,}
+                    self._pending_comma = None
+                closer = "}" if top.is_object else "]"
+                if char != closer:
+                    self._edits[index] = closer
+                self._stack.pop()
+                if not self._stack:
+                    self._end = pos
+                else:
+                    self._close_value(pos)
+            elif char == ",":
+                if self._pending_comma is not None:
+                    self._edits[index] = ""  # Coma duplicada
+                else:
+                    self._pending_comma = index
+                top.expecting = "key" if top.is_object else "value"
+            else:  # ":"
+                top.expecting = "value"
+        self._pos = pos
+
+    def result(self) -> Optional[ExtractedJSON]:
+        """
+        Decodifica el objeto extraído, reparándolo si el texto está truncado
+
+        Returns:
+            ExtractedJSON | None: None si no hay objeto o no es JSON válido
+        """
+        if self._start is None:
+            return None
+
+        closing = ""
+        if self._end is not None:
+            end = self._end
+            if not self._edits:
+                try:
+                    value = json.loads(self.text[self._start:end])
+                except json.JSONDecodeError:
+                    return None
+                return ExtractedJSON(value, False, False) if isinstance(value, dict) else None
+        else:
+            end, closing = self._repair_point()
+
+        edits = sorted(position for position in self._edits if position < end)
+        pieces = []
+        previous = self._start
+        for position in edits:
+            pieces.append(self.text[previous:position])
+            pieces.append(self._edits[position])
+            previous = position + 1
+        pieces.append(self.text[previous:end])
+        pieces.append(closing)
+
+        try:
+            value = json.loads("".join(pieces))
+        except json.JSONDecodeError:
+            return None
+        if not isinstance(value, dict):
+            return None
+        return ExtractedJSON(value, self._end is None, True)
+
+    def _close_string(self, end: int):
+        """Cierra la cadena en curso: es una clave o un valor completo"""
+        self._string_start = None
+        top = self._stack[-1]
+        if top.is_object and top.expecting == "key":
+            top.expecting = "colon"
+        else:
+            self._close_value(end)
+
+    def _close_value(self, end: int):
+        top = self._stack[-1]
+        top.safe_end = end
+        top.expecting = "comma"
+
+    def _repair_point(self):
+        """Posición de corte del texto truncado y cierres que hay que añadir"""
+        text = self.text
+        top = self._stack[-1]
+        end = top.safe_end
+        suffix = ""
+
+        in_value = not top.is_object or top.expecting == "value"
+        if self._string_start is not None:
+            if in_value:
+                # Valor de cadena cortado: se conserva lo recibido sin el escape incompleto
+                end = len(text)
+                if self._pos < end:
+                    end = self._pos  # Barra invertida final sin carácter escapado
+                partial = _PARTIAL_UNICODE.search(text, self._string_start, end)
+                if partial is not None:
+                    end = partial.start()
+                suffix = '"'
+        elif in_value:
+            scalar = text[self._pos:].strip()
+            if scalar:
+                try:
+                    json.loads(scalar)
+                    end = len(text)
+                except json.JSONDecodeError:
+                    pass  # Número o literal a medias: se descarta
+
+        closers = "".join("}" if container.is_object else "]" for container in reversed(self._stack))
+        return end, suffix + closers
+
+
+def extract_json(text: str, max_candidates: int = 4) -> Optional[ExtractedJSON]:
+    """
+    Extrae el objeto JSON de la respuesta de un modelo
+
+    Si lo que empieza en la primera llave no es JSON válido (p. ej. una llave
+    en el texto introductorio), se prueba desde las siguientes llaves.
+
+    Returns:
+        ExtractedJSON | None: Objeto (reparado si hacía falta) o None
+    """
+    start = text.find("{")
+    for _ in range(max_candidates):
+        if start == -1:
+            return None
+        extracted = JSONExtractor(text, start).result()
+        if extracted is not None:
+            return extracted
+        start = text.find("{", start + 1)
+    return None
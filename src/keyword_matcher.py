@@ -0,0 +1,141 @@
+"""
+Búsqueda de múltiples palabras clave en una sola pasada
+
+Este módulo compila una lista (o varios grupos) de palabras clave en una única
+expresión regular con forma de trie: las alternativas comparten prefijos, de
+modo que en cada posición del texto solo se exploran las ramas que coinciden
+con el carácter actual, al estilo de Aho–Corasick. Las coincidencias respetan
+límites de palabra ("api" no coincide dentro de "capital") y no distinguen
+mayúsculas.
+"""
+
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Set, Tuple
+
+
+class KeywordMatch(NamedTuple):
+    """Coincidencia de una palabra clave en el texto"""
+    start: int
+    end: int
+    keyword: str
+    groups: Tuple[str, ...]
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def _build_trie(words: Iterable[str]) -> Dict[str, dict]:
+    trie: Dict[str, dict] = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    return trie
+
+
+def _trie_pattern(trie: Dict[str, dict]) -> str:
+    """Construye una expresión regular sin backtracking entre alternativas hermanas"""
+
+    def build(node: Dict[str, dict]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        pattern = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            pattern = "(?:" + pattern + ")?"
+        return pattern
+
+    return build(trie)
+
+
+def _nested_keywords(keyword: str, trie: Dict[str, dict]) -> frozenset:
+    """Otras palabras clave contenidas en `keyword` respetando límites de palabra"""
+    found = set()
+    for start in range(len(keyword)):
+        if start and _is_word_char(keyword[start - 1]):
+            continue
+        node = trie
+        end = start
+        while end < len(keyword) and keyword[end] in node:
+            node = node[keyword[end]]
+            end += 1
+            if "" in node and (end == len(keyword) or not _is_word_char(keyword[end])):
+                found.add(keyword[start:end])
+    found.discard(keyword)
+    return frozenset(found)
+
+
+class KeywordMatcher:
+    """Matcher precompilado de palabras clave agrupadas (p. ej. por sector)"""
+
+    def __init__(self, groups: Dict[str, Iterable[str]]):
+        self._groups_by_keyword: Dict[str, Tuple[str, ...]] = {}
+        for group, keywords in groups.items():
+            for keyword in keywords:
+                key = keyword.lower().strip()
+                if key:
+                    previous = self._groups_by_keyword.get(key, ())
+                    if group not in previous:
+                        self._groups_by_keyword[key] = previous + (group,)
+
+        self.group_names = tuple(groups)
+        self._regex = None
+        self._regex_ignorecase = None
+        self._nested: Dict[str, frozenset] = {}
+        if self._groups_by_keyword:
+            trie = _build_trie(self._groups_by_keyword)
+            pattern = r"(?<!\w)" + _trie_pattern(trie) + r"(?!\w)"
+            # Se busca sobre el texto en minúsculas (≈3x más rápido que IGNORECASE);
+            # la variante IGNORECASE solo se usa si lower() cambia la longitud
+            self._regex = re.compile(pattern)
+            self._regex_ignorecase = re.compile(pattern, re.IGNORECASE)
+            # Cada coincidencia es la más larga posible; se recuerdan las palabras
+            # clave que contiene ("analytics" dentro de "google analytics")
+            for keyword in self._groups_by_keyword:
+                nested = _nested_keywords(keyword, trie)
+                if nested:
+                    self._nested[keyword] = nested
+
+    def find(self, text: str) -> List[KeywordMatch]:
+        """Devuelve todas las coincidencias (sin solapamiento) en orden de aparición"""
+        if not text or self._regex is None:
+            return []
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            found = self._regex.finditer(lowered)
+        else:
+            found = self._regex_ignorecase.finditer(text)
+        matches = []
+        for match in found:
+            keyword = match.group().lower()
+            groups = self._groups_by_keyword.get(keyword)
+            if groups is not None:  # Equivalencias Unicode de IGNORECASE sin forma en minúsculas
+                matches.append(KeywordMatch(match.start(), match.end(), keyword, groups))
+        return matches
+
+    def keywords_in(self, text: str) -> Set[str]:
+        """Conjunto de palabras clave (en minúsculas) presentes en el texto, incluidas las anidadas"""
+        return self._expand({match.keyword for match in self.find(text)})
+
+    def score(self, text: str) -> Tuple[Dict[str, int], List[KeywordMatch]]:
+        """
+        Puntúa cada grupo en una sola pasada por el texto
+
+        Returns:
+            tuple: ({grupo: nº de palabras clave distintas encontradas}, coincidencias)
+        """
+        matches = self.find(text)
+        scores = Counter()
+        for keyword in self._expand({match.keyword for match in matches}):
+            for group in self._groups_by_keyword[keyword]:
+                scores[group] += 1
+        return {group: scores.get(group, 0) for group in self.group_names}, matches
+
+    def _expand(self, keywords: Set[str]) -> Set[str]:
+        expanded = set(keywords)
+        for keyword in keywords:
+            expanded |= self._nested.get(keyword, frozenset())
+        return expanded
@@ -0,0 +1,205 @@
+"""
+Base de conocimiento por sector
+
+Las palabras clave ATS, los indicadores de sector y las plantillas de resumen y
+de experiencia viven en un paquete de datos versionado (JSON) en lugar de en el
+código. El paquete se carga la primera vez que se pide, una sola vez por
+proceso, y todas las instancias de ContentGenerator comparten el mismo objeto
+SectorPack de solo lectura junto con sus matchers ya compilados.
+
+Para añadir un sector basta con editar el paquete: se recarga en caliente al
+cambiar su fecha de modificación (comprobada como mucho cada check_interval
+segundos). Si el archivo nuevo no es válido se sigue usando el anterior.
+"""
+
+import json
+import os
+import string
+import threading
+import time
+from types import MappingProxyType
+from typing import Dict, Any, List, Optional, Tuple
+
+from .config import KNOWLEDGE_BASE_SETTINGS
+from .keyword_matcher import KeywordMatcher
+
+# Campos que pueden usar las plantillas (ContentGenerator.generate_enhanced_cv_content)
+SUMMARY_FIELDS = frozenset({"experience_level", "years", "tech_skills", "tech_stack"})
+BULLET_FIELDS = frozenset({"tech_stack"})
+# Categorías en que ContentGenerator organiza las habilidades, en orden de prioridad
+SKILL_CATEGORIES = ("tecnicas", "blandas", "herramientas")
+
+_lock = threading.Lock()
+_pack: Optional["SectorPack"] = None
+_pack_mtime: Optional[float] = None
+_next_check = 0.0
+
+
+class SectorPack:
+    """Paquete de sectores cargado y compilado; inmutable y compartido por proceso"""
+
+    __slots__ = ("version", "path", "loaded_at", "fallback_sector", "sectors", "ats_keywords",
+                 "titles", "enhanced_templates", "skill_categories", "sector_matcher",
+                 "skill_category_matcher", "ats_matchers", "ats_keyword_categories")
+
+    def __init__(self, data: Dict[str, Any], path: Optional[str] = None):
+        _validate_pack(data)
+        set_attr = object.__setattr__
+        sectors = data["sectors"]
+        fallback = data.get("fallback_sector", "general")
+
+        set_attr(self, "version", str(data["version"]))
+        set_attr(self, "path", path)
+        set_attr(self, "loaded_at", time.time())
+        set_attr(self, "fallback_sector", fallback)
+        set_attr(self, "sectors", tuple(sectors))
+        set_attr(self, "ats_keywords", MappingProxyType({
+            sector: tuple(spec["ats_keywords"]) for sector, spec in sectors.items()
+        }))
+        set_attr(self, "titles", MappingProxyType({
+            sector: spec.get("title", "Profesional") for sector, spec in sectors.items()
+        }))
+        set_attr(self, "enhanced_templates", MappingProxyType({
+            sector: MappingProxyType({
+                "summary": spec["summary"],
+                "experience_bullets": tuple(spec.get("experience_bullets", ()))
+            })
+            for sector, spec in sectors.items() if spec.get("summary")
+        }))
+        set_attr(self, "skill_categories", MappingProxyType({
+            category: tuple(indicators) for category, indicators in data["skill_categories"].items()
+        }))
+
+        # Matchers compilados una sola vez por versión del paquete
+        set_attr(self, "sector_matcher", KeywordMatcher({
+            sector: spec["indicators"] for sector, spec in sectors.items() if spec.get("indicators")
+        }))
+        set_attr(self, "skill_category_matcher", KeywordMatcher(self.skill_categories))
+        set_attr(self, "ats_matchers", MappingProxyType({
+            sector: KeywordMatcher({sector: keywords}) for sector, keywords in self.ats_keywords.items()
+        }))
+        set_attr(self, "ats_keyword_categories", MappingProxyType({
+            sector: MappingProxyType({keyword: self.skill_category(keyword) for keyword in keywords})
+            for sector, keywords in self.ats_keywords.items()
+        }))
+
+    def __setattr__(self, key, value):
+        raise AttributeError("SectorPack es compartido entre instancias; edita el paquete de datos")
+
+    def __repr__(self) -> str:
+        return f"SectorPack(version={self.version!r}, sectors={len(self.sectors)})"
+
+    def keywords_for(self, sector: str) -> Tuple[str, ...]:
+        """Palabras clave ATS del sector (las del sector por defecto si no existe)"""
+        return self.ats_keywords.get(sector, self.ats_keywords[self.fallback_sector])
+
+    def ats_matcher_for(self, sector: str) -> Tuple[KeywordMatcher, Dict[str, str]]:
+        """Matcher de las palabras clave ATS del sector y la categoría de cada una"""
+        if sector not in self.ats_matchers:
+            sector = self.fallback_sector
+        return self.ats_matchers[sector], self.ats_keyword_categories[sector]
+
+    def skill_category(self, skill: str) -> str:
+        """Categoría de una habilidad según sus indicadores (la primera por defecto)"""
+        found = {group for match in self.skill_category_matcher.find(skill) for group in match.groups}
+        for category in self.skill_categories:
+            if category in found:
+                return category
+        return next(iter(self.skill_categories))
+
+    def get_info(self) -> Dict[str, Any]:
+        """Resumen del paquete cargado para /status"""
+        return {
+            "version": self.version,
+            "path": self.path,
+            "loaded_at": self.loaded_at,
+            "sectors": list(self.sectors)
+        }
+
+
+def load_sector_pack(path: str) -> SectorPack:
+    """
+    Carga y compila un paquete de sectores desde un archivo JSON
+
+    Raises:
+        OSError: Si el archivo no se puede leer
+        ValueError: Si el JSON no es válido o le faltan campos
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return SectorPack(data, path)
+
+
+def get_sector_pack() -> SectorPack:
+    """Devuelve el paquete compartido, cargándolo o recargándolo si el archivo cambió"""
+    global _next_check
+    pack = _pack
+    now = time.monotonic()
+    if pack is not None and now < _next_check:
+        return pack
+    with _lock:
+        if _pack is None or now >= _next_check:
+            _next_check = now + KNOWLEDGE_BASE_SETTINGS["check_interval"]
+            _reload_if_changed()
+        return _pack
+
+
+def reload_sector_pack() -> SectorPack:
+    """Fuerza la recarga del paquete (p. ej. tras cambiar CV_SECTOR_PACK)"""
+    global _pack_mtime
+    with _lock:
+        _pack_mtime = None
+        _reload_if_changed()
+        return _pack
+
+
+def _reload_if_changed():
+    global _pack, _pack_mtime
+    path = KNOWLEDGE_BASE_SETTINGS["path"]
+    mtime = None
+    try:
+        mtime = os.path.getmtime(path)
+        if _pack is not None and mtime == _pack_mtime and path == _pack.path:
+            return
+        pack = load_sector_pack(path)
+    except (OSError, ValueError) as e:
+        if _pack is None:
+            raise
+        print(f"Error recargando la base de conocimiento {path}: {e}. Se mantiene la versión {_pack.version}")
+        if path == _pack.path:
+            _pack_mtime = mtime  # No se reintenta hasta que el archivo vuelva a cambiar
+        return
+    if _pack is not None:
+        print(f"Base de conocimiento recargada: versión {_pack.version} → {pack.version}")
+    _pack, _pack_mtime = pack, mtime
+
+
+def _template_fields(template: str) -> List[str]:
+    return [field for _, field, _, _ in string.Formatter().parse(template) if field is not None]
+
+
+def _validate_pack(data: Dict[str, Any]):
+    if not isinstance(data, dict) or "version" not in data:
+        raise ValueError("El paquete de sectores debe ser un objeto con 'version'")
+    sectors = data.get("sectors")
+    if not isinstance(sectors, dict) or not sectors:
+        raise ValueError("El paquete de sectores no define 'sectors'")
+    fallback = data.get("fallback_sector", "general")
+    if fallback not in sectors:
+        raise ValueError(f"El sector por defecto '{fallback}' no está en el paquete")
+    if set(data.get("skill_categories") or ()) != set(SKILL_CATEGORIES):
+        raise ValueError(f"'skill_categories' debe definir exactamente {list(SKILL_CATEGORIES)}")
+
+    for sector, spec in sectors.items():
+        if not spec.get("ats_keywords"):
+            raise ValueError(f"El sector '{sector}' no define 'ats_keywords'")
+        try:
+            fields = set(_template_fields(spec.get("summary", "")))
+            bullet_fields = {field for bullet in spec.get("experience_bullets", ())
+                             for field in _template_fields(bullet)}
+        except ValueError as e:
+            raise ValueError(f"Plantilla mal formada en el sector '{sector}': {e}") from e
+        if not fields <= SUMMARY_FIELDS:
+            raise ValueError(f"El resumen de '{sector}' usa campos desconocidos: {sorted(fields - SUMMARY_FIELDS)}")
+        if not bullet_fields <= BULLET_FIELDS:
+            raise ValueError(f"Los bullets de '{sector}' usan campos desconocidos: {sorted(bullet_fields - BULLET_FIELDS)}")
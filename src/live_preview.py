@@ -0,0 +1,242 @@
+"""
+Vista previa en vivo de la primera página del CV
+
+Cada edición del formulario recalcula solo las secciones cuyo contenido cambió:
+los flowables de una sección (los mismos que construye PDFGenerator para el
+PDF) se maquetan con ReportLab una vez y se guardan en una caché LRU junto con
+su altura y su HTML. La página 1 se compone a partir de esas alturas tal como
+la colocaría el marco de SimpleDocTemplate, sin generar el PDF, y se devuelve
+como HTML ligero. Las ediciones seguidas de una misma sesión se agrupan con un
+debounce antes de renderizar.
+"""
+
+import asyncio
+import hashlib
+import html
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List, NamedTuple, Optional, Tuple
+
+from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_JUSTIFY
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import Paragraph
+
+from . import template_registry
+from .config import PREVIEW_SETTINGS
+from .pdf_generator import PDFGenerator, SECTIONS, PAGE_MARGIN, FRAME_PADDING
+
+# Área útil del marco de la página (puntos)
+FRAME_WIDTH = A4[0] - 2 * PAGE_MARGIN - 2 * FRAME_PADDING
+FRAME_HEIGHT = A4[1] - 2 * PAGE_MARGIN - 2 * FRAME_PADDING
+
+_TEXT_ALIGN = {TA_CENTER: "center", TA_RIGHT: "right", TA_JUSTIFY: "justify"}
+
+
+class _Block(NamedTuple):
+    """Flowable ya maquetado: HTML, altura y espacios antes y después (puntos)"""
+    html: str
+    height: float
+    space_before: float
+    space_after: float
+    flowable: Any = None
+
+
+def _css_color(color) -> Optional[str]:
+    return "#" + color.hexval()[2:] if color is not None else None
+
+
+def _paragraph_css(style) -> str:
+    font = style.fontName
+    family = ("'Times New Roman', serif" if font.startswith("Times")
+              else "'Courier New', monospace" if font.startswith("Courier")
+              else "Helvetica, Arial, sans-serif")
+    css = [
+        f"font-family:{family}",
+        f"font-size:{style.fontSize}pt",
+        f"line-height:{style.leading}pt",
+        f"text-align:{_TEXT_ALIGN.get(style.alignment, 'left')}",
+    ]
+    if "Bold" in font:
+        css.append("font-weight:bold")
+    if "Oblique" in font or "Italic" in font:
+        css.append("font-style:italic")
+    if style.textColor is not None:
+        css.append(f"color:{_css_color(style.textColor)}")
+    if style.leftIndent:
+        css.append(f"padding-left:{style.leftIndent}pt")
+    if style.borderWidth and style.borderColor is not None:
+        css.append(f"border:{style.borderWidth}pt solid {_css_color(style.borderColor)}")
+        css.append(f"padding:{style.borderPadding}pt")
+    return ";".join(css)
+
+
+def _paragraph_html(text: str) -> str:
+    """Escapa el texto del párrafo conservando la negrita del marcado de ReportLab"""
+    return html.escape(text, quote=False).replace("&lt;b&gt;", "<b>").replace("&lt;/b&gt;", "</b>")
+
+
+class LivePreview:
+    """Render incremental de la página 1 con caché de secciones y debounce por sesión"""
+
+    def __init__(self, pdf_generator: Optional[PDFGenerator] = None, cache_size: Optional[int] = None,
+                 debounce: Optional[float] = None, budget_ms: Optional[float] = None):
+        self.pdf_generator = pdf_generator or PDFGenerator()
+        self.cache_size = cache_size or PREVIEW_SETTINGS["cache_size"]
+        self.debounce_seconds = debounce if debounce is not None else PREVIEW_SETTINGS["debounce"]
+        self.budget_ms = budget_ms or PREVIEW_SETTINGS["budget_ms"]
+
+        self._sections: "OrderedDict[Tuple[str, str, str], Tuple[_Block, ...]]" = OrderedDict()
+        self._css: Dict[str, str] = {}
+        self._edits: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stats = {"renders": 0, "sections_rebuilt": 0, "sections_cached": 0,
+                       "over_budget": 0, "total_ms": 0.0, "last_ms": 0.0}
+
+    async def debounce(self, session: str) -> bool:
+        """
+        Espera el intervalo de debounce tras una edición
+
+        Returns:
+            bool: False si durante la espera llegó otra edición de la misma sesión
+                  (la renderizará su propio evento)
+        """
+        seq = self._edits.get(session, 0) + 1
+        self._edits[session] = seq
+        await asyncio.sleep(self.debounce_seconds)
+        if self._edits.get(session) != seq:
+            return False
+        del self._edits[session]
+        return True
+
+    def render(self, form_data: Dict[str, Any], ai_content: Dict[str, Any], template: str = 'modern') -> str:
+        """
+        Renderiza la primera página como HTML recalculando solo las secciones modificadas
+
+        Args:
+            form_data: Datos del formulario
+            ai_content: Contenido del CV (de la IA o del generador local)
+            template: Nombre de la plantilla
+
+        Returns:
+            str: HTML de la página 1 con el tiempo de render y las secciones recalculadas
+        """
+        start = time.perf_counter()
+        placed, rebuilt, reused = self.layout(form_data, ai_content, template)
+        page = self._page_html(placed)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        with self._lock:
+            self._stats["renders"] += 1
+            self._stats["sections_rebuilt"] += rebuilt
+            self._stats["sections_cached"] += reused
+            self._stats["total_ms"] += elapsed_ms
+            self._stats["last_ms"] = elapsed_ms
+            if elapsed_ms > self.budget_ms:
+                self._stats["over_budget"] += 1
+                print(f"Vista previa fuera de presupuesto: {elapsed_ms:.0f} ms (> {self.budget_ms:.0f} ms)")
+
+        meta = (f"Página 1 · {elapsed_ms:.0f} ms · "
+                f"{rebuilt}/{rebuilt + reused} secciones recalculadas")
+        return (f"<div class='cv-live-preview' style='overflow-x:auto'>{page}"
+                f"<div style='font-size:0.75rem;color:#6b7280;margin-top:4px'>{meta}</div></div>")
+
+    def layout(self, form_data: Dict[str, Any], ai_content: Dict[str, Any],
+               template: str = 'modern') -> Tuple[List[Tuple[float, _Block]], int, int]:
+        """
+        Coloca los bloques de la página 1 como el marco de ReportLab
+
+        Returns:
+            tuple: ([(posición vertical en el marco, bloque)], secciones recalculadas,
+                   secciones tomadas de la caché)
+        """
+        selected = template_registry.get_template(template) or self.pdf_generator.default_template
+
+        placed = []
+        rebuilt = reused = 0
+        y = 0.0
+        previous_after = None
+        for section, _, source, fields in SECTIONS:
+            if y >= FRAME_HEIGHT:
+                break  # Las secciones que empiezan en la página 2 no se maquetan
+            data = form_data if source == "form_data" else ai_content
+            section_blocks, cached = self._get_section(section, data, fields, form_data, ai_content, selected)
+            if cached:
+                reused += 1
+            else:
+                rebuilt += 1
+            for block in section_blocks:
+                if previous_after is not None:
+                    # El marco solapa el espacio posterior del bloque anterior con el anterior de este
+                    y += max(block.space_before - previous_after, 0.0)
+                if y >= FRAME_HEIGHT:
+                    break
+                placed.append((y, block))
+                y += block.height + block.space_after
+                previous_after = block.space_after
+        return placed, rebuilt, reused
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Devuelve renders, aciertos de la caché de secciones y latencia media"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cached_sections"] = len(self._sections)
+        total_ms = stats.pop("total_ms")
+        stats["avg_ms"] = round(total_ms / stats["renders"], 2) if stats["renders"] else 0.0
+        stats["last_ms"] = round(stats["last_ms"], 2)
+        stats["budget_ms"] = self.budget_ms
+        return stats
+
+    def _get_section(self, section: str, data: Dict[str, Any], fields: Tuple[str, ...],
+                     form_data: Dict[str, Any], ai_content: Dict[str, Any], template) -> Tuple[Tuple[_Block, ...], bool]:
+        """Bloques de la sección desde la caché, o maquetados de nuevo si cambió su contenido"""
+        content = json.dumps([data.get(field) for field in fields], ensure_ascii=False, sort_keys=True, default=str)
+        key = (template.name, section, hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest())
+        with self._lock:
+            blocks = self._sections.get(key)
+            if blocks is not None:
+                self._sections.move_to_end(key)
+                return blocks, True
+
+        try:
+            flowables = self.pdf_generator.build_section(section, form_data, ai_content, template)
+            blocks = tuple(self._layout(flowable) for flowable in flowables)
+        except (KeyError, TypeError, ValueError) as e:
+            # Marcado no válido o sección aún incompleta: se avisa sin romper la vista previa
+            message = html.escape(f"⚠️ No se puede previsualizar la sección '{section}': {e}")
+            return (_Block(f"<div style='color:#b91c1c;font-size:9pt'>{message}</div>", 14.0, 0.0, 6.0),), False
+
+        with self._lock:
+            self._sections[key] = blocks
+            while len(self._sections) > self.cache_size:
+                self._sections.popitem(last=False)
+        return blocks, False
+
+    def _layout(self, flowable) -> _Block:
+        """Maqueta un flowable al ancho del marco y genera su HTML"""
+        _, height = flowable.wrap(FRAME_WIDTH, FRAME_HEIGHT)
+        if isinstance(flowable, Paragraph):
+            style = flowable.style
+            css = self._css.get(style.name)
+            if css is None:
+                css = self._css[style.name] = _paragraph_css(style)
+            markup = f"<div style='{css}'>{_paragraph_html(flowable.text)}</div>"
+        else:
+            markup = ""  # Spacer: solo ocupa altura
+        return _Block(markup, height, flowable.getSpaceBefore(), flowable.getSpaceAfter(), flowable)
+
+    @staticmethod
+    def _page_html(placed) -> str:
+        """HTML de la página 1 recortado al final del marco"""
+        parts = [
+            f"<div style='position:absolute;left:0;right:0;top:{y:.1f}pt'>{block.html}</div>"
+            for y, block in placed if block.html
+        ]
+        inset = PAGE_MARGIN + FRAME_PADDING
+        return (
+            f"<div style='position:relative;width:{A4[0]:.0f}pt;height:{A4[1]:.0f}pt;background:#fff;"
+            f"box-shadow:0 2px 12px rgba(0,0,0,0.15);margin:0 auto'>"
+            f"<div style='position:absolute;left:{inset:.1f}pt;top:{inset:.1f}pt;width:{FRAME_WIDTH:.1f}pt;"
+            f"height:{FRAME_HEIGHT:.1f}pt;overflow:hidden'>{''.join(parts)}</div></div>"
+        )
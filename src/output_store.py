@@ -0,0 +1,148 @@
+"""
+Almacén gestionado de PDFs generados
+
+Gradio necesita una ruta en disco para el componente de descarga `gr.File`.
+Este módulo escribe los PDFs (renderizados en memoria) en un directorio propio
+y lo mantiene acotado: los archivos caducan tras un TTL y, si se supera la
+cuota de disco o de archivos, se eliminan primero los más antiguos. Un hilo
+en segundo plano borra los caducados aunque el servidor esté inactivo.
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Union
+
+from .config import OUTPUT_SETTINGS
+from .utils import sanitize_filename
+
+
+class OutputTooLargeError(Exception):
+    """Se lanza cuando un PDF no cabe en la cuota de disco del almacén"""
+
+    def __init__(self, size: int, max_bytes: int):
+        self.size = size
+        self.max_bytes = max_bytes
+        super().__init__(f"El PDF ocupa {size} bytes y la cuota del almacén es de {max_bytes}")
+
+
+class OutputStore:
+    """Directorio de salida con limpieza por TTL y cuota de disco"""
+
+    def __init__(self, directory: Optional[str] = None, ttl: Optional[float] = None,
+                 max_bytes: Optional[int] = None, max_files: Optional[int] = None,
+                 cleanup_interval: Optional[float] = None):
+        self.directory = directory or OUTPUT_SETTINGS["directory"]
+        self.ttl = ttl if ttl is not None else OUTPUT_SETTINGS["ttl"]
+        self.max_bytes = max_bytes if max_bytes is not None else OUTPUT_SETTINGS["max_bytes"]
+        self.max_files = max_files if max_files is not None else OUTPUT_SETTINGS["max_files"]
+        self.cleanup_interval = (
+            cleanup_interval if cleanup_interval is not None else OUTPUT_SETTINGS["cleanup_interval"]
+        )
+
+        self._lock = threading.Lock()
+        self._stats = {"saved": 0, "expired": 0, "evicted": 0}
+        # ruta -> (subdirectorio, tamaño, instante de creación), del más antiguo al más reciente
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._total_bytes = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        for entry_dir, path, size, created in sorted(self._scan_directory(), key=lambda e: e[3]):
+            self._entries[path] = (entry_dir, size, created)
+            self._total_bytes += size
+        self.cleanup()
+
+        self._closed = threading.Event()
+        if self.cleanup_interval:
+            threading.Thread(target=self._cleanup_loop, name="output-store-cleanup", daemon=True).start()
+
+    def save(self, data: Union[bytes, memoryview], filename: str = "CV.pdf") -> str:
+        """
+        Guarda el PDF y devuelve su ruta
+
+        Cada archivo va en su propio subdirectorio para conservar un nombre de
+        descarga legible sin colisiones entre usuarios. Para hacerle sitio se
+        eliminan los más antiguos, nunca el que se acaba de guardar.
+
+        Raises:
+            OutputTooLargeError: Si el PDF por sí solo supera max_bytes
+        """
+        if len(data) > self.max_bytes:
+            raise OutputTooLargeError(len(data), self.max_bytes)
+        with self._lock:
+            entry_dir = os.path.join(self.directory, uuid.uuid4().hex)
+            os.makedirs(entry_dir)
+            path = os.path.join(entry_dir, sanitize_filename(filename) or "CV.pdf")
+            with open(path, "wb") as f:
+                f.write(data)
+            self._entries[path] = (entry_dir, len(data), time.time())
+            self._total_bytes += len(data)
+            self._stats["saved"] += 1
+            self._cleanup_locked(keep=path)
+            return path
+
+    def cleanup(self):
+        """Elimina archivos caducados y aplica la cuota de disco"""
+        with self._lock:
+            self._cleanup_locked()
+
+    def close(self):
+        """Detiene la limpieza periódica"""
+        self._closed.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Devuelve número de archivos, bytes usados y contadores de limpieza"""
+        with self._lock:
+            return {
+                "files": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_files": self.max_files,
+                "max_bytes": self.max_bytes,
+                **self._stats
+            }
+
+    def _cleanup_loop(self):
+        while not self._closed.wait(self.cleanup_interval):
+            self.cleanup()
+
+    def _cleanup_locked(self, keep: Optional[str] = None):
+        now = time.time()
+        while self._entries:
+            path, (entry_dir, size, created) = next(iter(self._entries.items()))
+            if path == keep:
+                break  # Solo queda el recién guardado (cabe: save() rechaza los que no)
+            if now - created > self.ttl:
+                self._stats["expired"] += 1
+            elif len(self._entries) > self.max_files or self._total_bytes > self.max_bytes:
+                self._stats["evicted"] += 1
+            else:
+                break
+            del self._entries[path]
+            self._total_bytes -= size
+            self._remove(entry_dir, path)
+
+    def _scan_directory(self) -> list:
+        """Lista (subdirectorio, ruta, tamaño, mtime) de archivos de ejecuciones anteriores"""
+        entries = []
+        for name in os.listdir(self.directory):
+            entry_dir = os.path.join(self.directory, name)
+            if not os.path.isdir(entry_dir):
+                continue
+            for filename in os.listdir(entry_dir):
+                path = os.path.join(entry_dir, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((entry_dir, path, stat.st_size, stat.st_mtime))
+        return entries
+
+    @staticmethod
+    def _remove(entry_dir: str, path: str):
+        try:
+            os.remove(path)
+            os.rmdir(entry_dir)
+        except OSError:
+            pass
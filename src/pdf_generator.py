@@ -7,300 +7,48 @@ utilizando ReportLab. Incluye múltiples plantillas personalizables.
 
 from reportlab.lib.pagesizes import A4
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch, cm
-from reportlab.lib.colors import black, darkblue, grey, blue, green, red, purple
-from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT
+import io
 import tempfile
-from typing import Dict, Any
-from abc import ABC, abstractmethod
+from typing import Dict, Any, Optional, Union
 
-class CVTemplate(ABC):
-    """Clase base abstracta para plantillas de CV"""
-    
-    def __init__(self):
-        self.styles = getSampleStyleSheet()
-        self._setup_custom_styles()
-    
-    @abstractmethod
-    def _setup_custom_styles(self):
-        """Configura estilos específicos de la plantilla"""
-        pass
-    
-    @abstractmethod
-    def create_content(self, form_data: Dict[str, Any], ai_content: Dict[str, Any]) -> list:
-        """Crea el contenido del CV usando la plantilla específica"""
-        pass
+from . import template_registry, tracing
+from .template_registry import CVTemplate
+from .deadline import Deadline
 
-class ModernTemplate(CVTemplate):
-    """Plantilla moderna y minimalista"""
-    
-    def _setup_custom_styles(self):
-        # Estilo para el nombre - moderno y limpio
-        self.nombre_style = ParagraphStyle(
-            'ModernTitle',
-            parent=self.styles['Heading1'],
-            fontSize=26,
-            spaceAfter=8,
-            textColor=darkblue,
-            alignment=TA_LEFT,
-            fontName='Helvetica-Bold'
-        )
-        
-        # Información de contacto elegante
-        self.contacto_style = ParagraphStyle(
-            'ModernContact',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            alignment=TA_LEFT,
-            spaceAfter=20,
-            textColor=grey,
-            fontName='Helvetica'
-        )
-        
-        # Encabezados de sección con línea moderna
-        self.seccion_style = ParagraphStyle(
-            'ModernSection',
-            parent=self.styles['Heading2'],
-            fontSize=14,
-            spaceAfter=10,
-            spaceBefore=18,
-            textColor=darkblue,
-            fontName='Helvetica-Bold',
-            borderWidth=2,
-            borderColor=darkblue,
-            borderPadding=6,
-            leftIndent=0
-        )
-        
-        # Contenido limpio
-        self.contenido_style = ParagraphStyle(
-            'ModernContent',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            spaceAfter=6,
-            textColor=black,
-            alignment=TA_LEFT,
-            leftIndent=10
-        )
-        
-        self.subseccion_style = ParagraphStyle(
-            'ModernSubsection',
-            parent=self.styles['Normal'],
-            fontSize=11,
-            spaceAfter=4,
-            spaceBefore=8,
-            textColor=darkblue,
-            fontName='Helvetica-Bold',
-            leftIndent=10
-        )
-    
-    def create_content(self, form_data: Dict[str, Any], ai_content: Dict[str, Any]) -> list:
-        """Implementación requerida por la clase abstracta"""
-        return []
+# Márgenes del documento y relleno del marco de SimpleDocTemplate (6 pt por lado)
+PAGE_MARGIN = 2*cm
+FRAME_PADDING = 6
 
-class ExecutiveTemplate(CVTemplate):
-    """Plantilla ejecutiva y formal"""
-    
-    def _setup_custom_styles(self):
-        # Estilo ejecutivo - centrado y formal
-        self.nombre_style = ParagraphStyle(
-            'ExecutiveTitle',
-            parent=self.styles['Heading1'],
-            fontSize=24,
-            spaceAfter=6,
-            textColor=black,
-            alignment=TA_CENTER,
-            fontName='Times-Bold'
-        )
-        
-        self.contacto_style = ParagraphStyle(
-            'ExecutiveContact',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            alignment=TA_CENTER,
-            spaceAfter=20,
-            textColor=black,
-            fontName='Times-Roman'
-        )
-        
-        self.seccion_style = ParagraphStyle(
-            'ExecutiveSection',
-            parent=self.styles['Heading2'],
-            fontSize=12,
-            spaceAfter=8,
-            spaceBefore=16,
-            textColor=black,
-            fontName='Times-Bold',
-            alignment=TA_CENTER,
-            borderWidth=1,
-            borderColor=black
-        )
-        
-        self.contenido_style = ParagraphStyle(
-            'ExecutiveContent',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            spaceAfter=8,
-            textColor=black,
-            alignment=TA_LEFT,
-            fontName='Times-Roman'
-        )
-        
-        self.subseccion_style = ParagraphStyle(
-            'ExecutiveSubsection',
-            parent=self.styles['Normal'],
-            fontSize=11,
-            spaceAfter=4,
-            spaceBefore=8,
-            textColor=black,
-            fontName='Times-Bold'
-        )
-    
-    def create_content(self, form_data: Dict[str, Any], ai_content: Dict[str, Any]) -> list:
-        """Implementación requerida por la clase abstracta"""
-        return []
+# Secciones del CV en orden: (nombre, método que construye sus flowables,
+# origen de los datos y campos que lee de él)
+SECTIONS = (
+    ("header", "_add_header", "form_data", ("nombre", "email", "telefono", "ubicacion", "linkedin")),
+    ("summary", "_add_professional_summary", "ai_content", ("resumen_profesional",)),
+    ("experience", "_add_work_experience", "ai_content", ("experiencia_optimizada",)),
+    ("education", "_add_education", "form_data", ("educacion",)),
+    ("skills", "_add_skills", "ai_content", ("habilidades_organizadas",)),
+    ("languages", "_add_languages", "form_data", ("idiomas",)),
+)
+_SECTION_BUILDERS = {name: (method, source) for name, method, source, _ in SECTIONS}
 
-class CreativeTemplate(CVTemplate):
-    """Plantilla creativa para diseñadores"""
-    
-    def _setup_custom_styles(self):
-        # Estilo creativo con colores
-        self.nombre_style = ParagraphStyle(
-            'CreativeTitle',
-            parent=self.styles['Heading1'],
-            fontSize=28,
-            spaceAfter=8,
-            textColor=purple,
-            alignment=TA_LEFT,
-            fontName='Helvetica-Bold'
-        )
-        
-        self.contacto_style = ParagraphStyle(
-            'CreativeContact',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            alignment=TA_LEFT,
-            spaceAfter=20,
-            textColor=blue,
-            fontName='Helvetica'
-        )
-        
-        self.seccion_style = ParagraphStyle(
-            'CreativeSection',
-            parent=self.styles['Heading2'],
-            fontSize=14,
-            spaceAfter=10,
-            spaceBefore=18,
-            textColor=purple,
-            fontName='Helvetica-Bold',
-            borderWidth=3,
-            borderColor=purple
-        )
-        
-        self.contenido_style = ParagraphStyle(
-            'CreativeContent',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            spaceAfter=6,
-            textColor=black,
-            alignment=TA_LEFT
-        )
-        
-        self.subseccion_style = ParagraphStyle(
-            'CreativeSubsection',
-            parent=self.styles['Normal'],
-            fontSize=11,
-            spaceAfter=4,
-            spaceBefore=8,
-            textColor=blue,
-            fontName='Helvetica-Bold'
-        )
-    
-    def create_content(self, form_data: Dict[str, Any], ai_content: Dict[str, Any]) -> list:
-        """Implementación requerida por la clase abstracta"""
-        return []
-
-class TechnicalTemplate(CVTemplate):
-    """Plantilla técnica para desarrolladores"""
-    
-    def _setup_custom_styles(self):
-        # Estilo técnico - limpio y estructurado
-        self.nombre_style = ParagraphStyle(
-            'TechTitle',
-            parent=self.styles['Heading1'],
-            fontSize=24,
-            spaceAfter=8,
-            textColor=green,
-            alignment=TA_LEFT,
-            fontName='Courier-Bold'
-        )
-        
-        self.contacto_style = ParagraphStyle(
-            'TechContact',
-            parent=self.styles['Normal'],
-            fontSize=9,
-            alignment=TA_LEFT,
-            spaceAfter=20,
-            textColor=grey,
-            fontName='Courier'
-        )
-        
-        self.seccion_style = ParagraphStyle(
-            'TechSection',
-            parent=self.styles['Heading2'],
-            fontSize=12,
-            spaceAfter=8,
-            spaceBefore=16,
-            textColor=green,
-            fontName='Courier-Bold',
-            borderWidth=1,
-            borderColor=green,
-            leftIndent=20
-        )
-        
-        self.contenido_style = ParagraphStyle(
-            'TechContent',
-            parent=self.styles['Normal'],
-            fontSize=9,
-            spaceAfter=6,
-            textColor=black,
-            alignment=TA_LEFT,
-            fontName='Courier',
-            leftIndent=20
-        )
-        
-        self.subseccion_style = ParagraphStyle(
-            'TechSubsection',
-            parent=self.styles['Normal'],
-            fontSize=10,
-            spaceAfter=4,
-            spaceBefore=8,
-            textColor=green,
-            fontName='Courier-Bold',
-            leftIndent=20
-        )
-    
-    def create_content(self, form_data: Dict[str, Any], ai_content: Dict[str, Any]) -> list:
-        """Implementación requerida por la clase abstracta"""
-        return []
 
 class PDFGenerator:
     """Generador principal de PDFs con soporte para múltiples plantillas"""
     
     def __init__(self):
-        self.templates = {
-            'modern': ModernTemplate(),
-            'executive': ExecutiveTemplate(), 
-            'creative': CreativeTemplate(),
-            'technical': TechnicalTemplate()
-        }
+        # Las plantillas se construyen una vez por proceso en template_registry
         # Compatibilidad hacia atrás - usar plantilla moderna por defecto
-        self.default_template = self.templates['modern']
+        self.default_template = template_registry.get_template('modern')
         self._setup_legacy_styles()
     
     def _setup_legacy_styles(self):
-        """Mantiene compatibilidad con el código existente"""
+        """
+        Mantiene compatibilidad con el código existente
+        
+        Son los estilos compartidos de la plantilla: de solo lectura (para
+        variarlos, CVTemplate.derive_style()).
+        """
         template = self.default_template
         self.styles = template.styles
         self.nombre_style = template.nombre_style
@@ -309,6 +57,7 @@ class PDFGenerator:
         self.contenido_style = template.contenido_style
         self.subseccion_style = template.subseccion_style
 
+    @tracing.traced("pdf.create_cv_pdf", output="file")
     def create_cv_pdf(self, form_data: Dict[str, Any], ai_content: Dict[str, Any], template: str = 'modern') -> str:
         """
         Genera un PDF profesional del CV con la plantilla especificada
@@ -327,50 +76,78 @@ class PDFGenerator:
         temp_filename = temp_file.name
         temp_file.close()
         
+        self._build_pdf(temp_filename, form_data, ai_content, template)
+        
+        return temp_filename
+    
+    @tracing.traced("pdf.create_cv_pdf", output="memory")
+    def create_cv_pdf_bytes(self, form_data: Dict[str, Any], ai_content: Dict[str, Any],
+                            template: str = 'modern', as_memoryview: bool = False,
+                            deadline: Optional[Deadline] = None) -> Union[bytes, memoryview]:
+        """
+        Genera el PDF del CV en memoria, sin tocar el disco
+        
+        Args:
+            form_data: Datos del formulario
+            ai_content: Contenido generado por IA
+            template: Nombre de la plantilla
+            as_memoryview: Devolver una vista sobre el buffer en lugar de copiar a bytes
+            deadline: Plazo de la petición; si vence antes de `doc.build` no se construye
+            
+        Returns:
+            bytes | memoryview: Contenido del PDF
+        """
+        
+        buffer = io.BytesIO()
+        self._build_pdf(buffer, form_data, ai_content, template, deadline)
+        
+        return buffer.getbuffer() if as_memoryview else buffer.getvalue()
+    
+    def _build_pdf(self, target: Union[str, io.BytesIO], form_data: Dict[str, Any],
+                   ai_content: Dict[str, Any], template: str, deadline: Optional[Deadline] = None):
+        """Construye el documento en una ruta o en un buffer en memoria"""
+        
         # Configurar documento
         doc = SimpleDocTemplate(
-            temp_filename,
+            target,
             pagesize=A4,
-            rightMargin=2*cm,
-            leftMargin=2*cm,
-            topMargin=2*cm,
-            bottomMargin=2*cm
+            rightMargin=PAGE_MARGIN,
+            leftMargin=PAGE_MARGIN,
+            topMargin=PAGE_MARGIN,
+            bottomMargin=PAGE_MARGIN
         )
         
         # Seleccionar plantilla
-        selected_template = self.templates.get(template, self.default_template)
+        selected_template = template_registry.get_template(template) or self.default_template
         
         # Crear contenido usando la plantilla seleccionada
-        story = self._create_universal_content(form_data, ai_content, selected_template)
-        
-        # Generar PDF
-        doc.build(story)
-        
-        return temp_filename
+        with tracing.span("pdf.story", template=selected_template.name):
+            story = self._create_universal_content(form_data, ai_content, selected_template)
+        
+        # Generar PDF (la parte cara: no empezarla si ya no queda plazo)
+        if deadline is not None:
+            deadline.check("pdf.doc_build")
+        with tracing.span("pdf.doc_build", template=selected_template.name):
+            doc.build(story)
     
     def _create_universal_content(self, form_data: Dict[str, Any], ai_content: Dict[str, Any], template: CVTemplate) -> list:
         """Crea contenido universal compatible con todas las plantillas"""
         
         story = []
         
-        # Header - Nombre y contacto
-        self._add_header(story, form_data, template)
-        
-        # Resumen profesional
-        self._add_professional_summary(story, ai_content, template)
-        
-        # Experiencia laboral
-        self._add_work_experience(story, ai_content, template)
-        
-        # Educación
-        self._add_education(story, form_data, template)
+        # Header, resumen, experiencia, educación, habilidades e idiomas
+        for section, *_ in SECTIONS:
+            story.extend(self.build_section(section, form_data, ai_content, template))
         
-        # Habilidades
-        self._add_skills(story, ai_content, template)
-        
-        # Idiomas
-        self._add_languages(story, form_data, template)
+        return story
+
+    def build_section(self, section: str, form_data: Dict[str, Any], ai_content: Dict[str, Any],
+                      template: CVTemplate) -> list:
+        """Construye solo los flowables de una sección (ver SECTIONS)"""
         
+        method, source = _SECTION_BUILDERS[section]
+        story = []
+        getattr(self, method)(story, form_data if source == "form_data" else ai_content, template)
         return story
 
     def _add_header(self, story: list, form_data: Dict[str, Any], template: CVTemplate):
@@ -391,8 +168,8 @@ class PDFGenerator:
             contacto_info.append(f"🔗 {form_data['linkedin']}")
         
         if contacto_info:
-            # Para plantillas técnicas y creativas, mostrar contacto en líneas separadas
-            if isinstance(template, (TechnicalTemplate, CreativeTemplate)):
+            # Plantillas con contacto apilado (técnica, creativa): una línea por dato
+            if template.contact_layout == 'stacked':
                 for info in contacto_info:
                     story.append(Paragraph(info, template.contacto_style))
             else:
@@ -467,9 +244,4 @@ class PDFGenerator:
     
     def get_available_templates(self) -> Dict[str, str]:
         """Retorna las plantillas disponibles con sus descripciones"""
-        return {
-            'modern': '🎨 Moderna y Minimalista - Diseño limpio y profesional',
-            'executive': '👔 Ejecutiva y Formal - Estilo tradicional para puestos senior',
-            'creative': '🌈 Creativa y Colorida - Para diseñadores y profesionales creativos',
-            'technical': '💻 Técnica y Estructurada - Optimizada para desarrolladores y IT'
-        }
\ No newline at end of file
+        return template_registry.get_available_templates()
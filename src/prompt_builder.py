@@ -0,0 +1,380 @@
+"""
+Construcción del prompt de generación con presupuesto de tokens
+
+El prompt se ajusta a la ventana de contexto de cada modelo (PROMPT_SETTINGS):
+las secciones vacías o "No especificado" no se envían, los modelos pequeños
+reciben instrucciones y esquema compactos y, si aun así no cabe, los campos
+de texto libre más largos se recortan (sin líneas repetidas, conservando el
+comienzo de cada línea y cortando en fin de frase o de palabra) hasta entrar
+en el presupuesto. Los tokens se estiman por caracteres según el tokenizador
+de la familia del modelo, sin depender de librerías de tokenización.
+
+Para la generación por secciones (FAN_OUT_SETTINGS) construye además un
+prompt pequeño por sección del JSON: el resumen, cada experiencia (o grupo de
+experiencias) y las habilidades, cada uno con su límite de tokens de respuesta.
+
+También decide el modo JSON nativo de cada proveedor y calcula el coste de
+una llamada a partir de los tokens consumidos.
+"""
+
+import math
+import re
+from typing import Callable, Dict, Any, List, NamedTuple, Optional, Tuple
+
+from .config import DEFAULT_SETTINGS, PROMPT_SETTINGS, FAN_OUT_SETTINGS
+
+# Valores que el formulario usa como "vacío"
+_EMPTY_VALUES = ("", "no especificado")
+# Por debajo de este tamaño una línea recortada ya no aporta información
+_MIN_LINE_CHARS = 24
+
+_PERSONAL_FIELDS = (
+    ("nombre", "Nombre"), ("email", "Email"), ("telefono", "Teléfono"),
+    ("linkedin", "LinkedIn"), ("ubicacion", "Ubicación")
+)
+_PROFILE_FIELDS = (("objetivo", "Objetivo profesional"), ("experiencia_anos", "Años de experiencia"))
+_BLOCK_FIELDS = (
+    ("experiencia_laboral", "EXPERIENCIA LABORAL"), ("educacion", "EDUCACIÓN"),
+    ("habilidades", "HABILIDADES"), ("idiomas", "IDIOMAS")
+)
+# Campos de texto libre que se recortan cuando el prompt no cabe
+_COMPRESSIBLE = ("experiencia_laboral", "educacion", "habilidades", "idiomas", "objetivo")
+
+_FULL_HEADER = """
+Actúa como un experto en recursos humanos y escritor profesional de CVs.
+Genera un currículum profesional y optimizado para ATS basado en los siguientes datos:
+"""
+
+_FULL_INSTRUCTIONS = """
+INSTRUCCIONES:
+1. Crea un resumen profesional atractivo de 3-4 líneas que destaque el valor único del candidato
+2. Reformula y optimiza la experiencia laboral con verbos de acción y logros cuantificables
+3. Organiza las habilidades por categorías (técnicas, blandas, herramientas)
+4. Asegúrate de que el contenido esté optimizado para ATS
+5. Usa un lenguaje profesional pero accesible
+6. Prioriza la información más relevante
+
+Responde SOLO con un JSON válido con esta estructura exacta:
+{
+    "resumen_profesional": "texto del resumen profesional aquí",
+    "experiencia_optimizada": [
+        {
+            "puesto": "título del puesto",
+            "empresa": "nombre empresa",
+            "periodo": "fechas",
+            "descripcion": ["logro 1", "logro 2", "logro 3"]
+        }
+    ],
+    "habilidades_organizadas": {
+        "tecnicas": ["habilidad1", "habilidad2"],
+        "blandas": ["habilidad1", "habilidad2"],
+        "herramientas": ["herramienta1", "herramienta2"]
+    }
+}
+
+NO incluyas texto adicional, comentarios o explicaciones. Solo el JSON válido.
+"""
+
+_COMPACT_HEADER = "Escribe un CV profesional optimizado para ATS con estos datos:\n"
+
+_SECTION_HEADER = "Datos del candidato para un CV profesional optimizado para ATS:\n"
+
+# Campos del formulario que recibe cada sección e instrucciones de su respuesta
+_SECTION_FIELDS = {
+    "resumen_profesional": ("objetivo", "experiencia_anos", "experiencia_laboral", "educacion", "habilidades"),
+    "experiencia_optimizada": ("objetivo", "experiencia_laboral"),
+    "habilidades_organizadas": ("objetivo", "habilidades", "experiencia_laboral")
+}
+
+_SECTION_INSTRUCTIONS = {
+    "resumen_profesional": (
+        "\nEscribe un resumen profesional atractivo de 3-4 líneas que destaque el valor único del candidato."
+        '\nResponde solo con este JSON: {"resumen_profesional":"texto"}\n'
+    ),
+    "experiencia_optimizada": (
+        "\nReformula solo esta experiencia laboral con verbos de acción y logros cuantificables."
+        '\nResponde solo con este JSON: {"experiencia_optimizada":[{"puesto":"","empresa":"",'
+        '"periodo":"","descripcion":["logro"]}]}\n'
+    ),
+    "habilidades_organizadas": (
+        "\nOrganiza las habilidades del candidato por categorías."
+        '\nResponde solo con este JSON: {"habilidades_organizadas":{"tecnicas":[],"blandas":[],"herramientas":[]}}\n'
+    )
+}
+
+# Líneas que continúan la experiencia anterior (viñetas o sangría)
+_CONTINUATION = re.compile(r"^(?:\s+|[-•*·]\s)")
+
+_COMPACT_INSTRUCTIONS = (
+    "\nResponde solo con este JSON: "
+    '{"resumen_profesional":"3-4 líneas","experiencia_optimizada":[{"puesto":"","empresa":"",'
+    '"periodo":"","descripcion":["logro con verbo de acción"]}],'
+    '"habilidades_organizadas":{"tecnicas":[],"blandas":[],"herramientas":[]}}\n'
+)
+
+
+class BuiltPrompt(NamedTuple):
+    """Prompt listo para enviar y datos de su presupuesto"""
+    text: str
+    prompt_tokens: int  # Estimados
+    budget: int
+    compact: bool  # Instrucciones compactas
+    dropped: Tuple[str, ...]  # Campos vacíos que no se enviaron
+    compressed: Tuple[str, ...]  # Campos recortados para caber en el presupuesto
+
+
+class SectionPrompt(NamedTuple):
+    """Prompt de una sección del CV para la generación por secciones"""
+    section: str  # Clave del JSON que devuelve ("resumen_profesional", ...)
+    prompt: BuiltPrompt
+    output_tokens: int
+    experience: str = ""  # Experiencias del prompt (solo en las secciones de experiencia)
+
+
+def _clean(value: Any) -> str:
+    text = "" if value is None else str(value).strip()
+    return "" if text.lower() in _EMPTY_VALUES else text
+
+
+def _cut_line(line: str, max_chars: int) -> str:
+    """Recorta una línea en fin de frase o, si no, de palabra"""
+    if len(line) <= max_chars:
+        return line
+    cut = line[:max_chars - 1]
+    sentence_end = cut.rfind(". ")
+    if sentence_end > max_chars // 2:
+        return cut[:sentence_end + 1]
+    space = cut.rfind(" ")
+    if space > max_chars // 2:
+        cut = cut[:space]
+    return cut.rstrip(" ,;:.-") + "…"
+
+
+def _dedupe_items(line: str) -> str:
+    """Quita los elementos repetidos de una línea separada por comas (listas de habilidades)"""
+    items = [item.strip() for item in line.split(",") if item.strip()]
+    seen = set()
+    kept = []
+    for item in items:
+        if item.lower() not in seen:
+            seen.add(item.lower())
+            kept.append(item)
+    return ", ".join(kept) if len(kept) < len(items) else line
+
+
+def compress_text(text: str, max_chars: int) -> str:
+    """
+    Reduce un campo de texto libre a max_chars caracteres
+
+    Quita espacios, líneas y elementos de listas repetidos; si no basta, cada
+    línea conserva su comienzo (puesto y empresa, titulación...) y pierde el
+    detalle final, y cuando ni así caben se descartan las últimas líneas.
+    """
+    lines = []
+    seen = set()
+    for line in text.splitlines():
+        line = _dedupe_items(" ".join(line.split()))
+        if line and line.lower() not in seen:
+            seen.add(line.lower())
+            lines.append(line)
+    joined = "\n".join(lines)
+    if len(joined) <= max_chars:
+        return joined
+    if max_chars < _MIN_LINE_CHARS:
+        return ""
+
+    keep = len(lines)
+    while keep > 1 and max_chars // keep < _MIN_LINE_CHARS:
+        keep -= 1
+    quota = max_chars // keep - 1  # Un carácter para el salto de línea
+    return "\n".join(_cut_line(line, quota) for line in lines[:keep])
+
+
+def split_experiences(text: str) -> List[str]:
+    """Separa la experiencia laboral en entradas: una por línea, con sus viñetas o líneas sangradas"""
+    entries = []
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        if entries and _CONTINUATION.match(line):
+            entries[-1] += "\n" + line.strip()
+        else:
+            entries.append(line.strip())
+    return entries
+
+
+def _allocate(sizes: Dict[str, int], available: int) -> Dict[str, int]:
+    """Reparte los tokens disponibles: los campos cortos enteros, los largos a partes iguales"""
+    allotment = {}
+    remaining = max(available, 0)
+    ordered = sorted(sizes, key=sizes.get)
+    for position, field in enumerate(ordered):
+        share = remaining // (len(ordered) - position)
+        allotment[field] = min(sizes[field], share)
+        remaining -= allotment[field]
+    return allotment
+
+
+class PromptBuilder:
+    """Construye el prompt de cada proveedor y modelo dentro de su presupuesto de tokens"""
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None, max_tokens: Optional[int] = None,
+                 fan_out_settings: Optional[Dict[str, Any]] = None):
+        self.settings = settings or PROMPT_SETTINGS
+        self.fan_out = fan_out_settings or FAN_OUT_SETTINGS
+        self.max_tokens = max_tokens or DEFAULT_SETTINGS["max_tokens"]
+
+    def context_window(self, provider: Optional[str], model: Optional[str]) -> int:
+        """Ventana de contexto del modelo (tokens de entrada más salida)"""
+        return (self.settings["context_windows"].get(model)
+                or self.settings["provider_context_windows"].get(provider)
+                or self.settings["default_context_window"])
+
+    def output_tokens(self, provider: Optional[str], model: Optional[str]) -> int:
+        """Tokens de respuesta a pedir: max_tokens salvo que no quepa en media ventana"""
+        context = self.context_window(provider, model)
+        return min(self.max_tokens, max(context // 2, self.settings["min_output_tokens"]))
+
+    def prompt_budget(self, provider: Optional[str], model: Optional[str],
+                      output_tokens: Optional[int] = None) -> int:
+        """Tokens disponibles para el prompt, con margen por el error de la estimación"""
+        if output_tokens is None:
+            output_tokens = self.output_tokens(provider, model)
+        available = self.context_window(provider, model) - output_tokens
+        return max(int(available * (1 - self.settings["safety_margin"])), 0)
+
+    def estimate_tokens(self, text: str, model: Optional[str] = None) -> int:
+        """Estimación de tokens a partir de los caracteres por token del tokenizador"""
+        return math.ceil(len(text) / self._chars_per_token(model))
+
+    def json_mode(self, provider: Optional[str], model: Optional[str]) -> Optional[str]:
+        """Modo JSON nativo del proveedor para el modelo ("response_format", "format", "prefill") o None"""
+        entry = self.settings["json_modes"].get(provider)
+        if entry is None or (entry["models"] is not None and model not in entry["models"]):
+            return None
+        return entry["mode"]
+
+    def cost(self, model: Optional[str], prompt_tokens: int, completion_tokens: int) -> float:
+        """Coste en USD de una llamada (0 para los modelos sin precio configurado)"""
+        price = self.settings["pricing"].get(model)
+        if price is None:
+            return 0.0
+        return (prompt_tokens * price[0] + completion_tokens * price[1]) / 1_000_000
+
+    def build(self, form_data: Dict[str, Any], provider: Optional[str] = None,
+              model: Optional[str] = None) -> BuiltPrompt:
+        """
+        Construye el prompt para el proveedor y modelo
+
+        Sin proveedor (p. ej. para el modo simulado) se usa la ventana por defecto.
+        """
+        budget = self.prompt_budget(provider, model)
+        compact = budget < self.settings["full_instructions_min_budget"]
+
+        fields = [field for field, _ in _PERSONAL_FIELDS + _PROFILE_FIELDS + _BLOCK_FIELDS]
+        values = {field: _clean(form_data.get(field)) for field in fields}
+        dropped = tuple(field for field in fields if not values[field])
+
+        text, tokens, compressed = self._fit(values, lambda fitted: self._render(fitted, compact), budget, model)
+        return BuiltPrompt(text, tokens, budget, compact, dropped, compressed)
+
+    def build_sections(self, form_data: Dict[str, Any], provider: Optional[str] = None,
+                       model: Optional[str] = None) -> List[SectionPrompt]:
+        """
+        Construye los prompts de la generación por secciones
+
+        Un prompt para el resumen, uno por experiencia (agrupadas si superan
+        max_experience_prompts) y uno para las habilidades. Cada respuesta es
+        un JSON con la clave de su sección; sin experiencias no hay prompts de
+        experiencia.
+        """
+        values = {field: _clean(form_data.get(field)) for field, _ in _PROFILE_FIELDS + _BLOCK_FIELDS}
+        experiences = split_experiences(values["experiencia_laboral"])
+        per_prompt = math.ceil(len(experiences) / self.fan_out["max_experience_prompts"]) or 1
+        chunks = [experiences[i:i + per_prompt] for i in range(0, len(experiences), per_prompt)]
+
+        requests = [("resumen_profesional", values, "")]
+        for chunk in chunks:
+            experience = "\n".join(chunk)
+            requests.append(("experiencia_optimizada", {**values, "experiencia_laboral": experience}, experience))
+        requests.append(("habilidades_organizadas", values, ""))
+
+        sections = []
+        for section, section_values, experience in requests:
+            output_tokens = min(self.fan_out["output_tokens"][section], self.output_tokens(provider, model))
+            budget = self.prompt_budget(provider, model, output_tokens)
+            fields = _SECTION_FIELDS[section]
+            fitted = {field: section_values[field] for field in fields}
+            dropped = tuple(field for field in fields if not fitted[field])
+            text, tokens, compressed = self._fit(
+                fitted, lambda current, section=section: self._render_section(section, current), budget, model
+            )
+            sections.append(SectionPrompt(
+                section, BuiltPrompt(text, tokens, budget, True, dropped, compressed), output_tokens, experience
+            ))
+        return sections
+
+    def _fit(self, values: Dict[str, str], render: Callable[[Dict[str, str]], str], budget: int,
+             model: Optional[str]) -> Tuple[str, int, Tuple[str, ...]]:
+        """Recorta los campos de texto libre hasta que el prompt cabe en el presupuesto"""
+        text = render(values)
+        tokens = self.estimate_tokens(text, model)
+        compressed = []
+        if tokens > budget:
+            sizes = {field: self.estimate_tokens(values[field], model)
+                     for field in _COMPRESSIBLE if values.get(field)}
+            fixed = tokens - sum(sizes.values())
+            chars_per_token = self._chars_per_token(model)
+            for field, allowed in _allocate(sizes, budget - fixed).items():
+                if allowed < sizes[field]:
+                    values[field] = compress_text(values[field], int(allowed * chars_per_token))
+                    compressed.append(field)
+            text = render(values)
+            tokens = self.estimate_tokens(text, model)
+        return text, tokens, tuple(compressed)
+
+    def _chars_per_token(self, model: Optional[str]) -> float:
+        ratios = self.settings["chars_per_token"]
+        for fragment, ratio in ratios.items():
+            if fragment != "default" and model and fragment in model:
+                return ratio
+        return ratios["default"]
+
+    def _render(self, values: Dict[str, str], compact: bool) -> str:
+        """Texto del prompt con las secciones que tienen algún dato"""
+        if compact:
+            # Los datos de contacto no aparecen en el JSON de respuesta
+            lines = [_COMPACT_HEADER]
+            if values["nombre"]:
+                lines.append(f"Nombre: {values['nombre']}\n")
+            for field, label in _PROFILE_FIELDS:
+                if values[field]:
+                    lines.append(f"{label}: {values[field]}\n")
+            for field, title in _BLOCK_FIELDS:
+                if values[field]:
+                    lines.append(f"{title.capitalize()}:\n{values[field]}\n")
+            lines.append(_COMPACT_INSTRUCTIONS)
+            return "".join(lines)
+
+        sections = [_FULL_HEADER]
+        for title, group in (("DATOS PERSONALES", _PERSONAL_FIELDS), ("PERFIL PROFESIONAL", _PROFILE_FIELDS)):
+            entries = [f"- {label}: {values[field]}" for field, label in group if values[field]]
+            if entries:
+                sections.append(f"\n{title}:\n" + "\n".join(entries) + "\n")
+        for field, title in _BLOCK_FIELDS:
+            if values[field]:
+                sections.append(f"\n{title}:\n{values[field]}\n")
+        sections.append(_FULL_INSTRUCTIONS)
+        return "".join(sections)
+
+    def _render_section(self, section: str, values: Dict[str, str]) -> str:
+        """Texto del prompt de una sección con los campos que tienen algún dato"""
+        lines = [_SECTION_HEADER]
+        for field, label in _PROFILE_FIELDS:
+            if values.get(field):
+                lines.append(f"{label}: {values[field]}\n")
+        for field, title in _BLOCK_FIELDS:
+            if values.get(field):
+                lines.append(f"{title.capitalize()}:\n{values[field]}\n")
+        lines.append(_SECTION_INSTRUCTIONS[section])
+        return "".join(lines)
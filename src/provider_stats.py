@@ -0,0 +1,112 @@
+"""
+Estadísticas de rendimiento por proveedor de IA
+
+Este módulo registra latencias, errores y victorias (en modo hedged) de cada
+proveedor para poder ajustar el orden en que se consultan, además de los
+tokens consumidos y su coste.
+"""
+
+import math
+import threading
+from collections import deque
+from typing import Dict, Any, List
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil por rango más cercano de una lista de valores"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+class ProviderStats:
+    """Contadores y ventana de latencias recientes por proveedor"""
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._lock = threading.Lock()
+        self._providers: Dict[str, Dict[str, Any]] = {}
+
+    def _entry(self, provider: str) -> Dict[str, Any]:
+        entry = self._providers.get(provider)
+        if entry is None:
+            entry = {
+                "calls": 0,
+                "errors": 0,
+                "hedged_races": 0,
+                "wins": 0,
+                "cancelled": 0,
+                "soft_deadline_fallbacks": 0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "estimated_usage": 0,
+                "cost_usd": 0.0,
+                "latencies": deque(maxlen=self.window)
+            }
+            self._providers[provider] = entry
+        return entry
+
+    def record_call(self, provider: str, latency: float, success: bool):
+        """Registra una llamada completada (con éxito o error) y su latencia"""
+        with self._lock:
+            entry = self._entry(provider)
+            entry["calls"] += 1
+            if success:
+                entry["latencies"].append(latency)
+            else:
+                entry["errors"] += 1
+
+    def record_usage(self, provider: str, prompt_tokens: int, completion_tokens: int,
+                     cost: float, estimated: bool = False):
+        """Registra los tokens (informados por el proveedor o estimados) y el coste de una llamada"""
+        with self._lock:
+            entry = self._entry(provider)
+            entry["prompt_tokens"] += prompt_tokens
+            entry["completion_tokens"] += completion_tokens
+            entry["cost_usd"] += cost
+            if estimated:
+                entry["estimated_usage"] += 1
+
+    def record_race(self, provider: str, won: bool = False, cancelled: bool = False):
+        """Registra la participación de un proveedor en una carrera hedged"""
+        with self._lock:
+            entry = self._entry(provider)
+            entry["hedged_races"] += 1
+            if won:
+                entry["wins"] += 1
+            if cancelled:
+                entry["cancelled"] += 1
+
+    def record_soft_deadline(self, provider: str):
+        """Registra una generación servida con el contenido de respaldo por superar el plazo blando"""
+        with self._lock:
+            self._entry(provider)["soft_deadline_fallbacks"] += 1
+
+    def get_summary(self) -> Dict[str, Dict[str, Any]]:
+        """Devuelve tasas de error/victoria, percentiles de latencia, tokens y coste por proveedor"""
+        with self._lock:
+            summary = {}
+            for provider, entry in self._providers.items():
+                latencies = list(entry["latencies"])
+                successes = entry["calls"] - entry["errors"]
+                summary[provider] = {
+                    "calls": entry["calls"],
+                    "errors": entry["errors"],
+                    "error_rate": entry["errors"] / entry["calls"] if entry["calls"] else 0.0,
+                    "hedged_races": entry["hedged_races"],
+                    "wins": entry["wins"],
+                    "win_rate": entry["wins"] / entry["hedged_races"] if entry["hedged_races"] else 0.0,
+                    "cancelled": entry["cancelled"],
+                    "soft_deadline_fallbacks": entry["soft_deadline_fallbacks"],
+                    "prompt_tokens": entry["prompt_tokens"],
+                    "completion_tokens": entry["completion_tokens"],
+                    "estimated_usage": entry["estimated_usage"],
+                    "cost_usd": round(entry["cost_usd"], 6),
+                    "avg_cost_usd": round(entry["cost_usd"] / successes, 6) if successes else 0.0,
+                    "p50": percentile(latencies, 50),
+                    "p95": percentile(latencies, 95),
+                    "p99": percentile(latencies, 99)
+                }
+            return summary
@@ -0,0 +1,309 @@
+"""
+Limitación de peticiones por proveedor y API key
+
+Este módulo evita los 429 de los tiers gratuitos: cada par (proveedor, key)
+tiene un token bucket configurado desde API_CONFIGS["rate_limit"]. Antes de
+cada llamada se pide un token; si no hay uno disponible en pocos segundos la
+petición se desvía al siguiente proveedor de la cadena de fallback en lugar de
+esperar o fallar. Las cabeceras Retry-After y x-ratelimit-* de las respuestas
+ajustan el bucket y bloquean la key hasta que el proveedor la libere. También
+se lleva la cuenta del consumo mensual de cada key, guardada en un pequeño
+archivo JSON para que la cuota se respete entre reinicios.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional, Tuple
+
+from .config import API_CONFIGS, RATE_LIMIT_SETTINGS
+from .utils import write_json_atomic
+
+# Cabeceras (restantes, reinicio) que publican los proveedores
+_REMAINING_HEADERS = (
+    ("x-ratelimit-remaining-requests", "x-ratelimit-reset-requests"),  # OpenAI, Groq
+    ("x-ratelimit-remaining-tokens", "x-ratelimit-reset-tokens"),
+    ("anthropic-ratelimit-requests-remaining", "anthropic-ratelimit-requests-reset"),
+    ("anthropic-ratelimit-tokens-remaining", "anthropic-ratelimit-tokens-reset"),
+)
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+class RateLimitedError(Exception):
+    """El proveedor respondió 429 y la petición debe ir a otro proveedor"""
+
+
+def key_fingerprint(api_key: Optional[str]) -> str:
+    """Identificador corto de la API key (nunca se guarda la key en claro)"""
+    if not api_key:
+        return "anonymous"
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Convierte Retry-After (segundos o fecha HTTP) en segundos de espera"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """Convierte un reinicio de cuota ("6m0s", "20ms", "1.5" o RFC 3339) en segundos"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if parts and "".join(number + unit for number, unit in parts) == value:
+        return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+    try:
+        reset_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if reset_at.tzinfo is None:
+        reset_at = reset_at.replace(tzinfo=timezone.utc)
+    return max((reset_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class TokenBucket:
+    """Token bucket clásico: `rate` tokens por segundo hasta `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def wait_time(self) -> float:
+        """Segundos hasta que haya un token disponible (0 si ya lo hay)"""
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def available(self) -> float:
+        """Tokens disponibles ahora mismo"""
+        self._refill()
+        return round(self.tokens, 2)
+
+    def consume(self):
+        self._refill()
+        self.tokens -= 1
+
+    def limit_to(self, remaining: float):
+        """Ajusta los tokens a lo que el proveedor dice que queda"""
+        self._refill()
+        self.tokens = min(self.tokens, remaining)
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class _KeyState:
+    """Bucket, bloqueo y consumo de un par (proveedor, key)"""
+
+    def __init__(self, bucket: Optional[TokenBucket], monthly_quota: Optional[int]):
+        self.bucket = bucket
+        self.monthly_quota = monthly_quota
+        self.blocked_until = 0.0
+        self.month = ""
+        self.used_this_month = 0
+        self.reported_remaining: Optional[int] = None
+        self.stats = {"calls": 0, "throttled": 0, "rerouted": 0, "queued": 0, "waited_seconds": 0.0}
+
+    def quota_left(self) -> Optional[int]:
+        if self.monthly_quota is None:
+            return self.reported_remaining
+        left = max(self.monthly_quota - self.used_this_month, 0)
+        if self.reported_remaining is not None:
+            left = min(left, self.reported_remaining)
+        return left
+
+
+class RateLimiter:
+    """Token buckets por (proveedor, API key) con bloqueo por 429 y cuota mensual"""
+
+    def __init__(self, max_wait: Optional[float] = None, provider_limits: Optional[Dict[str, Dict[str, Any]]] = None,
+                 usage_path: Optional[str] = RATE_LIMIT_SETTINGS["usage_path"]):
+        self.max_wait = max_wait if max_wait is not None else RATE_LIMIT_SETTINGS["max_wait"]
+        self.provider_limits = provider_limits if provider_limits is not None else {
+            provider: config["rate_limit"]
+            for provider, config in API_CONFIGS.items()
+            if config.get("rate_limit")
+        }
+        self._states: Dict[Tuple[str, str], _KeyState] = {}
+        self._lock = threading.Lock()
+        # Consumo mensual guardado: "proveedor:huella" -> (mes, llamadas)
+        self.usage_path = usage_path
+        self._saved_usage: Dict[str, Tuple[str, int]] = self._load_usage()
+        self._usage_dirty = False
+        self._last_save = time.monotonic()
+
+    async def acquire(self, provider: str, api_key: Optional[str]) -> bool:
+        """
+        Reserva un token para llamar al proveedor con esa key
+
+        Espera como mucho max_wait segundos. Devuelve False si la key está
+        bloqueada más tiempo o ha agotado su cuota mensual: el llamante debe
+        desviar la petición a otro proveedor.
+        """
+        state = self._get_state(provider, api_key)
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._roll_month(state)
+                quota_left = state.quota_left()
+                wait = max(state.blocked_until - now, 0.0)
+                if state.bucket is not None:
+                    wait = max(wait, state.bucket.wait_time())
+
+                if quota_left == 0 or now + wait > deadline:
+                    state.stats["rerouted"] += 1
+                    return False
+                if wait <= 0:
+                    if state.bucket is not None:
+                        state.bucket.consume()
+                    state.used_this_month += 1
+                    if state.reported_remaining is not None:
+                        state.reported_remaining = max(state.reported_remaining - 1, 0)
+                    state.stats["calls"] += 1
+                    self._usage_dirty = True
+                    save_due = time.monotonic() - self._last_save >= RATE_LIMIT_SETTINGS["save_interval"]
+                    break
+                state.stats["queued"] += 1
+                state.stats["waited_seconds"] += wait
+            await asyncio.sleep(wait)
+        if save_due:
+            await asyncio.to_thread(self.save_usage)
+        return True
+
+    def save_usage(self):
+        """Guarda el consumo mensual de cada key si ha cambiado"""
+        if not self.usage_path:
+            return
+        with self._lock:
+            if not self._usage_dirty:
+                return
+            usage = {key: {"month": month, "used": used} for key, (month, used) in self._saved_usage.items()}
+            for (provider, fingerprint), state in self._states.items():
+                if state.used_this_month:
+                    usage[f"{provider}:{fingerprint}"] = {"month": state.month, "used": state.used_this_month}
+            self._usage_dirty = False
+            self._last_save = time.monotonic()
+        try:
+            write_json_atomic(self.usage_path, usage)
+        except OSError as e:
+            print(f"Error guardando el consumo mensual de las API keys: {e}")
+
+    def observe_response(self, provider: str, api_key: Optional[str], status_code: int, headers):
+        """Actualiza el estado de la key con el código y las cabeceras de la respuesta"""
+        state = self._get_state(provider, api_key)
+        with self._lock:
+            now = time.monotonic()
+            if status_code == 429:
+                state.stats["throttled"] += 1
+                retry_after = parse_retry_after(headers.get("retry-after"))
+                if retry_after is None:
+                    retry_after = RATE_LIMIT_SETTINGS["default_retry_after"]
+                state.blocked_until = max(state.blocked_until, now + retry_after)
+                if state.bucket is not None:
+                    state.bucket.limit_to(0)
+
+            for remaining_header, reset_header in _REMAINING_HEADERS:
+                remaining = headers.get(remaining_header)
+                if remaining is None:
+                    continue
+                try:
+                    remaining = float(remaining)
+                except ValueError:
+                    continue
+                if state.bucket is not None:
+                    state.bucket.limit_to(remaining)
+                if remaining <= 0:
+                    reset = parse_reset(headers.get(reset_header))
+                    if reset is not None:
+                        state.blocked_until = max(state.blocked_until, now + reset)
+
+            # Cohere publica las llamadas restantes de la cuota de prueba
+            trial_remaining = headers.get("x-trial-endpoint-call-remaining")
+            if trial_remaining is not None and trial_remaining.isdigit():
+                state.reported_remaining = int(trial_remaining)
+
+    def get_status(self) -> Dict[str, Dict[str, Any]]:
+        """Devuelve el estado de cada key: tokens, bloqueo y consumo de cuota"""
+        with self._lock:
+            now = time.monotonic()
+            status = {}
+            for (provider, fingerprint), state in self._states.items():
+                self._roll_month(state)
+                status[f"{provider}:{fingerprint}"] = {
+                    "provider": provider,
+                    "key": fingerprint,
+                    "tokens": state.bucket.available() if state.bucket is not None else None,
+                    "blocked_for": round(max(state.blocked_until - now, 0.0), 1),
+                    "month": state.month,
+                    "used_this_month": state.used_this_month,
+                    "monthly_quota": state.monthly_quota,
+                    "quota_left": state.quota_left(),
+                    **{name: round(value, 2) for name, value in state.stats.items()}
+                }
+            return status
+
+    def _get_state(self, provider: str, api_key: Optional[str]) -> _KeyState:
+        key = (provider, key_fingerprint(api_key))
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                limits = self.provider_limits.get(provider) or {}
+                bucket = None
+                if limits.get("requests_per_minute"):
+                    bucket = TokenBucket(
+                        rate=limits["requests_per_minute"] / 60.0,
+                        capacity=limits.get("burst", 1)
+                    )
+                state = _KeyState(bucket, limits.get("monthly_quota"))
+                # Continuar con el consumo guardado por ejecuciones anteriores
+                state.month, state.used_this_month = self._saved_usage.pop(f"{provider}:{key[1]}", ("", 0))
+                self._states[key] = state
+            return state
+
+    def _load_usage(self) -> Dict[str, Tuple[str, int]]:
+        """Lee el consumo mensual guardado (vacío si no hay archivo o está dañado)"""
+        if not self.usage_path or not os.path.exists(self.usage_path):
+            return {}
+        try:
+            with open(self.usage_path, "r", encoding="utf-8") as f:
+                return {key: (entry["month"], int(entry["used"])) for key, entry in json.load(f).items()}
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            print(f"Error cargando el consumo mensual de las API keys: {e}")
+            return {}
+
+    @staticmethod
+    def _roll_month(state: _KeyState):
+        month = datetime.now(timezone.utc).strftime("%Y-%m")
+        if state.month != month:
+            state.month = month
+            state.used_this_month = 0
+            state.reported_remaining = None
@@ -0,0 +1,167 @@
+"""
+Motor de renderizado de PDFs en un pool de procesos
+
+Este módulo saca la construcción del story y el `doc.build` de ReportLab del
+hilo que atiende las peticiones: cada worker del pool mantiene su propio
+PDFGenerator con las plantillas ya construidas, y el llamante obtiene un
+awaitable. El número de renders en vuelo y de peticiones en espera está
+acotado para aplicar backpressure bajo carga, y los renders idénticos en vuelo
+(mismos datos y plantilla) comparten un único PDF. Con el plazo de la
+petición, cada llamante deja de esperar cuando vence el suyo; el render
+compartido no tiene plazo propio y solo se cancela cuando no queda nadie
+esperándolo. Un render cancelado conserva su hueco del carril hasta que el
+worker termina, para que la cola interna del pool no crezca sin límite. Los
+spans de tiempo del worker (story y `doc.build`) vuelven con el PDF y se
+registran en el proceso principal.
+"""
+
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Optional, Tuple
+
+from .config import RENDER_SETTINGS
+from .deadline import Deadline, DeadlineExceeded, record_overrun
+from .pdf_generator import PDFGenerator
+from .scheduler import Lane
+from .single_flight import SingleFlight
+from .tracing import get_tracer
+
+# PDFGenerator propio de cada proceso worker (plantillas precargadas)
+_worker_generator: Optional[PDFGenerator] = None
+
+
+def _init_worker():
+    """Inicializa el worker construyendo las plantillas una sola vez"""
+    global _worker_generator
+    _worker_generator = PDFGenerator()
+
+
+def _worker_ping() -> int:
+    """Tarea vacía para arrancar los workers por adelantado"""
+    return os.getpid()
+
+
+def _render_in_worker(form_data: Dict[str, Any], ai_content: Dict[str, Any], template: str,
+                      trace_context: Optional[tuple] = None) -> Tuple[bytes, list]:
+    """Renderiza el CV en memoria dentro del worker; devuelve los bytes del PDF y sus spans"""
+    with get_tracer().capture(trace_context) as spans:
+        pdf_bytes = _worker_generator.create_cv_pdf_bytes(form_data, ai_content, template)
+    return pdf_bytes, spans
+
+
+def _render_key(form_data: Dict[str, Any], ai_content: Dict[str, Any], template: str) -> str:
+    """Hash de los datos, el contenido y la plantilla de un render"""
+    material = json.dumps([form_data, ai_content, template], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class PDFRenderEngine:
+    """Pool de procesos calientes para generar PDFs sin bloquear el event loop"""
+
+    def __init__(self, max_workers: Optional[int] = None, max_pending: Optional[int] = None,
+                 start_method: Optional[str] = None):
+        self.max_workers = max_workers or RENDER_SETTINGS["max_workers"]
+        self.max_pending = max_pending if max_pending is not None else RENDER_SETTINGS["max_pending"]
+        self.start_method = start_method or RENDER_SETTINGS["start_method"]
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        # Carril propio para los renders, independiente de las llamadas de IA
+        self._lane = Lane("pdf", self.max_workers, self.max_pending,
+                          initial_service_time=RENDER_SETTINGS["initial_render_time"])
+        self._stats = {"rendered": 0, "failed": 0}
+        self.inflight = SingleFlight("render")
+
+    async def render(self, form_data: Dict[str, Any], ai_content: Dict[str, Any],
+                     template: str = 'modern', deadline: Optional[Deadline] = None) -> bytes:
+        """
+        Renderiza el CV en el pool de procesos
+
+        Si ya hay en vuelo un render con los mismos datos y plantilla, espera
+        a ese PDF en lugar de ocupar otro worker. El plazo solo limita la
+        espera de este llamante: el render compartido sigue mientras otro lo
+        espere.
+
+        Returns:
+            bytes: Contenido del PDF (el worker no escribe archivos temporales)
+
+        Raises:
+            QueueFullError: Si ya hay max_pending renders esperando turno
+            DeadlineExceeded: Si el plazo de la petición vence antes de tener el PDF
+        """
+        with get_tracer().span("pdf.render", template=template) as current:
+            flight = self.inflight.do(
+                _render_key(form_data, ai_content, template),
+                lambda: self._render(form_data, ai_content, template)
+            )
+            if deadline is None:
+                pdf_bytes, shared = await flight
+            else:
+                try:
+                    pdf_bytes, shared = await asyncio.wait_for(flight, deadline.remaining())
+                except asyncio.TimeoutError:
+                    record_overrun("pdf.render")
+                    raise DeadlineExceeded("pdf.render") from None
+            current.set_attribute("coalesced", shared)
+            return pdf_bytes
+
+    async def _render(self, form_data: Dict[str, Any], ai_content: Dict[str, Any], template: str) -> bytes:
+        tracer = get_tracer()
+        async with self._lane.slot() as lease:
+            try:
+                # Los spans del worker continúan la traza del llamante
+                future = self._get_executor().submit(
+                    _render_in_worker, form_data, ai_content, template, tracer.current_context()
+                )
+                # Si se deja de esperar, el hueco sigue ocupado mientras el worker renderiza
+                lease.hold(future)
+                pdf_bytes, spans = await asyncio.wrap_future(future)
+                tracer.import_spans(spans)
+                self._stats["rendered"] += 1
+                return pdf_bytes
+            except Exception:
+                self._stats["failed"] += 1
+                raise
+
+    def warm_up(self):
+        """Arranca todos los workers para que el primer render no pague el arranque"""
+        executor = self._get_executor()
+        futures = [executor.submit(_worker_ping) for _ in range(self.max_workers)]
+        for future in futures:
+            future.result()
+
+    def shutdown(self, wait: bool = True):
+        """Detiene el pool de procesos"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait, cancel_futures=True)
+                self._executor = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Devuelve el tamaño del pool y los contadores de renders"""
+        lane = self._lane.get_stats()
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            **self._stats,
+            "coalesced": self.inflight.get_stats()["coalesced"],
+            "rejected": lane["rejected"],
+            "waiting": lane["waiting"],
+            "in_flight": lane["in_flight"],
+            "avg_render_time": lane["avg_service_time"]
+        }
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=_init_worker
+                )
+            return self._executor
@@ -0,0 +1,180 @@
+"""
+Caché de respuestas de IA direccionada por contenido
+
+Este módulo guarda el contenido generado por los proveedores de IA usando como
+clave un hash del prompt normalizado más los parámetros de generación. Tiene
+un nivel en memoria (LRU) y un nivel opcional en disco (SQLite) con TTL y
+expulsión por tamaño, de modo que regenerar el mismo CV con otra plantilla no
+vuelve a pasar por la red. Los accesos a disco (last_access para la expulsión
+LRU) se acumulan en memoria y se escriben por lotes: leer de la caché no hace
+un commit por acierto.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+
+class ResponseCache:
+    """Caché LRU en memoria con nivel opcional en SQLite"""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 7 * 24 * 3600,
+                 disk_path: Optional[str] = None, disk_max_entries: int = 5000,
+                 access_flush_every: int = 64):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_max_entries = disk_max_entries
+        self.access_flush_every = access_flush_every
+        # Accesos a disco pendientes de escribir: clave -> último acceso
+        self._pending_access: Dict[str, float] = {}
+
+        # clave -> (instante de creación, JSON serializado)
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0
+        }
+
+        self._db = None
+        if disk_path:
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created REAL NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(prompt: str, provider: str, model: str, temperature: float, max_tokens: int) -> str:
+        """Calcula la clave de caché a partir del prompt normalizado y los parámetros"""
+        normalized_prompt = " ".join(prompt.split())
+        material = json.dumps(
+            [normalized_prompt, provider, model, temperature, max_tokens],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Devuelve una copia del contenido cacheado o None si no existe o ha caducado"""
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, value = entry
+                if now - created <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self._stats["hits"] += 1
+                    self._stats["memory_hits"] += 1
+                    return json.loads(value)
+                del self._memory[key]
+                self._stats["expirations"] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, created = row
+                    if now - created <= self.ttl:
+                        self._pending_access[key] = now
+                        if len(self._pending_access) >= self.access_flush_every:
+                            self._flush_access()
+                            self._db.commit()
+                        self._store_in_memory(key, created, value)
+                        self._stats["hits"] += 1
+                        self._stats["disk_hits"] += 1
+                        return json.loads(value)
+                    # Caducada: la borra (y la cuenta) la siguiente expulsión en set()
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, content: Any):
+        """Guarda el contenido en ambos niveles de la caché"""
+        now = time.time()
+        value = json.dumps(content, ensure_ascii=False)
+
+        with self._lock:
+            self._store_in_memory(key, now, value)
+
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created, last_access) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, value, now, now)
+                )
+                self._flush_access()  # Antes de expulsar: el orden LRU usa last_access
+                self._evict_disk(now)
+                self._db.commit()
+
+    def clear(self):
+        """Vacía la caché (los contadores se mantienen)"""
+        with self._lock:
+            self._memory.clear()
+            self._pending_access.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Devuelve los contadores de aciertos, fallos y expulsiones"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            if self._db is not None:
+                stats["disk_entries"] = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def flush(self):
+        """Escribe en disco los accesos pendientes"""
+        with self._lock:
+            if self._db is not None and self._pending_access:
+                self._flush_access()
+                self._db.commit()
+
+    def _flush_access(self):
+        """Actualiza last_access de las entradas leídas desde el último lote (sin commit)"""
+        if self._pending_access:
+            self._db.executemany(
+                "UPDATE responses SET last_access = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._pending_access.items()]
+            )
+            self._pending_access.clear()
+
+    def _store_in_memory(self, key: str, created: float, value: str):
+        """Inserta en el nivel LRU expulsando la entrada menos usada si está lleno"""
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _evict_disk(self, now: float):
+        """Elimina entradas caducadas y las menos usadas si se supera el tamaño máximo"""
+        expired = self._db.execute(
+            "DELETE FROM responses WHERE created < ?", (now - self.ttl,)
+        ).rowcount
+        self._stats["expirations"] += max(expired, 0)
+
+        count = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        overflow = count - self.disk_max_entries
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+                (overflow,)
+            )
+            self._stats["evictions"] += overflow
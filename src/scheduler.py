@@ -0,0 +1,195 @@
+"""
+Planificador de trabajos con carriles de prioridad
+
+Este módulo limita cuántas generaciones se ejecutan a la vez y cuántas pueden
+esperar turno. Cada carril tiene su propio límite de concurrencia y su propia
+cola, de modo que las generaciones simuladas (instantáneas) nunca esperan
+detrás de llamadas de 60 segundos a un LLM y los proveedores de pago no
+compiten con los gratuitos. Cuando una cola está llena la petición se rechaza
+de inmediato con una estimación del tiempo de espera.
+"""
+
+import asyncio
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional
+
+from .config import SCHEDULER_SETTINGS, get_paid_providers
+from .deadline import Deadline, DeadlineExceeded, record_overrun
+from . import tracing
+
+
+class QueueFullError(Exception):
+    """Se lanza cuando un carril no admite más trabajos en espera"""
+
+    def __init__(self, lane: str, estimated_wait: float):
+        self.lane = lane
+        self.estimated_wait = estimated_wait
+        super().__init__(
+            f"Cola '{lane}' llena (espera estimada: {estimated_wait:.0f} s)"
+        )
+
+
+async def _acquire_within(slots: asyncio.Semaphore, timeout: float) -> bool:
+    """
+    Adquiere el semáforo esperando como mucho timeout segundos
+
+    A diferencia de wait_for(slots.acquire(), ...), que antes de Python 3.12
+    puede perder un hueco si el timeout vence justo cuando acquire() lo
+    consigue, aquí un hueco conseguido tarde (o durante una cancelación) se
+    devuelve siempre.
+    """
+    acquire = asyncio.ensure_future(slots.acquire())
+    try:
+        await asyncio.wait_for(asyncio.shield(acquire), timeout)
+        return True
+    except BaseException as error:
+        if acquire.done() and not acquire.cancelled():
+            slots.release()
+        else:
+            acquire.cancel()  # El semáforo pasa el hueco al siguiente si ya se lo había dado
+        if isinstance(error, asyncio.TimeoutError):
+            return False
+        raise
+
+
+class SlotLease:
+    """Hueco reservado de un carril; hold() lo mantiene ocupado hasta que termine un futuro"""
+
+    __slots__ = ("future",)
+
+    def __init__(self):
+        self.future = None
+
+    def hold(self, future):
+        """
+        Retiene el hueco hasta que termine future (de concurrent.futures)
+
+        Si el bloque sale antes (cancelación, plazo vencido) el trabajo sigue
+        ocupando su worker, así que el hueco no se libera hasta entonces.
+        """
+        self.future = future
+
+
+class Lane:
+    """Carril con concurrencia limitada, cola acotada y tiempo de servicio medio"""
+
+    def __init__(self, name: str, concurrency: int, max_queue: int,
+                 initial_service_time: float = 1.0, smoothing: float = 0.2):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.smoothing = smoothing
+        self._service_time = initial_service_time  # Media móvil exponencial (s)
+
+        # Un semáforo por event loop, como en PDFRenderEngine
+        self._slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._stats = {"completed": 0, "rejected": 0, "waiting": 0, "in_flight": 0}
+
+    @asynccontextmanager
+    async def slot(self, deadline: Optional[Deadline] = None):
+        """
+        Reserva un hueco del carril durante el bloque `async with`
+
+        El bloque recibe un SlotLease para retener el hueco más allá del
+        bloque mientras siga en marcha un trabajo de otro hilo o proceso.
+
+        Raises:
+            QueueFullError: Si el carril está ocupado y ya hay max_queue en espera
+            DeadlineExceeded: Si el plazo de la petición vence antes de conseguir hueco
+        """
+        slots = self._get_slots()
+        if slots.locked() and self._stats["waiting"] >= self.max_queue:
+            self._stats["rejected"] += 1
+            raise QueueFullError(self.name, self.estimated_wait())
+
+        self._stats["waiting"] += 1
+        try:
+            with tracing.span(f"queue.{self.name}"):
+                if deadline is None:
+                    await slots.acquire()
+                elif not await _acquire_within(slots, deadline.remaining()):
+                    record_overrun(f"queue.{self.name}")
+                    raise DeadlineExceeded(f"queue.{self.name}")
+        finally:
+            self._stats["waiting"] -= 1
+
+        self._stats["in_flight"] += 1
+        start = time.monotonic()
+
+        def release():
+            elapsed = time.monotonic() - start
+            self._service_time += self.smoothing * (elapsed - self._service_time)
+            self._stats["in_flight"] -= 1
+            self._stats["completed"] += 1
+            slots.release()
+
+        lease = SlotLease()
+        try:
+            yield lease
+        finally:
+            if lease.future is not None and not lease.future.done():
+                # El worker sigue ocupado: liberar en el event loop cuando termine
+                loop = asyncio.get_running_loop()
+                lease.future.add_done_callback(
+                    lambda _: loop.is_closed() or loop.call_soon_threadsafe(release)
+                )
+            else:
+                release()
+
+    def estimated_wait(self) -> float:
+        """Segundos estimados hasta que un trabajo nuevo empiece a ejecutarse"""
+        if self._stats["in_flight"] < self.concurrency:
+            return 0.0
+        rounds = self._stats["waiting"] // self.concurrency + 1
+        return rounds * self._service_time
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Devuelve límites, ocupación y tiempo de servicio medio del carril"""
+        return {
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "avg_service_time": round(self._service_time, 3),
+            "estimated_wait": round(self.estimated_wait(), 1),
+            **self._stats
+        }
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = asyncio.Semaphore(self.concurrency)
+            self._slots[loop] = slots
+        return slots
+
+
+class JobScheduler:
+    """Asigna cada generación a su carril (simulado, gratuito o de pago)"""
+
+    def __init__(self, lanes: Optional[Dict[str, Dict[str, Any]]] = None):
+        lanes = lanes or SCHEDULER_SETTINGS["lanes"]
+        self.lanes = {name: Lane(name, **settings) for name, settings in lanes.items()}
+        self._paid_providers = set(get_paid_providers())
+
+    def lane_for(self, api_provider: str) -> Lane:
+        """Devuelve el carril que corresponde al proveedor"""
+        if api_provider == "mock":
+            return self.lanes["instant"]
+        if api_provider in self._paid_providers:
+            return self.lanes["premium"]
+        return self.lanes["standard"]
+
+    def llm_slot(self, api_provider: str, deadline: Optional[Deadline] = None):
+        """Context manager asíncrono que reserva un hueco para la llamada de IA"""
+        return self.lane_for(api_provider).slot(deadline)
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Devuelve las estadísticas de todos los carriles"""
+        return {name: lane.get_stats() for name, lane in self.lanes.items()}
+
+    def get_gradio_concurrency(self) -> int:
+        """Trabajos simultáneos que Gradio debe dejar pasar hasta el planificador"""
+        return sum(lane.concurrency + lane.max_queue for lane in self.lanes.values())
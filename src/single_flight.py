@@ -0,0 +1,149 @@
+"""
+Agrupación de peticiones idénticas en vuelo (single-flight)
+
+Las llamadas concurrentes con la misma clave (hash del prompt, proveedor y
+modelo; o de los datos y la plantilla de un PDF) esperan a una única
+ejecución compartida en lugar de repetir la llamada al proveedor o el render.
+Cubre los dobles clics en "Generar CV" y los perfiles duplicados de un lote.
+Una ejecución solo se cancela cuando todos los que la esperaban se han ido.
+"""
+
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+class FlightAbandoned(Exception):
+    """El líder de un vuelo se fue sin resultado (p. ej. un stream abandonado)"""
+
+
+class _Flight:
+    """Ejecución en vuelo: su futuro y cuántos la esperan"""
+
+    __slots__ = ("future", "waiters")
+
+    def __init__(self, future: asyncio.Future):
+        self.future = future
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Registro de ejecuciones en vuelo por clave"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        # (event loop, clave) -> vuelo: un futuro solo se puede esperar en su loop
+        self._flights: Dict[Tuple[int, str], _Flight] = {}
+        self._stats = {"leaders": 0, "coalesced": 0}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Ejecuta fn() o se une a la ejecución en vuelo con la misma clave
+
+        Returns:
+            tuple: (resultado, compartido); compartido es True si el resultado
+                   es de otra llamada (el llamante no debe modificarlo)
+        """
+        while True:
+            flight, shared = self._join_or_start(key, fn)
+            try:
+                return await self._wait(flight), shared
+            except FlightAbandoned:
+                continue  # El líder se fue sin resultado: volver a intentarlo
+
+    def join(self, key: str) -> Optional[_Flight]:
+        """Vuelo en curso con esta clave (contado como agrupado) o None"""
+        with self._lock:
+            flight = self._flights.get(self._key(key))
+            if flight is not None:
+                flight.waiters += 1
+                self._stats["coalesced"] += 1
+            return flight
+
+    def lead(self, key: str) -> _Flight:
+        """
+        Registra al llamante como líder de la clave
+
+        El líder debe resolver el vuelo con finish(); mientras tanto, quien
+        llame a join() con la misma clave espera su resultado.
+        """
+        flight = _Flight(asyncio.get_running_loop().create_future())
+        with self._lock:
+            self._flights[self._key(key)] = flight
+            self._stats["leaders"] += 1
+        return flight
+
+    def finish(self, key: str, flight: _Flight, result: Any = None, error: Optional[BaseException] = None):
+        """Publica el resultado (o el error) del líder y retira el vuelo"""
+        with self._lock:
+            if self._flights.get(self._key(key)) is flight:
+                del self._flights[self._key(key)]
+        if not flight.future.done():
+            if error is not None:
+                flight.future.set_exception(error)
+                flight.future.exception()  # Sin nadie en espera no es un error sin recuperar
+            else:
+                flight.future.set_result(result)
+
+    async def wait(self, flight: _Flight) -> Any:
+        """Espera el resultado de un vuelo obtenido con join()"""
+        return await self._wait(flight)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Devuelve ejecuciones lanzadas, llamadas agrupadas y vuelos en curso"""
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._flights)}
+
+    def _key(self, key: str) -> Tuple[int, str]:
+        return id(asyncio.get_running_loop()), key
+
+    def _join_or_start(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[_Flight, bool]:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            flight = self._flights.get(self._key(key))
+            if flight is not None:
+                self._stats["coalesced"] += 1
+                flight.waiters += 1
+                return flight, True
+            # La ejecución va en su propia tarea para que cancelar a un llamante no la corte
+            flight = _Flight(loop.create_task(fn()))
+            flight.waiters = 1
+            self._flights[self._key(key)] = flight
+            self._stats["leaders"] += 1
+        flight.future.add_done_callback(lambda _: self._retire(key, flight, loop))
+        return flight, False
+
+    async def _wait(self, flight: _Flight) -> Any:
+        try:
+            return await asyncio.shield(flight.future)
+        except asyncio.CancelledError:
+            if flight.future.cancelled():
+                raise
+            # El llamante se fue: si era el último en espera, cancelar la ejecución
+            with self._lock:
+                flight.waiters -= 1
+                abandoned = flight.waiters <= 0
+            if abandoned and isinstance(flight.future, asyncio.Task):
+                flight.future.cancel()
+            raise
+
+    def _retire(self, key: str, flight: _Flight, loop: asyncio.AbstractEventLoop):
+        with self._lock:
+            flight_key = (id(loop), key)
+            if self._flights.get(flight_key) is flight:
+                del self._flights[flight_key]
+        if not flight.future.cancelled():
+            flight.future.exception()  # Marcar la excepción como recuperada aunque nadie espere
+
+
+def render_metrics(*flights: SingleFlight) -> str:
+    """Contador de llamadas agrupadas por operación en formato de texto de Prometheus"""
+    lines = [
+        "# HELP cv_coalesced_requests_total Peticiones idénticas que esperaron a una ejecución en vuelo",
+        "# TYPE cv_coalesced_requests_total counter"
+    ]
+    for flight in flights:
+        stats = flight.get_stats()
+        lines.append(f'cv_coalesced_requests_total{{operation="{flight.name}"}} {stats["coalesced"]}')
+    return "\n".join(lines) + "\n"
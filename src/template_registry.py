@@ -0,0 +1,176 @@
+"""
+Registro de plantillas de CV
+
+Las plantillas se describen de forma declarativa (diccionarios o archivos JSON
+de tema) en lugar de subclases. Los estilos de cada plantilla se construyen una
+sola vez por proceso, la primera vez que se piden, y todas las instancias de
+PDFGenerator comparten el mismo objeto CVTemplate de solo lectura.
+
+Los ParagraphStyle de una plantilla (y su hoja de estilos base) también son
+compartidos: quien los use no debe modificarlos. Para variar un estilo se
+deriva uno nuevo con CVTemplate.derive_style().
+"""
+
+import glob
+import json
+import os
+import threading
+from types import MappingProxyType
+from typing import Dict, Any, Optional
+
+from reportlab.lib.colors import toColor
+from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT, TA_JUSTIFY
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
+from .config import TEMPLATE_SETTINGS
+
+STYLE_ROLES = ("nombre", "contacto", "seccion", "contenido", "subseccion")
+CONTACT_LAYOUTS = ("inline", "stacked")
+
+_ALIGNMENTS = {"left": TA_LEFT, "center": TA_CENTER, "right": TA_RIGHT, "justify": TA_JUSTIFY}
+_COLOR_FIELDS = ("textColor", "borderColor", "backColor")
+
+_lock = threading.Lock()
+_themes: Dict[str, Dict[str, Any]] = {}
+_built: Dict[str, "CVTemplate"] = {}
+_sample_styles = None
+
+
+class CVTemplate:
+    """
+    Plantilla construida a partir de un tema; inmutable y compartida por proceso
+
+    Sus estilos son de solo lectura por contrato (ParagraphStyle no impide
+    modificarlos): un cambio afectaría a todos los PDFs del proceso.
+    """
+
+    __slots__ = ("name", "description", "contact_layout", "styles", "role_styles",
+                 "nombre_style", "contacto_style", "seccion_style", "contenido_style",
+                 "subseccion_style")
+
+    def __init__(self, name: str, description: str, contact_layout: str,
+                 styles, role_styles: Dict[str, ParagraphStyle]):
+        set_attr = object.__setattr__
+        set_attr(self, "name", name)
+        set_attr(self, "description", description)
+        set_attr(self, "contact_layout", contact_layout)
+        set_attr(self, "styles", styles)
+        set_attr(self, "role_styles", MappingProxyType(dict(role_styles)))
+        for role in STYLE_ROLES:
+            set_attr(self, f"{role}_style", role_styles[role])
+
+    def __setattr__(self, key, value):
+        raise AttributeError("CVTemplate es compartida entre instancias; registra un tema nuevo")
+
+    def __repr__(self) -> str:
+        return f"CVTemplate({self.name!r})"
+
+    def derive_style(self, role: str, name: Optional[str] = None, **overrides) -> ParagraphStyle:
+        """Estilo nuevo que hereda del del rol con los cambios indicados (el compartido no se toca)"""
+        base = self.role_styles[role]
+        return ParagraphStyle(name or f"{base.name}_derived", parent=base, **overrides)
+
+
+def register_template(name: str, theme: Dict[str, Any]):
+    """
+    Registra (o reemplaza) una plantilla a partir de su tema
+
+    Args:
+        name: Identificador de la plantilla ('modern', 'executive', ...)
+        theme: Diccionario con description, contact_layout y styles por rol
+
+    Raises:
+        ValueError: Si el tema no define todos los roles o usa valores no válidos
+    """
+    _validate_theme(name, theme)
+    with _lock:
+        _themes[name] = theme
+        _built.pop(name, None)
+
+
+def load_theme_file(path: str) -> list:
+    """Registra todas las plantillas de un archivo JSON {nombre: tema} y devuelve sus nombres"""
+    with open(path, "r", encoding="utf-8") as f:
+        themes = json.load(f)
+    for name, theme in themes.items():
+        register_template(name, theme)
+    return list(themes)
+
+
+def get_template(name: str) -> Optional[CVTemplate]:
+    """Devuelve la plantilla construida (una vez por proceso, compartida y de solo lectura) o None si no existe"""
+    template = _built.get(name)
+    if template is not None:
+        return template
+    with _lock:
+        template = _built.get(name)
+        if template is None and name in _themes:
+            template = _build_template(name, _themes[name])
+            _built[name] = template
+        return template
+
+
+def get_available_templates() -> Dict[str, str]:
+    """Devuelve {nombre: descripción} de las plantillas registradas"""
+    with _lock:
+        return {name: theme.get("description", name) for name, theme in _themes.items()}
+
+
+def _get_sample_styles():
+    """Hoja de estilos base de ReportLab, creada una sola vez"""
+    global _sample_styles
+    if _sample_styles is None:
+        _sample_styles = getSampleStyleSheet()
+    return _sample_styles
+
+
+def _build_template(name: str, theme: Dict[str, Any], sample=None) -> CVTemplate:
+    """Construye los estilos del tema sobre la hoja base compartida (o sobre sample)"""
+    if sample is None:
+        sample = _get_sample_styles()
+    role_styles = {}
+    for role in STYLE_ROLES:
+        spec = dict(theme["styles"][role])
+        style_name = spec.pop("name", f"{name}_{role}")
+        parent = sample[spec.pop("parent", "Normal")]
+        if "alignment" in spec:
+            spec["alignment"] = _ALIGNMENTS[spec["alignment"]]
+        for field in _COLOR_FIELDS:
+            if field in spec:
+                spec[field] = toColor(spec[field])
+        role_styles[role] = ParagraphStyle(style_name, parent=parent, **spec)
+
+    return CVTemplate(
+        name=name,
+        description=theme.get("description", name),
+        contact_layout=theme.get("contact_layout", "inline"),
+        styles=sample,
+        role_styles=role_styles
+    )
+
+
+def _validate_theme(name: str, theme: Dict[str, Any]):
+    styles = theme.get("styles", {})
+    missing = [role for role in STYLE_ROLES if role not in styles]
+    if missing:
+        raise ValueError(f"El tema '{name}' no define los estilos: {', '.join(missing)}")
+    if theme.get("contact_layout", "inline") not in CONTACT_LAYOUTS:
+        raise ValueError(f"contact_layout no válido en el tema '{name}'")
+    for role in STYLE_ROLES:
+        alignment = styles[role].get("alignment")
+        if alignment is not None and alignment not in _ALIGNMENTS:
+            raise ValueError(f"Alineación '{alignment}' no válida en el tema '{name}'")
+
+
+def _load_default_themes():
+    load_theme_file(TEMPLATE_SETTINGS["builtin_themes"])
+    themes_dir = TEMPLATE_SETTINGS["themes_dir"]
+    if themes_dir:
+        for path in sorted(glob.glob(os.path.join(themes_dir, "*.json"))):
+            try:
+                load_theme_file(path)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Tema ignorado {path}: {e}")
+
+
+_load_default_themes()
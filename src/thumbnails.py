@@ -0,0 +1,307 @@
+"""
+Miniaturas rasterizadas de las plantillas de CV
+
+Genera imágenes pequeñas (WebP o PNG) de la primera página de cada plantilla,
+con datos de ejemplo o con los del usuario, y las guarda en una caché LRU
+acotada por memoria para que cambiar de plantilla en el selector muestre una
+vista real al instante. Las miniaturas de ejemplo se pueden renderizar al
+arrancar (warm_up) y las del usuario del resto de plantillas se precalculan en
+segundo plano (prefetch).
+
+Si PyMuPDF está instalado se rasteriza el PDF real a baja resolución; si no,
+la página se dibuja con Pillow a partir de la maquetación de LivePreview (los
+mismos flowables, líneas y posiciones que el PDF, con las fuentes Vera de
+ReportLab).
+"""
+
+import base64
+import hashlib
+import io
+import json
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+import reportlab
+from PIL import Image, ImageDraw, ImageFont
+from reportlab.lib.enums import TA_CENTER, TA_RIGHT
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.platypus import Paragraph
+
+from . import template_registry
+from .config import THUMBNAIL_SETTINGS
+from .content_generator import ContentGenerator
+from .live_preview import LivePreview, FRAME_WIDTH, FRAME_HEIGHT
+from .pdf_generator import PDFGenerator, SECTIONS, PAGE_MARGIN, FRAME_PADDING
+
+try:
+    import fitz  # PyMuPDF (opcional): rasteriza el PDF real
+except ImportError:
+    fitz = None
+
+# Datos de ejemplo para las miniaturas de cada plantilla
+SAMPLE_FORM_DATA = {
+    "nombre": "María García López",
+    "email": "maria.garcia@email.com",
+    "telefono": "+34 600 123 456",
+    "linkedin": "linkedin.com/in/mariagarcia",
+    "ubicacion": "Madrid, España",
+    "objetivo": "Desarrolladora Full Stack",
+    "experiencia_anos": "4-5 años",
+    "experiencia_laboral": "Desarrolladora Full Stack - TechCorp - 2021-2024\nDesarrolladora Frontend - WebStudio - 2019-2021",
+    "educacion": "Grado en Ingeniería Informática - Universidad Politécnica de Madrid - 2019",
+    "habilidades": "Python, JavaScript, React, SQL, Docker, Liderazgo, Comunicación",
+    "idiomas": "Español - Nativo\nInglés - C1",
+    "certificaciones": "",
+    "proyectos": ""
+}
+
+_IMAGE_FORMATS = {"WEBP": "image/webp", "PNG": "image/png"}
+_INSET = PAGE_MARGIN + FRAME_PADDING
+
+# Fuentes TrueType que incluye ReportLab, por (negrita, cursiva)
+_FONT_DIR = os.path.join(os.path.dirname(reportlab.__file__), "fonts")
+_FONT_FILES = {(False, False): "Vera.ttf", (True, False): "VeraBd.ttf",
+               (False, True): "VeraIt.ttf", (True, True): "VeraBI.ttf"}
+
+
+def _content_key(form_data: Dict[str, Any], ai_content: Dict[str, Any]) -> str:
+    """Huella de los campos que aparecen en el CV (el resto no cambia la imagen)"""
+    values = [(form_data if source == "form_data" else ai_content).get(field)
+              for _, _, source, fields in SECTIONS for field in fields]
+    content = json.dumps(values, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _font_variant(font_name: str) -> Tuple[bool, bool]:
+    return "Bold" in font_name, "Oblique" in font_name or "Italic" in font_name
+
+
+def _paragraph_lines(paragraph: Paragraph) -> List[List[Tuple[str, str]]]:
+    """Tramos (texto, fuente de ReportLab) de cada línea de un párrafo ya maquetado"""
+    lines = []
+    bl_para = paragraph.blPara
+    for line in bl_para.lines:
+        if bl_para.kind == 0:
+            runs = [(" ".join(line[1]), paragraph.style.fontName)]
+        else:
+            runs = [(getattr(word, "text", ""), getattr(word, "fontName", paragraph.style.fontName))
+                    for word in line.words]
+        # Las fuentes de la miniatura no tienen emojis ni símbolos
+        runs = [("".join(char for char in text if unicodedata.category(char) != "So"), font_name)
+                for text, font_name in runs]
+        if runs:
+            runs[0] = (runs[0][0].lstrip(), runs[0][1])
+        lines.append(runs)
+    return lines
+
+
+class ThumbnailService:
+    """Miniaturas de la página 1 por plantilla con caché LRU acotada por memoria"""
+
+    def __init__(self, pdf_generator: Optional[PDFGenerator] = None, live_preview: Optional[LivePreview] = None,
+                 content_generator: Optional[ContentGenerator] = None, dpi: Optional[int] = None,
+                 image_format: Optional[str] = None, max_bytes: Optional[int] = None,
+                 max_entries: Optional[int] = None, engine: Optional[str] = None):
+        self.pdf_generator = pdf_generator or PDFGenerator()
+        self.live_preview = live_preview or LivePreview(self.pdf_generator)
+        self.content_generator = content_generator or ContentGenerator()
+        self.dpi = dpi or THUMBNAIL_SETTINGS["dpi"]
+        self.image_format = (image_format or THUMBNAIL_SETTINGS["format"]).upper()
+        if self.image_format not in _IMAGE_FORMATS:
+            raise ValueError(f"Formato de miniatura no soportado: {self.image_format}")
+        self.max_bytes = max_bytes or THUMBNAIL_SETTINGS["max_bytes"]
+        self.max_entries = max_entries or THUMBNAIL_SETTINGS["max_entries"]
+        engine = engine or THUMBNAIL_SETTINGS["engine"]
+        self.engine = ("pymupdf" if fitz is not None else "pillow") if engine == "auto" else engine
+        if self.engine == "pymupdf" and fitz is None:
+            raise ValueError("El motor 'pymupdf' requiere instalar PyMuPDF")
+
+        self._images: "OrderedDict[Tuple[str, str, int, str], bytes]" = OrderedDict()
+        self._bytes = 0
+        self._fonts: Dict[Tuple[int, bool, bool], ImageFont.ImageFont] = {}
+        self._sample_content: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        self._render_lock = threading.Lock()
+        self._prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="thumbnails")
+        self._stats = {"hits": 0, "misses": 0, "evicted": 0, "prefetched": 0}
+
+    def get_thumbnail(self, form_data: Dict[str, Any], ai_content: Dict[str, Any], template: str = 'modern') -> bytes:
+        """
+        Devuelve la miniatura de la página 1, renderizándola si no está en la caché
+
+        Args:
+            form_data: Datos del formulario
+            ai_content: Contenido del CV (de la IA o del generador local)
+            template: Nombre de la plantilla
+
+        Returns:
+            bytes: Imagen en el formato configurado (WebP por defecto)
+        """
+        key = (template, _content_key(form_data, ai_content), self.dpi, self.image_format)
+        with self._lock:
+            image = self._images.get(key)
+            if image is not None:
+                self._images.move_to_end(key)
+                self._stats["hits"] += 1
+                return image
+            self._stats["misses"] += 1
+
+        image = self._rasterize(form_data, ai_content, template)
+        self._store(key, image)
+        return image
+
+    def get_sample_thumbnail(self, template: str = 'modern') -> bytes:
+        """Miniatura de la plantilla con los datos de ejemplo"""
+        return self.get_thumbnail(SAMPLE_FORM_DATA, self._get_sample_content(), template)
+
+    def warm_up(self, templates: Optional[Iterable[str]] = None, background: bool = False):
+        """Pre-renderiza las miniaturas de ejemplo de todas las plantillas registradas"""
+        if background:
+            self._prefetcher.submit(self.warm_up, templates)
+            return
+        for template in templates or template_registry.get_available_templates():
+            try:
+                self.get_sample_thumbnail(template)
+            except Exception as e:
+                print(f"No se pudo pre-renderizar la miniatura de '{template}': {e}")
+
+    def prefetch(self, form_data: Dict[str, Any], ai_content: Dict[str, Any], templates: Iterable[str]):
+        """Renderiza en segundo plano las miniaturas del usuario para otras plantillas"""
+        for template in templates:
+            self._prefetcher.submit(self._prefetch_one, dict(form_data), ai_content, template)
+
+    def to_html(self, image: bytes, template: str = "") -> str:
+        """Etiqueta <img> con la miniatura embebida (sin pasar por disco)"""
+        encoded = base64.b64encode(image).decode("ascii")
+        return (
+            f"<img src='data:{_IMAGE_FORMATS[self.image_format]};base64,{encoded}' alt='Vista previa {template}' "
+            f"style='width:100%;max-width:260px;display:block;margin:8px auto 0;border:1px solid #e5e7eb;"
+            f"border-radius:6px;box-shadow:0 2px 8px rgba(0,0,0,0.08)'>"
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Devuelve aciertos, fallos y ocupación de la caché de miniaturas"""
+        with self._lock:
+            return {
+                "engine": self.engine,
+                "dpi": self.dpi,
+                "format": self.image_format,
+                "entries": len(self._images),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                **self._stats
+            }
+
+    def close(self):
+        """Detiene el hilo de precálculo"""
+        self._prefetcher.shutdown(wait=False, cancel_futures=True)
+
+    def _prefetch_one(self, form_data: Dict[str, Any], ai_content: Dict[str, Any], template: str):
+        try:
+            self.get_thumbnail(form_data, ai_content, template)
+            with self._lock:
+                self._stats["prefetched"] += 1
+        except Exception as e:
+            print(f"Error precalculando la miniatura de '{template}': {e}")
+
+    def _get_sample_content(self) -> Dict[str, Any]:
+        if self._sample_content is None:
+            self._sample_content = self.content_generator.generate_enhanced_cv_content(SAMPLE_FORM_DATA)
+        return self._sample_content
+
+    def _store(self, key: Tuple[str, str, int, str], image: bytes):
+        with self._lock:
+            previous = self._images.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._images[key] = image
+            self._bytes += len(image)
+            while self._images and (self._bytes > self.max_bytes or len(self._images) > self.max_entries):
+                _, evicted = self._images.popitem(last=False)
+                self._bytes -= len(evicted)
+                self._stats["evicted"] += 1
+
+    def _rasterize(self, form_data: Dict[str, Any], ai_content: Dict[str, Any], template: str) -> bytes:
+        if self.engine == "pymupdf":
+            page = self._rasterize_pdf(form_data, ai_content, template)
+        else:
+            with self._render_lock:  # ImageDraw y la caché de fuentes no son seguros entre hilos
+                page = self._draw_layout(form_data, ai_content, template)
+
+        buffer = io.BytesIO()
+        if self.image_format == "WEBP":
+            page.save(buffer, format="WEBP", quality=80, method=4)
+        else:
+            page.save(buffer, format="PNG", optimize=True)
+        return buffer.getvalue()
+
+    def _rasterize_pdf(self, form_data: Dict[str, Any], ai_content: Dict[str, Any], template: str) -> Image.Image:
+        """Rasteriza la página 1 del PDF real con PyMuPDF"""
+        pdf_bytes = self.pdf_generator.create_cv_pdf_bytes(form_data, ai_content, template)
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as document:
+            pixmap = document[0].get_pixmap(dpi=self.dpi, alpha=False)
+            return Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+
+    def _draw_layout(self, form_data: Dict[str, Any], ai_content: Dict[str, Any], template: str) -> Image.Image:
+        """Dibuja la página 1 con Pillow a partir de la maquetación de LivePreview"""
+        scale = self.dpi / 72
+        page = Image.new("RGB", (round(A4[0] * scale), round(A4[1] * scale)), "white")
+        draw = ImageDraw.Draw(page)
+        placed, _, _ = self.live_preview.layout(form_data, ai_content, template)
+        bottom = _INSET + FRAME_HEIGHT
+
+        for y, block in placed:
+            paragraph = block.flowable
+            if not isinstance(paragraph, Paragraph):
+                continue  # Spacer
+            style = paragraph.style
+            top = _INSET + y
+            color = style.textColor.bitmap_rgb() if style.textColor is not None else (0, 0, 0)
+
+            if style.borderWidth and style.borderColor is not None:
+                padding = style.borderPadding or 0
+                box = [(_INSET + style.leftIndent - padding) * scale, (top - padding) * scale,
+                       (_INSET + FRAME_WIDTH + padding) * scale, min(top + block.height + padding, bottom) * scale]
+                draw.rectangle(box, outline=style.borderColor.bitmap_rgb(),
+                               width=max(1, round(style.borderWidth * scale)))
+
+            size = round(style.fontSize * scale)
+            for index, runs in enumerate(_paragraph_lines(paragraph)):
+                # ReportLab coloca la primera línea base a fontSize del borde superior
+                baseline = top + style.fontSize + index * style.leading
+                if baseline > bottom:
+                    break
+                # Vera es más ancha que Helvetica: se reduce el tamaño hasta ocupar
+                # el ancho que ReportLab calculó para la línea
+                target = sum(stringWidth(text, font_name, style.fontSize) for text, font_name in runs) * scale
+                fonts, widths = self._measure(draw, runs, size)
+                if sum(widths) > target and size > 1:
+                    fonts, widths = self._measure(draw, runs, max(1, int(size * target / sum(widths))))
+                x = (_INSET + style.leftIndent) * scale
+                if style.alignment in (TA_CENTER, TA_RIGHT):
+                    free = (FRAME_WIDTH - style.leftIndent) * scale - sum(widths)
+                    x += free / 2 if style.alignment == TA_CENTER else free
+                for (text, _), font, width in zip(runs, fonts, widths):
+                    draw.text((x, baseline * scale), text, fill=color, font=font, anchor="ls")
+                    x += width
+        return page
+
+    def _measure(self, draw: ImageDraw.ImageDraw, runs: List[Tuple[str, str]], size: int):
+        fonts = [self._get_font(size, _font_variant(font_name)) for _, font_name in runs]
+        return fonts, [draw.textlength(text, font=font) for (text, _), font in zip(runs, fonts)]
+
+    def _get_font(self, size: int, variant: Tuple[bool, bool]) -> ImageFont.ImageFont:
+        key = (size, *variant)
+        font = self._fonts.get(key)
+        if font is None:
+            try:
+                font = ImageFont.truetype(os.path.join(_FONT_DIR, _FONT_FILES[variant]), max(size, 1))
+            except (OSError, ImportError):  # Pillow sin FreeType: fuente bitmap de tamaño fijo
+                font = ImageFont.load_default()
+            self._fonts[key] = font
+        return font
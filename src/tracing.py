@@ -0,0 +1,327 @@
+"""
+Trazas y métricas de latencia del pipeline de generación
+
+Cada etapa (validación, prompt, llamada al proveedor, limpieza del JSON,
+contenido de respaldo, construcción del story, `doc.build`...) se envuelve en
+un span. Los spans de una misma generación comparten trace id a través de un
+ContextVar, de modo que se anidan también entre tareas asyncio. Al terminar
+cada span se actualiza el histograma de su etapa y proveedor (expuesto en
+formato Prometheus por /metrics) y, si hay archivo de exportación, la traza
+completa se escribe como una línea OTLP/JSON (ExportTraceServiceRequest).
+"""
+
+import bisect
+import functools
+import inspect
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+from .config import TRACING_SETTINGS
+
+# Códigos de estado de OTLP
+STATUS_OK = 1
+STATUS_ERROR = 2
+# SPAN_KIND_INTERNAL
+_SPAN_KIND = 1
+
+
+class Span:
+    """Intervalo de tiempo de una etapa con sus atributos"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, trace_id: str, span_id: str, parent_id: Optional[str] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes or {}
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    @property
+    def duration(self) -> float:
+        """Duración en segundos (0 mientras el span sigue abierto)"""
+        return max(self.end_ns - self.start_ns, 0) / 1e9 if self.end_ns else 0.0
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Representación OTLP/JSON del span"""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": _SPAN_KIND,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items()],
+            "status": {"code": STATUS_ERROR, "message": self.error} if self.error else {"code": STATUS_OK}
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class _NoopSpan:
+    """Span vacío cuando las trazas están desactivadas"""
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+# Span activo en el contexto actual y, en los workers, lista donde se recogen los spans
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+_captured: ContextVar[Optional[List[Span]]] = ContextVar("captured_spans", default=None)
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Tracer:
+    """Crea spans, acumula los histogramas por etapa y proveedor y exporta las trazas"""
+
+    def __init__(self, export_path: Optional[str] = None, service_name: Optional[str] = None,
+                 buckets: Optional[Tuple[float, ...]] = None, enabled: Optional[bool] = None,
+                 max_batch: Optional[int] = None):
+        self.export_path = export_path if export_path is not None else TRACING_SETTINGS["export_path"]
+        self.service_name = service_name or TRACING_SETTINGS["service_name"]
+        self.buckets = tuple(sorted(buckets or TRACING_SETTINGS["buckets"]))
+        self.enabled = enabled if enabled is not None else TRACING_SETTINGS["enabled"]
+        self.max_batch = max_batch or TRACING_SETTINGS["max_batch"]
+
+        self._lock = threading.Lock()
+        # (etapa, proveedor) -> [cuentas por bucket, suma, total, errores]
+        self._histograms: Dict[Tuple[str, str], list] = {}
+        self._pending: List[Span] = []
+        self._stats = {"spans": 0, "exported": 0, "export_errors": 0}
+
+    @contextmanager
+    def span(self, name: str, activate: bool = True, **attributes) -> Iterator[Span]:
+        """
+        Mide el bloque `with` como un span hijo del span activo
+
+        Args:
+            name: Nombre de la etapa (etiqueta `stage` del histograma)
+            activate: Hacerlo span activo del contexto; False cuando el bloque
+                      contiene yields de un generador que consume otro código
+                      (el span activo se filtraría al consumidor)
+            **attributes: Atributos del span; `provider` se hereda del padre si falta
+        """
+        if not self.enabled:
+            yield _NOOP_SPAN
+            return
+
+        parent = _current_span.get()
+        if parent is not None and "provider" not in attributes and "provider" in parent.attributes:
+            attributes["provider"] = parent.attributes["provider"]
+        span = Span(
+            name,
+            parent.trace_id if parent is not None else f"{random.getrandbits(128):032x}",
+            f"{random.getrandbits(64):016x}",
+            parent.span_id if parent is not None else None,
+            attributes
+        )
+        token = _current_span.set(span) if activate else None
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            if token is not None:
+                try:
+                    _current_span.reset(token)
+                except ValueError:
+                    pass  # Generador cerrado desde otro contexto: el suyo ya no se usa
+            self._finish(span)
+
+    def current_context(self) -> Optional[Tuple[str, str]]:
+        """(trace id, span id) del span activo, para continuar la traza en otro proceso"""
+        span = _current_span.get()
+        if span is None:
+            return None
+        return span.trace_id, span.span_id
+
+    @contextmanager
+    def capture(self, context: Optional[Tuple[str, str]]) -> Iterator[List[Span]]:
+        """
+        Recoge en una lista los spans del bloque en lugar de registrarlos
+
+        Lo usan los workers del pool de procesos: los spans vuelven al proceso
+        principal con el resultado y allí se registran con import_spans().
+        """
+        captured: List[Span] = []
+        capture_token = _captured.set(captured)
+        parent_token = None
+        if context is not None:
+            trace_id, span_id = context
+            parent = Span("remote", trace_id, span_id)
+            parent_token = _current_span.set(parent)
+        try:
+            yield captured
+        finally:
+            if parent_token is not None:
+                _current_span.reset(parent_token)
+            _captured.reset(capture_token)
+
+    def import_spans(self, spans: List[Span]):
+        """Registra spans terminados en otro proceso"""
+        for span in spans:
+            self._finish(span)
+
+    def render_metrics(self) -> str:
+        """Histogramas de latencia por etapa y proveedor en formato de texto de Prometheus"""
+        with self._lock:
+            histograms = {key: (list(value[0]), value[1], value[2], value[3])
+                          for key, value in sorted(self._histograms.items())}
+
+        lines = [
+            "# HELP cv_stage_duration_seconds Duración de cada etapa de la generación de CVs",
+            "# TYPE cv_stage_duration_seconds histogram"
+        ]
+        for (stage, provider), (counts, total, count, _) in histograms.items():
+            labels = f'stage="{_escape_label(stage)}",provider="{_escape_label(provider)}"'
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'cv_stage_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'cv_stage_duration_seconds_bucket{{{labels},le="+Inf"}} {count}')
+            lines.append(f"cv_stage_duration_seconds_sum{{{labels}}} {total:.6f}")
+            lines.append(f"cv_stage_duration_seconds_count{{{labels}}} {count}")
+
+        lines += [
+            "# HELP cv_stage_errors_total Etapas terminadas con excepción",
+            "# TYPE cv_stage_errors_total counter"
+        ]
+        for (stage, provider), (_, _, _, errors) in histograms.items():
+            labels = f'stage="{_escape_label(stage)}",provider="{_escape_label(provider)}"'
+            lines.append(f"cv_stage_errors_total{{{labels}}} {errors}")
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        """Escribe en el archivo de exportación los spans pendientes"""
+        with self._lock:
+            spans, self._pending = self._pending, []
+        if not spans or not self.export_path:
+            return
+
+        request = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", self.service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": __name__},
+                    "spans": [span.to_otlp() for span in spans]
+                }]
+            }]
+        }
+        try:
+            with open(self.export_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(request, ensure_ascii=False) + "\n")
+            exported = len(spans)
+        except OSError as e:
+            print(f"Error exportando trazas a {self.export_path}: {e}")
+            exported = 0
+        with self._lock:
+            self._stats["exported"] += exported
+            self._stats["export_errors"] += len(spans) - exported
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Devuelve spans registrados y exportados"""
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "export_path": self.export_path,
+                **self._stats,
+                "pending": len(self._pending),
+                "stages": len(self._histograms)
+            }
+
+    def _finish(self, span: Span):
+        """Registra el span en su histograma y lo encola para exportar"""
+        captured = _captured.get()
+        if captured is not None:
+            captured.append(span)
+            return
+
+        key = (span.name, str(span.attributes.get("provider", "")))
+        duration = span.duration
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(self.buckets), 0.0, 0, 0]
+            index = bisect.bisect_left(self.buckets, duration)
+            if index < len(self.buckets):
+                histogram[0][index] += 1
+            histogram[1] += duration
+            histogram[2] += 1
+            if span.error:
+                histogram[3] += 1
+            self._stats["spans"] += 1
+
+            if not self.export_path:
+                return
+            self._pending.append(span)
+            # La traza se escribe entera al cerrar su span raíz
+            should_flush = span.parent_id is None or len(self._pending) >= self.max_batch
+        if should_flush:
+            self.flush()
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Devuelve el tracer del proceso (lo crea con TRACING_SETTINGS la primera vez)"""
+    global _tracer
+    if _tracer is None:
+        with _tracer_lock:
+            if _tracer is None:
+                _tracer = Tracer()
+    return _tracer
+
+
+def span(name: str, activate: bool = True, **attributes):
+    """Atajo de get_tracer().span()"""
+    return get_tracer().span(name, activate=activate, **attributes)
+
+
+def traced(name: str, **attributes):
+    """Decorador que envuelve cada llamada a la función (síncrona o asíncrona) en un span"""
+    def decorator(fn):
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with get_tracer().span(name, **attributes):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with get_tracer().span(name, **attributes):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
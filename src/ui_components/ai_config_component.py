@@ -4,15 +4,17 @@ Maneja la configuración de proveedores y modelos de IA
 """
 
 import gradio as gr
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Callable, Optional
 from ..config import API_CONFIGS
 
 
 class AIConfigComponent:
     """Componente para configuración de IA"""
     
-    def __init__(self):
+    def __init__(self, status_provider: Optional[Callable[[], Dict[str, Dict[str, Any]]]] = None):
         self.components = {}
+        # Función que devuelve el estado de los circuit breakers por proveedor
+        self.status_provider = status_provider
     
     def render(self) -> Dict[str, Any]:
         """Renderizar el componente de configuración de IA"""
@@ -56,6 +58,9 @@ class AIConfigComponent:
                 info="🎭 Modo simulado activo",
                 lines=1
             )
+            
+            # Estado del proveedor (circuit breaker)
+            self.components['provider_status'] = gr.HTML(self.format_provider_status("mock"))
         
         return self.components
     
@@ -79,9 +84,36 @@ class AIConfigComponent:
                 'fn': self.update_api_key_visibility,
                 'inputs': [self.components['api_provider']],
                 'outputs': [self.components['api_key']]
+            },
+            'provider_change_status': {
+                'fn': self.format_provider_status,
+                'inputs': [self.components['api_provider']],
+                'outputs': [self.components['provider_status']]
             }
         }
     
+    def format_provider_status(self, provider: str) -> str:
+        """Mostrar el estado del circuit breaker del proveedor seleccionado"""
+        if provider == "mock" or self.status_provider is None:
+            return ""
+        
+        status = self.status_provider().get(provider)
+        if not status:
+            return ""
+        
+        if status["state"] == "open":
+            color, label = "#dc2626", f"🔴 No disponible temporalmente (reintento en {status['retry_in']:.0f}s) - se usará el siguiente proveedor"
+        elif status["state"] == "half_open":
+            color, label = "#d97706", "🟡 Recuperándose - probando disponibilidad"
+        else:
+            color, label = "#16a34a", "🟢 Operativo"
+        
+        return f"""
+        <div style="font-size: 0.8rem; color: {color}; margin-top: 4px;">
+            {label} · errores recientes: {status['error_rate']:.0%}
+        </div>
+        """
+    
     def update_models_dropdown(self, provider: str) -> gr.Dropdown:
         """Actualizar modelos disponibles según el proveedor"""
         if provider in API_CONFIGS:
@@ -73,8 +73,66 @@ class GenerationComponent:
                     height=120
                 )
         
+        # Vista previa en vivo de la primera página (oculta hasta activarla)
+        results['live_preview_html'] = gr.HTML(visible=False, elem_id="live_preview_html")
+        self.components['live_preview_html'] = results['live_preview_html']
+        
         return results
     
+    def format_streaming_preview(self, partial_content: Dict[str, Any]) -> str:
+        """
+        Formatear en Markdown el contenido parcial recibido durante el streaming
+        
+        El JSON parcial aún no está validado: los valores se convierten a texto
+        y, si algo no se puede mostrar, la vista previa se queda en la cabecera
+        en lugar de interrumpir la generación.
+        """
+        header = ["### ⏳ **Generando tu CV...**", ""]
+        try:
+            return "\n".join(header + self._format_partial_sections(partial_content))
+        except Exception as e:
+            print(f"Error formateando la vista previa del streaming: {e}")
+            return "\n".join(header)
+    
+    @staticmethod
+    def _format_partial_sections(partial_content: Dict[str, Any]) -> List[str]:
+        """Líneas Markdown de las secciones ya recibidas"""
+        lines = []
+        
+        resumen = partial_content.get('resumen_profesional')
+        if resumen:
+            if isinstance(resumen, list):
+                resumen = " ".join(str(parte) for parte in resumen)
+            lines += ["**📝 Resumen profesional**", "", str(resumen), ""]
+        
+        experiencias = partial_content.get('experiencia_optimizada') or []
+        if isinstance(experiencias, dict):
+            experiencias = [experiencias]
+        if isinstance(experiencias, list) and experiencias:
+            lines += ["**💼 Experiencia**", ""]
+            for exp in experiencias:
+                if not isinstance(exp, dict):
+                    continue
+                lines.append(f"- **{exp.get('puesto', '')}** - {exp.get('empresa', '')} {exp.get('periodo', '')}".rstrip())
+                descripcion = exp.get('descripcion') or []
+                if not isinstance(descripcion, list):
+                    descripcion = [descripcion]
+                for logro in descripcion:
+                    lines.append(f"    - {logro}")
+            lines.append("")
+        
+        habilidades = partial_content.get('habilidades_organizadas')
+        if isinstance(habilidades, dict):
+            lines += ["**🛠️ Habilidades**", ""]
+            for categoria, valores in habilidades.items():
+                if not valores:
+                    continue
+                if not isinstance(valores, list):
+                    valores = [valores]
+                lines.append(f"- **{str(categoria).title()}:** {', '.join(str(valor) for valor in valores)}")
+        
+        return lines
+    
     def get_generation_inputs(self) -> List[Any]:
         """Retornar inputs necesarios para la generación"""
         return [self.components['generar_btn']]
@@ -86,15 +144,16 @@ class GenerationComponent:
         def toggle_live_preview(current_state):
             new_state = not current_state
             if new_state:
-                return new_state, "🔴 Desactivar Vista Previa"
+                return new_state, "🔴 Desactivar Vista Previa", gr.update(visible=True)
             else:
-                return new_state, "👁️ Activar Vista Previa"
+                return new_state, "👁️ Activar Vista Previa", gr.update(visible=False)
         
         return {
             'state': live_preview_state,
             'toggle_handler': {
                 'fn': toggle_live_preview,
                 'inputs': [live_preview_state],
-                'outputs': [live_preview_state, self.components['live_preview_toggle']]
+                'outputs': [live_preview_state, self.components['live_preview_toggle'],
+                            self.components['live_preview_html']]
             }
         }
\ No newline at end of file
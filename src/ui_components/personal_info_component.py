@@ -4,16 +4,18 @@ Incluye validaciones en tiempo real y todos los campos del app.py original
 """
 
 import gradio as gr
-from typing import Dict, List, Any, Tuple
+from typing import Dict, List, Any, Tuple, Callable, Optional
 from ..utils import validate_email, validate_phone, validate_linkedin, clean_text
 
 
 class PersonalInfoComponent:
     """Componente para manejar toda la información personal del usuario"""
     
-    def __init__(self):
+    def __init__(self, thumbnail_provider: Optional[Callable[[str], str]] = None):
         self.components = {}
         self.validation_components = {}
+        # Función que devuelve el HTML de la miniatura de ejemplo de una plantilla
+        self.thumbnail_provider = thumbnail_provider
     
     def render(self) -> Dict[str, Any]:
         """Renderizar el componente de información personal"""
@@ -87,23 +89,30 @@ class PersonalInfoComponent:
                 interactive=True
             )
             
-            # Vista previa compacta de plantillas
-            gr.HTML("""
-            <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 8px; margin-top: 8px;">
-                <div style="padding: 8px; border: 1px solid #e5e7eb; border-radius: 6px; text-align: center; font-size: 0.8rem;">
-                    <strong style="color: #2563eb;">🎨 Moderna</strong>
-                </div>
-                <div style="padding: 8px; border: 1px solid #e5e7eb; border-radius: 6px; text-align: center; font-size: 0.8rem;">
-                    <strong style="color: #374151;">👔 Ejecutiva</strong>
-                </div>
-                <div style="padding: 8px; border: 1px solid #e5e7eb; border-radius: 6px; text-align: center; font-size: 0.8rem;">
-                    <strong style="color: #7c3aed;">🌈 Creativa</strong>
-                </div>
-                <div style="padding: 8px; border: 1px solid #e5e7eb; border-radius: 6px; text-align: center; font-size: 0.8rem;">
-                    <strong style="color: #16a34a;">💻 Técnica</strong>
+            # Miniatura real de la plantilla elegida si hay servicio de miniaturas
+            if self.thumbnail_provider is not None:
+                self.components['template_thumbnail'] = gr.HTML(
+                    self.thumbnail_provider("modern"),
+                    elem_id="template_thumbnail"
+                )
+            else:
+                # Vista previa compacta de plantillas
+                gr.HTML("""
+                <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 8px; margin-top: 8px;">
+                    <div style="padding: 8px; border: 1px solid #e5e7eb; border-radius: 6px; text-align: center; font-size: 0.8rem;">
+                        <strong style="color: #2563eb;">🎨 Moderna</strong>
+                    </div>
+                    <div style="padding: 8px; border: 1px solid #e5e7eb; border-radius: 6px; text-align: center; font-size: 0.8rem;">
+                        <strong style="color: #374151;">👔 Ejecutiva</strong>
+                    </div>
+                    <div style="padding: 8px; border: 1px solid #e5e7eb; border-radius: 6px; text-align: center; font-size: 0.8rem;">
+                        <strong style="color: #7c3aed;">🌈 Creativa</strong>
+                    </div>
+                    <div style="padding: 8px; border: 1px solid #e5e7eb; border-radius: 6px; text-align: center; font-size: 0.8rem;">
+                        <strong style="color: #16a34a;">💻 Técnica</strong>
+                    </div>
                 </div>
-            </div>
-            """)
+                """)
         
         return {**self.components, **self.validation_components}
     
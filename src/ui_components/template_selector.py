@@ -4,14 +4,17 @@ Permite seleccionar entre diferentes plantillas de CV
 """
 
 import gradio as gr
-from typing import Dict, Any, List, Tuple
+from typing import Dict, Any, List, Tuple, Callable, Optional
 
 
 class TemplateSelector:
     """Componente selector de plantillas"""
     
-    def __init__(self):
+    def __init__(self, thumbnail_provider: Optional[Callable[[str], str]] = None):
         self.component = None
+        self.thumbnail = None
+        # Función que devuelve el HTML de la miniatura de ejemplo de una plantilla
+        self.thumbnail_provider = thumbnail_provider
         self.templates = [
             ("🎨 Moderna - Diseño limpio y profesional", "modern"),
             ("👔 Ejecutiva - Estilo tradicional para puestos senior", "executive"),  
@@ -34,23 +37,27 @@ class TemplateSelector:
                 elem_id="template_selector"
             )
             
-            # Vista previa de plantillas
-            gr.HTML("""
-            <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 8px; margin-top: 8px;">
-                <div style="padding: 8px; border: 1px solid #e5e7eb; border-radius: 6px; text-align: center; font-size: 0.8rem;">
-                    <strong style="color: #2563eb;">🎨 Moderna</strong>
+            # Miniatura real de la plantilla elegida si hay servicio de miniaturas
+            if self.thumbnail_provider is not None:
+                self.thumbnail = gr.HTML(self.thumbnail_provider("modern"), elem_id="template_thumbnail")
+            else:
+                # Vista previa de plantillas
+                gr.HTML("""
+                <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 8px; margin-top: 8px;">
+                    <div style="padding: 8px; border: 1px solid #e5e7eb; border-radius: 6px; text-align: center; font-size: 0.8rem;">
+                        <strong style="color: #2563eb;">🎨 Moderna</strong>
+                    </div>
+                    <div style="padding: 8px; border: 1px solid #e5e7eb; border-radius: 6px; text-align: center; font-size: 0.8rem;">
+                        <strong style="color: #374151;">👔 Ejecutiva</strong>
+                    </div>
+                    <div style="padding: 8px; border: 1px solid #e5e7eb; border-radius: 6px; text-align: center; font-size: 0.8rem;">
+                        <strong style="color: #7c3aed;">🌈 Creativa</strong>
+                    </div>
+                    <div style="padding: 8px; border: 1px solid #e5e7eb; border-radius: 6px; text-align: center; font-size: 0.8rem;">
+                        <strong style="color: #16a34a;">💻 Técnica</strong>
+                    </div>
                 </div>
-                <div style="padding: 8px; border: 1px solid #e5e7eb; border-radius: 6px; text-align: center; font-size: 0.8rem;">
-                    <strong style="color: #374151;">👔 Ejecutiva</strong>
-                </div>
-                <div style="padding: 8px; border: 1px solid #e5e7eb; border-radius: 6px; text-align: center; font-size: 0.8rem;">
-                    <strong style="color: #7c3aed;">🌈 Creativa</strong>
-                </div>
-                <div style="padding: 8px; border: 1px solid #e5e7eb; border-radius: 6px; text-align: center; font-size: 0.8rem;">
-                    <strong style="color: #16a34a;">💻 Técnica</strong>
-                </div>
-            </div>
-            """)
+                """)
         
         return self.component
     
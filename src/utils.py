@@ -6,7 +6,31 @@ Este módulo contiene funciones de validación, formateo y otras utilidades.
 
 from typing import Optional, Dict, Any
 from .config import API_CONFIGS
+import json
+import os
 import re
+import tempfile
+
+def write_json_atomic(path: str, data: Any):
+    """
+    Escribe un JSON pequeño de estado sin dejarlo a medias si el proceso muere (crea el directorio)
+
+    Cada escritura usa su propio archivo temporal: dos guardados simultáneos
+    (hilos del executor, la app y el CLI de lotes) no se pisan.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
 
 def validate_form_data(nombre: str, email: str, telefono: str, api_provider: str, api_key: Optional[str]) -> Optional[str]:
     """
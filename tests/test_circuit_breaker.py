@@ -0,0 +1,92 @@
+"""Pruebas de las transiciones del circuit breaker"""
+
+import pytest
+
+from src import circuit_breaker
+from src.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Reloj monotónico controlado por la prueba"""
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    return now
+
+
+def open_breaker(breaker):
+    for _ in range(breaker.consecutive_failures):
+        breaker.allow_request()
+        breaker.record_failure()
+
+
+def test_consecutive_failures_open_the_circuit(clock):
+    breaker = CircuitBreaker(consecutive_failures=3)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CLOSED
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+
+
+def test_error_rate_opens_the_circuit(clock):
+    breaker = CircuitBreaker(failure_threshold=0.5, min_calls=4, consecutive_failures=10)
+    for success in (True, False, True, False):
+        if success:
+            breaker.record_success()
+        else:
+            breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.get_state()["error_rate"] == 0.5
+
+
+def test_old_failures_leave_the_window(clock):
+    breaker = CircuitBreaker(failure_threshold=0.5, min_calls=2, consecutive_failures=10, window_seconds=60)
+    breaker.record_failure()
+    clock[0] += 61
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.get_state()["calls"] == 1
+
+
+def test_open_circuit_allows_a_single_probe_after_cooldown(clock):
+    breaker = CircuitBreaker(open_seconds=30)
+    open_breaker(breaker)
+    clock[0] += 29
+    assert not breaker.allow_request()
+    clock[0] += 1
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow_request()
+
+
+def test_successful_probe_closes_the_circuit(clock):
+    breaker = CircuitBreaker(open_seconds=30)
+    open_breaker(breaker)
+    clock[0] += 30
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow_request() and breaker.allow_request()
+
+
+def test_failed_probe_reopens_the_circuit(clock):
+    breaker = CircuitBreaker(open_seconds=30)
+    open_breaker(breaker)
+    clock[0] += 30
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert breaker.get_state()["retry_in"] == 30
+    assert not breaker.allow_request()
+
+
+def test_release_frees_a_cancelled_probe(clock):
+    breaker = CircuitBreaker(open_seconds=30)
+    open_breaker(breaker)
+    clock[0] += 30
+    assert breaker.allow_request()
+    breaker.release()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
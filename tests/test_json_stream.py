@@ -0,0 +1,106 @@
+"""Pruebas del extractor JSON (reparación de truncados) y del parser incremental"""
+
+import json
+import random
+
+import pytest
+
+from src.json_stream import IncrementalJSONParser, JSONExtractor, extract_json
+
+CV_JSON = json.dumps({
+    "resumen_profesional": "Ingeniero con \"8\" años de experiencia\nen backend éxito",
+    "experiencia_optimizada": [
+        {"puesto": "Dev", "empresa": "ACME", "periodo": "2020-2024", "descripcion": ["API", "CI/CD"]},
+        {"puesto": "Lead", "empresa": "Foo\\Bar", "periodo": "2024", "descripcion": []}
+    ],
+    "habilidades_organizadas": {"tecnicas": ["python", "sql"], "blandas": [], "herramientas": ["git"]},
+    "anos": 8, "activo": True, "extra": None
+}, ensure_ascii=False)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('Aquí {nota} ```json\n{"a": 1}\n```', {"a": 1}),
+    ('{"a": 1} texto {"b": 2}', {"a": 1}),
+])
+def test_extract_json_skips_surrounding_text(text, expected):
+    extracted = extract_json(text)
+    assert extracted.value == expected
+    assert not extracted.truncated and not extracted.repaired
+
+
+def test_extract_json_removes_trailing_commas():
+    extracted = extract_json('{"a": [1, 2,], }')
+    assert extracted.value == {"a": [1, 2]}
+    assert extracted.repaired and not extracted.truncated
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"resumen": "Ingeniero con exp', {"resumen": "Ingeniero con exp"}),
+    ('{"a": 1, "b": tr', {"a": 1}),  # Literal a medias: se descarta
+    ('{"a": "x\\u00', {"a": "x"}),  # Escape unicode cortado
+    ('{"a": "x\\', {"a": "x"}),  # Barra invertida final
+    ('{"a": 1, "b"', {"a": 1}),  # Clave sin valor
+    ('{"a": [1, 2}', {"a": [1, 2]}),  # Cierre que no corresponde
+    ('{"exp": [{"puesto": "Dev", "empresa": "AC', {"exp": [{"puesto": "Dev", "empresa": "AC"}]}),
+])
+def test_extract_json_repairs_truncation(text, expected):
+    extracted = extract_json(text)
+    assert extracted.value == expected
+    assert extracted.truncated and extracted.repaired
+
+
+def test_extract_json_without_object():
+    assert extract_json("Lo siento, no puedo ayudar") is None
+
+
+def test_every_truncation_of_a_cv_is_repaired():
+    """Cualquier corte de la respuesta da un objeto con un subconjunto de sus claves"""
+    original = json.loads(CV_JSON)
+    for end in range(1, len(CV_JSON)):
+        extracted = extract_json(CV_JSON[:end])
+        assert extracted is not None, CV_JSON[:end]
+        assert extracted.truncated
+        assert set(extracted.value) <= set(original)
+    assert extract_json(CV_JSON).value == original
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_extractor_result_does_not_depend_on_chunking(seed):
+    rng = random.Random(seed)
+    text = "Respuesta: ```json\n" + CV_JSON[:rng.randint(1, len(CV_JSON))]
+    extractor = JSONExtractor()
+    position = 0
+    while position < len(text):
+        step = rng.randint(1, 12)
+        extractor.feed(text[position:position + step])
+        position += step
+    assert extractor.result() == extract_json(text)
+
+
+def test_incremental_parser_exposes_closed_fields_first():
+    parser = IncrementalJSONParser()
+    text = '```json\n{"resumen_profesional": "abc", "experiencia_optimizada": [{"puesto": "A"}, {"pue'
+    updated = []
+    for char in text:
+        updated += parser.feed(char)
+
+    assert updated == ["resumen_profesional", "experiencia_optimizada"]
+    assert parser.fields == {"resumen_profesional": "abc", "experiencia_optimizada": [{"puesto": "A"}]}
+    assert not parser.finished
+
+    assert parser.feed('sto": "B"}], "x": 1}') == ["experiencia_optimizada", "x"]
+    assert parser.fields["experiencia_optimizada"] == [{"puesto": "A"}, {"puesto": "B"}]
+    assert parser.finished
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_incremental_parser_matches_json_loads(seed):
+    rng = random.Random(seed)
+    parser = IncrementalJSONParser()
+    position = 0
+    while position < len(CV_JSON):
+        step = rng.randint(1, 9)
+        parser.feed(CV_JSON[position:position + step])
+        position += step
+    assert parser.finished
+    assert parser.fields == json.loads(CV_JSON)
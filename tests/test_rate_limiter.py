@@ -0,0 +1,130 @@
+"""Pruebas del rate limiter: cabeceras de los proveedores, bloqueos y cuota mensual"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+
+from src.rate_limiter import RateLimiter, parse_reset, parse_retry_after
+
+KEY = "gsk_" + "a" * 52
+
+
+def limiter(**limits):
+    return RateLimiter(max_wait=0.05, provider_limits={"groq": limits}, usage_path=None)
+
+
+def test_retry_after_in_seconds():
+    assert parse_retry_after("30") == 30
+    assert parse_retry_after(" 1.5 ") == 1.5
+    assert parse_retry_after("-4") == 0
+
+
+def test_retry_after_as_http_date():
+    retry_at = datetime.now(timezone.utc) + timedelta(seconds=120)
+    assert parse_retry_after(format_datetime(retry_at, usegmt=True)) == pytest.approx(120, abs=2)
+
+
+@pytest.mark.parametrize("value", [None, "", "pronto"])
+def test_retry_after_invalid(value):
+    assert parse_retry_after(value) is None
+
+
+@pytest.mark.parametrize("value, seconds", [
+    ("6m0s", 360),
+    ("20ms", 0.02),
+    ("1h2m3s", 3723),
+    ("7.66s", 7.66),
+    ("1.5", 1.5),
+])
+def test_reset_durations(value, seconds):
+    assert parse_reset(value) == pytest.approx(seconds)
+
+
+def test_reset_as_rfc3339():
+    reset_at = datetime.now(timezone.utc) + timedelta(seconds=60)
+    value = reset_at.strftime("%Y-%m-%dT%H:%M:%SZ")
+    assert parse_reset(value) == pytest.approx(60, abs=2)
+
+
+@pytest.mark.parametrize("value", [None, "", "6 minutos", "5x"])
+def test_reset_invalid(value):
+    assert parse_reset(value) is None
+
+
+def test_429_blocks_the_key():
+    async def scenario():
+        rate_limiter = limiter()
+        assert await rate_limiter.acquire("groq", KEY)
+        rate_limiter.observe_response("groq", KEY, 429, {"retry-after": "60"})
+        return await rate_limiter.acquire("groq", KEY), rate_limiter.get_status()
+
+    allowed, status = asyncio.run(scenario())
+    assert not allowed
+    (entry,) = status.values()
+    assert entry["throttled"] == 1 and entry["rerouted"] == 1
+    assert entry["blocked_for"] == pytest.approx(60, abs=1)
+    assert KEY not in next(iter(status))
+
+
+def test_exhausted_remaining_blocks_until_reset():
+    async def scenario():
+        rate_limiter = limiter(requests_per_minute=600, burst=10)
+        rate_limiter.observe_response("groq", KEY, 200, {
+            "x-ratelimit-remaining-requests": "0",
+            "x-ratelimit-reset-requests": "2m0s"
+        })
+        return await rate_limiter.acquire("groq", KEY), rate_limiter.get_status()
+
+    allowed, status = asyncio.run(scenario())
+    assert not allowed
+    assert next(iter(status.values()))["blocked_for"] == pytest.approx(120, abs=1)
+
+
+def test_other_keys_are_not_blocked():
+    async def scenario():
+        rate_limiter = limiter()
+        rate_limiter.observe_response("groq", KEY, 429, {"retry-after": "60"})
+        return await rate_limiter.acquire("groq", "gsk_" + "b" * 52)
+
+    assert asyncio.run(scenario())
+
+
+def test_bucket_waits_for_a_token_within_max_wait():
+    async def scenario():
+        rate_limiter = limiter(requests_per_minute=60 * 50, burst=1)
+        return [await rate_limiter.acquire("groq", KEY) for _ in range(3)]
+
+    assert asyncio.run(scenario()) == [True, True, True]
+
+
+def test_monthly_quota_reroutes_when_exhausted():
+    async def scenario():
+        rate_limiter = limiter(monthly_quota=2)
+        return [await rate_limiter.acquire("groq", KEY) for _ in range(3)]
+
+    assert asyncio.run(scenario()) == [True, True, False]
+
+
+def test_cohere_trial_header_limits_the_quota():
+    async def scenario():
+        rate_limiter = RateLimiter(max_wait=0.05, provider_limits={}, usage_path=None)
+        assert await rate_limiter.acquire("cohere", KEY)
+        rate_limiter.observe_response("cohere", KEY, 200, {"x-trial-endpoint-call-remaining": "1"})
+        return [await rate_limiter.acquire("cohere", KEY) for _ in range(2)]
+
+    assert asyncio.run(scenario()) == [True, False]
+
+
+def test_usage_survives_a_restart(tmp_path):
+    path = str(tmp_path / "usage.json")
+
+    async def spend(count):
+        rate_limiter = RateLimiter(max_wait=0.05, provider_limits={"groq": {"monthly_quota": 3}}, usage_path=path)
+        results = [await rate_limiter.acquire("groq", KEY) for _ in range(count)]
+        rate_limiter.save_usage()
+        return results
+
+    assert asyncio.run(spend(2)) == [True, True]
+    assert asyncio.run(spend(2)) == [True, False]
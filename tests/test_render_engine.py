@@ -0,0 +1,71 @@
+"""Pruebas del motor de renderizado: plazo por llamante y huecos retenidos por el worker"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src import render_engine
+from src.deadline import Deadline, DeadlineExceeded
+from src.render_engine import PDFRenderEngine
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    """Motor con un pool de hilos y un worker que tarda 0,2 s en cada PDF"""
+    finished = threading.Event()
+
+    def slow_render(form_data, ai_content, template, trace_context=None):
+        time.sleep(0.2)
+        finished.set()
+        return b"%PDF-" + form_data["nombre"].encode(), []
+
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(render_engine, "_render_in_worker", slow_render)
+    monkeypatch.setattr(PDFRenderEngine, "_get_executor", lambda self: executor)
+    engine = PDFRenderEngine(max_workers=1, max_pending=2)
+    engine.worker_finished = finished
+    yield engine
+    executor.shutdown(wait=True)
+
+
+def test_expired_leader_does_not_cancel_the_render_for_its_follower(engine):
+    """Regresión (user-021): el plazo del primer llamante no corta el PDF que otro espera"""
+    async def scenario():
+        leader = asyncio.ensure_future(engine.render({"nombre": "Ana"}, {}, "modern", Deadline(0.05)))
+        await asyncio.sleep(0.01)
+        follower = asyncio.ensure_future(engine.render({"nombre": "Ana"}, {}, "modern"))
+        return await asyncio.gather(leader, follower, return_exceptions=True)
+
+    leader, follower = asyncio.run(scenario())
+    assert isinstance(leader, DeadlineExceeded) and leader.stage == "pdf.render"
+    assert follower == b"%PDF-Ana"
+    assert engine.get_stats()["coalesced"] == 1
+
+
+def test_abandoned_render_keeps_its_slot_until_the_worker_finishes(engine):
+    """Regresión (user-006): un render sin nadie esperando sigue ocupando su hueco del carril"""
+    async def scenario():
+        with pytest.raises(DeadlineExceeded):
+            await engine.render({"nombre": "Ana"}, {}, "modern", Deadline(0.05))
+        await asyncio.sleep(0.01)
+        held = engine.get_stats()["in_flight"]
+        while not engine.worker_finished.is_set():
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.01)
+        return held, engine.get_stats()
+
+    held, stats = asyncio.run(scenario())
+    assert held == 1
+    assert stats["in_flight"] == 0
+
+
+def test_identical_renders_share_one_pdf(engine):
+    async def scenario():
+        return await asyncio.gather(*[engine.render({"nombre": "Ana"}, {}, "modern") for _ in range(3)])
+
+    assert asyncio.run(scenario()) == [b"%PDF-Ana"] * 3
+    stats = engine.get_stats()
+    assert stats["rendered"] == 1 and stats["coalesced"] == 2
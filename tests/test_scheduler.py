@@ -0,0 +1,135 @@
+"""Pruebas de los carriles del planificador: rechazo con cola llena, plazos y liberación de huecos"""
+
+import asyncio
+import random
+import threading
+from concurrent.futures import Future
+
+import pytest
+
+from src.deadline import Deadline, DeadlineExceeded
+from src.scheduler import JobScheduler, Lane, QueueFullError
+
+
+def test_full_queue_rejects_immediately():
+    async def scenario():
+        lane = Lane("test", concurrency=1, max_queue=1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with lane.slot():
+                await release.wait()
+
+        running = asyncio.ensure_future(hold())
+        queued = asyncio.ensure_future(hold())
+        await asyncio.sleep(0.01)
+        with pytest.raises(QueueFullError) as error:
+            async with lane.slot():
+                pass
+        release.set()
+        await asyncio.gather(running, queued)
+        return error.value, lane.get_stats()
+
+    error, stats = asyncio.run(scenario())
+    assert error.lane == "test"
+    assert stats["rejected"] == 1
+    assert stats["completed"] == 2
+    assert stats["in_flight"] == 0 and stats["waiting"] == 0
+
+
+def test_slot_is_released_after_the_block_even_on_error():
+    async def scenario():
+        lane = Lane("test", concurrency=1, max_queue=0)
+        with pytest.raises(RuntimeError):
+            async with lane.slot():
+                raise RuntimeError("fallo del proveedor")
+        async with lane.slot():
+            pass
+        return lane.get_stats(), lane._get_slots()._value
+
+    stats, free = asyncio.run(scenario())
+    assert stats["in_flight"] == 0 and stats["completed"] == 2
+    assert free == 1
+
+
+def test_deadline_expires_while_queued():
+    async def scenario():
+        lane = Lane("test", concurrency=1, max_queue=5)
+        release = asyncio.Event()
+
+        async def hold():
+            async with lane.slot():
+                await release.wait()
+
+        running = asyncio.ensure_future(hold())
+        await asyncio.sleep(0)
+        with pytest.raises(DeadlineExceeded) as error:
+            async with lane.slot(Deadline(0.02)):
+                pass
+        release.set()
+        await running
+        return error.value, lane.get_stats()
+
+    error, stats = asyncio.run(scenario())
+    assert error.stage == "queue.test"
+    assert stats["waiting"] == 0
+
+
+def test_expiring_deadlines_never_leak_slots():
+    """Regresión (user-010): un plazo que vence justo al conseguir hueco no pierde el permiso"""
+    async def scenario():
+        lane = Lane("test", concurrency=2, max_queue=1000)
+        rng = random.Random(7)
+
+        async def job():
+            try:
+                async with lane.slot(Deadline(rng.uniform(0.0, 0.01))):
+                    await asyncio.sleep(rng.uniform(0.0, 0.005))
+            except DeadlineExceeded:
+                pass
+
+        async def cancelled_job():
+            task = asyncio.ensure_future(job())
+            await asyncio.sleep(rng.uniform(0.0, 0.005))
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+        await asyncio.gather(*[job() for _ in range(200)], *[cancelled_job() for _ in range(100)])
+        return lane._get_slots()._value, lane.get_stats()
+
+    free, stats = asyncio.run(scenario())
+    assert free == 2
+    assert stats["in_flight"] == 0 and stats["waiting"] == 0
+
+
+def test_lease_keeps_slot_until_the_worker_future_finishes():
+    async def scenario():
+        lane = Lane("test", concurrency=1, max_queue=5)
+        future = Future()
+
+        async def abandoned():
+            async with lane.slot() as lease:
+                lease.hold(future)
+                await asyncio.sleep(10)
+
+        task = asyncio.ensure_future(abandoned())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        held = lane.get_stats()["in_flight"]
+
+        # El worker termina en otro hilo y el hueco vuelve al event loop
+        threading.Timer(0.02, future.set_result, args=(b"pdf",)).start()
+        async with lane.slot(Deadline(1)):
+            pass
+        return held, lane.get_stats()
+
+    held, stats = asyncio.run(scenario())
+    assert held == 1
+    assert stats["in_flight"] == 0 and stats["completed"] == 2
+
+
+def test_providers_map_to_their_lanes():
+    scheduler = JobScheduler()
+    assert scheduler.lane_for("mock").name == "instant"
+    assert scheduler.lane_for("ollama_local").name == "standard"
@@ -0,0 +1,138 @@
+"""Pruebas de la agrupación de peticiones en vuelo: resultado compartido, cancelación y abandono"""
+
+import asyncio
+
+import pytest
+
+from src.single_flight import FlightAbandoned, SingleFlight
+
+
+def test_identical_calls_share_one_execution():
+    async def scenario():
+        flights = SingleFlight("test")
+        calls = []
+
+        async def work():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "pdf"
+
+        results = await asyncio.gather(*[flights.do("k", work) for _ in range(5)])
+        return calls, results, flights.get_stats()
+
+    calls, results, stats = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert all(result == "pdf" for result, _ in results)
+    assert stats == {"leaders": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_cancelled_waiter_does_not_cancel_shared_execution():
+    async def scenario():
+        flights = SingleFlight("test")
+        started = asyncio.Event()
+
+        async def work():
+            started.set()
+            await asyncio.sleep(0.1)
+            return "ok"
+
+        leader = asyncio.ensure_future(flights.do("k", work))
+        await started.wait()
+        follower = asyncio.ensure_future(flights.do("k", work))
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == ("ok", True)
+
+
+def test_execution_is_cancelled_when_every_waiter_leaves():
+    async def scenario():
+        flights = SingleFlight("test")
+        cancelled = asyncio.Event()
+
+        async def work():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        waiters = [asyncio.ensure_future(flights.do("k", work)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.wait_for(cancelled.wait(), 1)
+        await asyncio.sleep(0)
+        return flights.get_stats()["in_flight"]
+
+    assert asyncio.run(scenario()) == 0
+
+
+def test_wait_for_timeout_of_one_caller_keeps_the_result_for_the_others():
+    """Regresión: el plazo de un llamante no corta la ejecución que otro sigue esperando"""
+    async def scenario():
+        flights = SingleFlight("test")
+
+        async def work():
+            await asyncio.sleep(0.1)
+            return "pdf"
+
+        short = asyncio.wait_for(flights.do("k", work), 0.01)
+        long = asyncio.wait_for(flights.do("k", work), 1)
+        return await asyncio.gather(short, long, return_exceptions=True)
+
+    short, long = asyncio.run(scenario())
+    assert isinstance(short, asyncio.TimeoutError)
+    assert long == ("pdf", True)
+
+
+def test_errors_reach_every_waiter():
+    async def scenario():
+        flights = SingleFlight("test")
+
+        async def work():
+            await asyncio.sleep(0.01)
+            raise ValueError("proveedor caído")
+
+        return await asyncio.gather(*[flights.do("k", work) for _ in range(3)], return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in asyncio.run(scenario()))
+
+
+def test_abandoned_leader_makes_waiters_run_their_own_execution():
+    async def scenario():
+        flights = SingleFlight("test")
+        flight = flights.lead("k")
+
+        async def work():
+            return "propio"
+
+        waiter = asyncio.ensure_future(flights.do("k", work))
+        joined = flights.join("k")
+        joined_wait = asyncio.ensure_future(flights.wait(joined))
+        await asyncio.sleep(0)
+        flights.finish("k", flight, error=FlightAbandoned())
+        with pytest.raises(FlightAbandoned):
+            await joined_wait
+        return await waiter
+
+    assert asyncio.run(scenario()) == ("propio", False)
+
+
+def test_lead_and_join_share_the_leaders_result():
+    async def scenario():
+        flights = SingleFlight("test")
+        flight = flights.lead("k")
+        assert flights.join("otra") is None
+        joined = flights.join("k")
+        flights.finish("k", flight, result={"resumen": "x"})
+        return await flights.wait(joined), flights.get_stats()
+
+    result, stats = asyncio.run(scenario())
+    assert result == {"resumen": "x"}
+    assert stats["in_flight"] == 0